@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Tuple
+
+from server.models import UNIT_MODELS
+
+if TYPE_CHECKING:
+    from server.domain import ActionRequest, GameSession, ValidationResult
+
+Handler = Callable[["GameSession", "ActionRequest"], "ValidationResult"]
+Check = Callable[["GameSession", "ActionRequest"], "str | None"]
+
+
+@dataclass(frozen=True, slots=True)
+class ActionSpec:
+    """How one ``action_type`` is validated and applied.
+
+    ``checks`` only look at facts that never flip from invalid back to valid (unit ownership,
+    unit existence, static map bounds, required fields), so they may run before the session lock
+    is taken and again under it. ``stage`` names the tick-wide resolver (``"move"``/``"fire"``)
+    that ``apply_tick_orders`` batches the action into; other actions go straight to ``handler``.
+    """
+
+    name: str
+    handler: Handler
+    checks: Tuple[Check, ...] = ()
+    stage: str | None = None
+
+    def check(self, session: GameSession, action: ActionRequest) -> str | None:
+        for check in self.checks:
+            reason = check(session, action)
+            if reason is not None:
+                return reason
+        return None
+
+
+ACTIONS: Dict[str, ActionSpec] = {}
+
+
+def register_action(
+    name: str,
+    handler: Handler,
+    owned_unit: Tuple[str, str] | None = None,
+    owned_units: str | None = None,
+    target_in_bounds: str | None = None,
+    required: Tuple[Tuple[str, str], ...] = (),
+    checks: Tuple[Check, ...] = (),
+    stage: str | None = None,
+) -> ActionSpec:
+    """Registers (or replaces) an action type and compiles its pre-validation checks.
+
+    ``owned_unit`` is ``(missing_reason, not_owned_reason)`` for ``action.unit_id``;
+    ``owned_units`` is the reason used when any of ``action.unit_ids`` is missing or foreign;
+    ``target_in_bounds`` is the reason for a target outside the map; ``required`` lists
+    ``(field, reason)`` pairs for fields that must be non-empty. Extra ``checks`` run last.
+    """
+    compiled = [_required_fields(required)] if required else []
+    if owned_unit is not None:
+        compiled.append(_owned_unit(*owned_unit))
+    if owned_units is not None:
+        compiled.append(_owned_units(owned_units))
+    if target_in_bounds is not None:
+        compiled.append(_target_in_bounds(target_in_bounds))
+    spec = ActionSpec(name, handler, tuple(compiled) + tuple(checks), stage)
+    ACTIONS[name] = spec
+    return spec
+
+
+def prevalidate(session: GameSession, action: ActionRequest) -> Tuple[ActionSpec | None, str | None]:
+    """Looks up the action's spec and runs the checks every action type shares plus its own.
+
+    Safe without the session lock: it only reads, and every rejection it returns stays valid
+    later (ticks per player only increase, units never change owner and do not come back).
+    """
+    if action.player_id not in session.players:
+        return None, "player does not exist"
+    if action.tick <= session.latest_tick_by_player.get(action.player_id, -1):
+        return None, "tick must increase per player"
+    spec = ACTIONS.get(action.action_type)
+    if spec is None:
+        return None, f"unsupported action_type: {action.action_type}"
+    return spec, spec.check(session, action)
+
+
+def known_unit_type(reason: str) -> Check:
+    def check(session: GameSession, action: ActionRequest) -> str | None:
+        return None if action.unit_type in UNIT_MODELS else reason
+
+    return check
+
+
+def _required_fields(required: Tuple[Tuple[str, str], ...]) -> Check:
+    def check(session: GameSession, action: ActionRequest) -> str | None:
+        for name, reason in required:
+            if not getattr(action, name):
+                return reason
+        return None
+
+    return check
+
+
+def _owned_unit(missing_reason: str, not_owned_reason: str) -> Check:
+    def check(session: GameSession, action: ActionRequest) -> str | None:
+        unit = session.units.get(action.unit_id)
+        if unit is None:
+            return missing_reason
+        if unit.owner_player_id != action.player_id:
+            return not_owned_reason
+        return None
+
+    return check
+
+
+def _owned_units(reason: str) -> Check:
+    def check(session: GameSession, action: ActionRequest) -> str | None:
+        units = session.units
+        for unit_id in action.unit_ids:
+            unit = units.get(unit_id)
+            if unit is None or unit.owner_player_id != action.player_id:
+                return reason
+        return None
+
+    return check
+
+
+def _target_in_bounds(reason: str) -> Check:
+    def check(session: GameSession, action: ActionRequest) -> str | None:
+        return None if session.game_map.in_bounds(action.target_x, action.target_y) else reason
+
+    return check
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Tuple
+
+
+@dataclass(frozen=True)
+class AdmissionPolicy:
+    """Limits for one session class. Rates are actions per second; ``None`` disables that limit."""
+
+    player_rate: float | None = 20.0
+    player_burst: float = 40.0
+    session_rate: float | None = 200.0
+    session_burst: float = 400.0
+    max_queue: int | None = 64
+
+
+ADMISSION_CLASSES: Dict[str, AdmissionPolicy] = {
+    "standard": AdmissionPolicy(),
+    "heavy": AdmissionPolicy(player_rate=10.0, player_burst=20.0, session_rate=400.0, session_burst=800.0, max_queue=32),
+}
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, now: float) -> float:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def wait_time(self, cost: float = 1.0) -> float:
+        """Seconds until ``cost`` tokens are available (``0`` if they are now); call after ``refill``."""
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+
+    def full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class AdmissionController:
+    """Token-bucket rate limits per player and per session, plus a bound on queued actions per session.
+
+    Every session belongs to a class (``assign``; unassigned sessions use ``default_class``) whose
+    ``AdmissionPolicy`` sets its limits, so a busy class cannot consume another class's budget and
+    one session's flood never drains another session's buckets. ``admit`` is called before any
+    persistence or lock; ``queue_slot`` wraps the wait for the session lock and sheds load once
+    ``max_queue`` actions are already waiting. Idle buckets that have refilled are pruned once more
+    than ``max_buckets`` exist (at most once a second).
+    """
+
+    def __init__(
+        self,
+        classes: Dict[str, AdmissionPolicy] | None = None,
+        default_class: str = "standard",
+        clock: Callable[[], float] = time.monotonic,
+        max_buckets: int = 100_000,
+    ) -> None:
+        self.classes = dict(ADMISSION_CLASSES if classes is None else classes)
+        if default_class not in self.classes:
+            raise ValueError(f"unknown default admission class: {default_class}")
+        self.default_class = default_class
+        self.max_buckets = max_buckets
+        self._clock = clock
+        self._assigned: Dict[str, str] = {}
+        self._player_buckets: Dict[Tuple[str | None, str], TokenBucket] = {}
+        self._session_buckets: Dict[str | None, TokenBucket] = {}
+        self._queued: Dict[str | None, int] = {}
+        self._next_prune = 0.0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"admitted": 0, "throttled_player": 0, "throttled_session": 0, "shed": 0}
+
+    def assign(self, session_id: str, class_name: str) -> None:
+        if class_name not in self.classes:
+            raise ValueError(f"unknown admission class: {class_name}")
+        self._assigned[session_id] = class_name
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._assigned.pop(session_id, None)
+            self._session_buckets.pop(session_id, None)
+            for key in [key for key in self._player_buckets if key[0] == session_id]:
+                del self._player_buckets[key]
+
+    def class_of(self, session_id: str | None) -> str:
+        return self._assigned.get(session_id, self.default_class) if session_id is not None else self.default_class
+
+    def policy(self, session_id: str | None) -> AdmissionPolicy:
+        return self.classes[self.class_of(session_id)]
+
+    def admit(self, session_id: str | None, player_id: str) -> float:
+        """Takes one token from the player's and the session's bucket; returns ``0`` or seconds to retry after.
+
+        ``session_id`` is ``None`` for sessions the server does not know, which then share one
+        set of buckets instead of allocating new ones per made-up id.
+        """
+        policy = self.policy(session_id)
+        now = self._clock()
+        with self._lock:
+            if len(self._player_buckets) + len(self._session_buckets) > self.max_buckets and now >= self._next_prune:
+                self._prune(now)
+                self._next_prune = now + 1.0
+            player = self._bucket(self._player_buckets, (session_id, player_id), policy.player_rate, policy.player_burst, now)
+            session = self._bucket(self._session_buckets, session_id, policy.session_rate, policy.session_burst, now)
+            if player is not None and player.refill(now) < 1:
+                self.stats["throttled_player"] += 1
+                return player.wait_time()
+            if session is not None and session.refill(now) < 1:
+                self.stats["throttled_session"] += 1
+                return session.wait_time()
+            if player is not None:
+                player.tokens -= 1
+            if session is not None:
+                session.tokens -= 1
+            self.stats["admitted"] += 1
+            return 0.0
+
+    @contextmanager
+    def queue_slot(self, session_id: str | None) -> Iterator[bool]:
+        """Yields ``False`` (shed) when ``max_queue`` actions for the session are already in flight."""
+        limit = self.policy(session_id).max_queue
+        with self._lock:
+            queued = self._queued.get(session_id, 0)
+            if limit is not None and queued >= limit:
+                self.stats["shed"] += 1
+                admitted = False
+            else:
+                self._queued[session_id] = queued + 1
+                admitted = True
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                with self._lock:
+                    remaining = self._queued[session_id] - 1
+                    if remaining:
+                        self._queued[session_id] = remaining
+                    else:
+                        del self._queued[session_id]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "buckets": len(self._player_buckets) + len(self._session_buckets),
+                "queued": sum(self._queued.values()),
+            }
+
+    def _bucket(self, buckets: dict, key, rate: float | None, burst: float, now: float) -> TokenBucket | None:
+        if rate is None:
+            return None
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(rate, burst, now)
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        for buckets in (self._player_buckets, self._session_buckets):
+            for key in [key for key, bucket in buckets.items() if bucket.full(now)]:
+                del buckets[key]
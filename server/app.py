@@ -1,13 +1,20 @@
 from __future__ import annotations
 
-import json
+import math
 import os
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from urllib.parse import parse_qs, urlparse
+from urllib.parse import parse_qs, unquote, urlparse
 
-from server.domain import ActionRequest
-from server.persistence import AwanDbRepository, InMemoryRepository
-from server.service import GameService
+from server.admission import ADMISSION_CLASSES, AdmissionController, AdmissionPolicy
+from server.domain import MAX_TICK, ActionRequest
+from server.history import SnapshotHistory
+from server.persistence import ArrowExportRepository, ArrowFileSink, AwanDbRepository, InMemoryRepository
+from server.pool import QUERY_CLASSES, QueryClass
+from server.response_cache import GZIP_MIN_BYTES, CachedResponse
+from server.scheduler import TickScheduler
+from server.serialization import dumps, loads
+from server.service import GameService, stress_session
+from server.sessions import DirectorySessionStore
 
 
 def build_service() -> GameService:
@@ -17,7 +24,20 @@ def build_service() -> GameService:
 
     if endpoint:
         try:
-            repository = AwanDbRepository(endpoint=endpoint, username=username, password=password)
+            query_classes = {}
+            for name, defaults in QUERY_CLASSES.items():
+                prefix = f"AWANDB_{name.upper()}_"
+                query_classes[name] = QueryClass(
+                    size=int(os.getenv(prefix + "POOL_SIZE", os.getenv("AWANDB_POOL_SIZE", "4") if name == "write" else defaults.size)),
+                    checkout_timeout=float(os.getenv(prefix + "TIMEOUT", defaults.checkout_timeout)),
+                    endpoint=os.getenv(prefix + "ENDPOINT"),
+                )
+            repository = AwanDbRepository(
+                endpoint=endpoint,
+                username=username,
+                password=password,
+                query_classes=query_classes,
+            )
             print(f"Using AwanDB repository at {endpoint}")
         except Exception as exc:
             print(f"Falling back to in-memory repository: {exc}")
@@ -25,7 +45,59 @@ def build_service() -> GameService:
     else:
         repository = InMemoryRepository()
 
-    return GameService(repository=repository)
+    export_dir = os.getenv("MMORTS_ARROW_EXPORT_DIR")
+    unit_state_interval = 0
+    if export_dir:
+        sink = ArrowFileSink(export_dir, fmt=os.getenv("MMORTS_ARROW_EXPORT_FORMAT", "arrow"))
+        repository = ArrowExportRepository(repository, sink)
+        unit_state_interval = int(os.getenv("MMORTS_UNIT_STATE_INTERVAL", "10"))
+        print(f"Exporting action_log/unit_state Arrow batches to {export_dir}")
+
+    hibernate_dir = os.getenv("MMORTS_HIBERNATE_DIR")
+    idle_ttl = os.getenv("MMORTS_SESSION_IDLE_TTL")
+    max_resident = os.getenv("MMORTS_MAX_RESIDENT_SESSIONS")
+    max_units = os.getenv("MMORTS_MAX_RESIDENT_UNITS")
+    history_dir = os.getenv("MMORTS_SNAPSHOT_HISTORY_DIR")
+    history = None
+    if history_dir:
+        history = SnapshotHistory(history_dir, keyframe_interval=int(os.getenv("MMORTS_SNAPSHOT_KEYFRAME_INTERVAL", "50")))
+    scheduler = None
+    tick_rate = os.getenv("MMORTS_TICK_RATE")
+    if tick_rate:
+        scheduler = TickScheduler(
+            tick_rate=float(tick_rate),
+            workers=int(os.getenv("MMORTS_TICK_WORKERS", str(os.cpu_count() or 1))),
+            processes=os.getenv("MMORTS_TICK_MODE", "thread") == "process",
+            idle_after=float(os.getenv("MMORTS_TICK_IDLE_AFTER", "30")),
+        )
+    admission = None
+    if os.getenv("MMORTS_ADMISSION", "on") != "off":
+        classes = dict(ADMISSION_CLASSES)
+        for name, limits in loads(os.getenv("MMORTS_ADMISSION_CLASSES", "{}")).items():
+            classes[name] = AdmissionPolicy(**limits)
+        admission = AdmissionController(classes, default_class=os.getenv("MMORTS_ADMISSION_DEFAULT_CLASS", "standard"))
+    service = GameService(
+        repository=repository,
+        unit_state_interval=unit_state_interval,
+        session_store=DirectorySessionStore(hibernate_dir) if hibernate_dir else None,
+        session_idle_ttl=float(idle_ttl) if idle_ttl else None,
+        max_resident_sessions=int(max_resident) if max_resident else None,
+        max_resident_units=int(max_units) if max_units else None,
+        admission=admission,
+        history=history,
+        scheduler=scheduler,
+        spectators=os.getenv("MMORTS_SPECTATORS", "on") != "off",
+    )
+    if idle_ttl:
+        service.sessions.start_sweeper(min(60.0, float(idle_ttl) / 2))
+    if scheduler is not None:
+        scheduler.start()
+        print(f"Ticking active sessions at {tick_rate} Hz on {scheduler.workers} {scheduler.metrics()['mode']} workers")
+    stress_units = os.getenv("MMORTS_STRESS_UNITS")
+    if stress_units:
+        service.sessions.add(stress_session(int(stress_units)))
+        print(f"Serving a {stress_units}-unit stress session as 'stress'")
+    return service
 
 
 SERVICE = build_service()
@@ -42,6 +114,18 @@ class RequestHandler(BaseHTTPRequestHandler):
         if self.path == "/snapshot":
             self._handle_snapshot()
             return
+        if self.path == "/views":
+            self._handle_view_subscribe()
+            return
+        if self.path == "/views/close":
+            self._handle_view_close()
+            return
+        if self.path == "/sessions":
+            self._handle_session_create()
+            return
+        if self.path == "/sessions/close":
+            self._handle_session_close()
+            return
         self._send_json(404, {"error": "not found"})
 
     def do_GET(self) -> None:  # noqa: N802
@@ -53,7 +137,22 @@ class RequestHandler(BaseHTTPRequestHandler):
             self._handle_metrics(parsed)
             return
         if parsed.path == "/sessions":
-            self._send_json(200, SERVICE.list_sessions())
+            self._handle_sessions(parsed)
+            return
+        if parsed.path == "/views":
+            self._handle_view_poll(parsed)
+            return
+        if parsed.path == "/analytics":
+            self._handle_analytics(parsed)
+            return
+        if parsed.path.startswith("/maps/"):
+            self._handle_map(parsed)
+            return
+        if parsed.path.startswith("/snapshots/"):
+            self._handle_snapshot_history(parsed)
+            return
+        if parsed.path == "/analytics/breakdown":
+            self._handle_breakdown(parsed)
             return
         self._send_json(404, {"error": "not found"})
 
@@ -62,12 +161,15 @@ class RequestHandler(BaseHTTPRequestHandler):
         if payload is None:
             return
         try:
-            action = ActionRequest(**payload)
-        except TypeError as exc:
+            action = ActionRequest.from_payload(payload)
+        except (TypeError, ValueError) as exc:
             self._send_json(400, {"error": f"invalid action payload: {exc}"})
             return
 
         result = SERVICE.submit_action(action)
+        if "retry_after" in result:
+            self._send_json(429, result, {"Retry-After": str(max(1, math.ceil(result["retry_after"])))})
+            return
         self._send_json(200, result)
 
     def _handle_bot_tick(self) -> None:
@@ -80,6 +182,9 @@ class RequestHandler(BaseHTTPRequestHandler):
 
         session_id = payload["session_id"]
         tick = int(payload["tick"])
+        if not 0 <= tick <= MAX_TICK:
+            self._send_json(400, {"error": f"tick must be from 0 to {MAX_TICK}"})
+            return
         result = SERVICE.tick_bots(session_id=session_id, tick=tick)
         self._send_json(200, {"bot_results": result})
 
@@ -97,14 +202,106 @@ class RequestHandler(BaseHTTPRequestHandler):
         status = 200 if "error" not in result else 404
         self._send_json(status, result)
 
+    def _handle_sessions(self, parsed) -> None:
+        query = parse_qs(parsed.query)
+
+        def param(name: str, cast=str):
+            values = query.get(name)
+            return cast(values[0]) if values else None
+
+        try:
+            result = SERVICE.list_sessions(
+                limit=param("limit", int) or 100,
+                cursor=param("cursor"),
+                map_name=param("map"),
+                min_players=param("min_players", int),
+                max_players=param("max_players", int),
+                active_within=param("active_within", float),
+                status=param("status"),
+            )
+        except ValueError as exc:
+            self._send_json(400, {"error": f"invalid query: {exc}"})
+            return
+        self._send_json(200, result)
+
+    def _handle_session_create(self) -> None:
+        payload = self._read_json_body()
+        if payload is None:
+            return
+        players = payload.get("players", [])
+        bots = payload.get("bots", [])
+        if not payload.get("map") or not isinstance(players, list) or not isinstance(bots, list):
+            self._send_json(400, {"error": "map is required; players and bots must be lists of ids"})
+            return
+        result = SERVICE.create_session(
+            map_name=payload["map"],
+            players=[str(pid) for pid in players],
+            bots=[str(pid) for pid in bots],
+            session_id=payload.get("session_id"),
+            session_class=payload.get("session_class"),
+        )
+        self._send_json(201 if "error" not in result else 400, result)
+
+    def _handle_session_close(self) -> None:
+        payload = self._read_json_body()
+        if payload is None:
+            return
+        if not payload.get("session_id"):
+            self._send_json(400, {"error": "session_id is required"})
+            return
+        result = SERVICE.close_session(payload["session_id"])
+        self._send_json(200 if result["closed"] else 404, result)
+
+    def _handle_view_subscribe(self) -> None:
+        payload = self._read_json_body()
+        if payload is None:
+            return
+        if not payload.get("session_id") or not payload.get("subscriber_id"):
+            self._send_json(400, {"error": "session_id and subscriber_id are required"})
+            return
+        try:
+            result = SERVICE.subscribe_view(
+                session_id=payload["session_id"],
+                subscriber_id=payload["subscriber_id"],
+                x=int(payload.get("x", 0)),
+                y=int(payload.get("y", 0)),
+                width=int(payload.get("width", 0)),
+                height=int(payload.get("height", 0)),
+                radius=int(payload.get("radius", 0)),
+                player_id=payload.get("player_id"),
+            )
+        except (TypeError, ValueError) as exc:
+            self._send_json(400, {"error": f"invalid viewport: {exc}"})
+            return
+        self._send_json(200 if "error" not in result else 400, result)
+
+    def _handle_view_poll(self, parsed) -> None:
+        query = parse_qs(parsed.query)
+        session_id = query.get("session_id", [""])[0]
+        subscriber_id = query.get("subscriber_id", [""])[0]
+        if not session_id or not subscriber_id:
+            self._send_json(400, {"error": "session_id and subscriber_id are required"})
+            return
+        result = SERVICE.poll_view(session_id=session_id, subscriber_id=subscriber_id)
+        self._send_json(200 if "error" not in result else 404, result)
+
+    def _handle_view_close(self) -> None:
+        payload = self._read_json_body()
+        if payload is None:
+            return
+        if not payload.get("session_id") or not payload.get("subscriber_id"):
+            self._send_json(400, {"error": "session_id and subscriber_id are required"})
+            return
+        self._send_json(200, SERVICE.unsubscribe_view(payload["session_id"], payload["subscriber_id"]))
+
     def _handle_state(self, parsed) -> None:
         query = parse_qs(parsed.query)
         session_id = query.get("session_id", [""])[0]
         if not session_id:
             self._send_json(400, {"error": "session_id is required"})
             return
-        result = SERVICE.get_state(session_id=session_id)
-        self._send_json(200, result)
+        player_id = query.get("player_id", [None])[0]
+        self._send_cached(SERVICE.state_response(session_id=session_id, player_id=player_id))
 
     def _handle_metrics(self, parsed) -> None:
         query = parse_qs(parsed.query)
@@ -112,25 +309,109 @@ class RequestHandler(BaseHTTPRequestHandler):
         if not session_id:
             self._send_json(400, {"error": "session_id is required"})
             return
-        self._send_json(200, SERVICE.get_metrics(session_id=session_id))
+        self._send_cached(SERVICE.metrics_response(session_id=session_id))
+
+    def _handle_map(self, parsed) -> None:
+        query = parse_qs(parsed.query)
+        try:
+            width = int(query["width"][0]) if "width" in query else None
+            height = int(query["height"][0]) if "height" in query else None
+        except ValueError as exc:
+            self._send_json(400, {"error": f"invalid query: {exc}"})
+            return
+        response = SERVICE.map_response(unquote(parsed.path[len("/maps/") :]), width, height)
+        # A request naming the current hash is a content-addressed URL and never changes.
+        immutable = response.status == 200 and query.get("hash", [None])[0] == response.etag.strip('"')
+        self._send_cached(response, "public, max-age=31536000, immutable" if immutable else "no-cache")
+
+    def _handle_snapshot_history(self, parsed) -> None:
+        session_id = unquote(parsed.path[len("/snapshots/") :])
+        query = parse_qs(parsed.query)
+        try:
+            tick = int(query["tick"][0]) if "tick" in query else None
+        except ValueError as exc:
+            self._send_json(400, {"error": f"invalid query: {exc}"})
+            return
+        result = SERVICE.get_snapshot(session_id, tick)
+        if "error" not in result:
+            self._send_json(200, result)
+        else:
+            self._send_json(400 if result["error"].startswith("no snapshot") else 404, result)
+
+    def _handle_analytics(self, parsed) -> None:
+        query = parse_qs(parsed.query)
+        session_id = query.get("session_id", [""])[0]
+        if not session_id:
+            self._send_json(400, {"error": "session_id is required"})
+            return
+        try:
+            from_tick = int(query["from_tick"][0]) if "from_tick" in query else None
+            to_tick = int(query["to_tick"][0]) if "to_tick" in query else None
+        except ValueError as exc:
+            self._send_json(400, {"error": f"invalid query: {exc}"})
+            return
+        result = SERVICE.get_analytics(session_id, from_tick, to_tick)
+        if "error" not in result:
+            self._send_json(200, result)
+        else:
+            self._send_json(404 if result["error"] == "session not found" else 400, result)
+
+    def _handle_breakdown(self, parsed) -> None:
+        query = parse_qs(parsed.query)
+        session_id = query.get("session_id", [""])[0]
+        if not session_id:
+            self._send_json(400, {"error": "session_id is required"})
+            return
+        result = SERVICE.get_breakdown(session_id, query.get("by", ["player"])[0])
+        if "error" not in result:
+            self._send_json(200, result)
+        else:
+            self._send_json(404 if result["error"] == "session not found" else 400, result)
 
     def _read_json_body(self) -> dict | None:
         content_length = int(self.headers.get("Content-Length", 0))
         raw_body = self.rfile.read(content_length)
         try:
-            return json.loads(raw_body.decode("utf-8"))
-        except json.JSONDecodeError:
+            return loads(raw_body)
+        except ValueError:
             self._send_json(400, {"error": "invalid json body"})
             return None
 
     def log_message(self, format: str, *args) -> None:
         return
 
-    def _send_json(self, status_code: int, payload: dict) -> None:
-        body = json.dumps(payload).encode("utf-8")
+    def _send_json(self, status_code: int, payload: dict, headers: dict | None = None) -> None:
+        body = dumps(payload)
         self.send_response(status_code)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_cached(self, response: CachedResponse, cache_control: str = "no-cache") -> None:
+        """Sends a cached body: 304 when ``If-None-Match`` matches its ETag, gzip when accepted."""
+        if response.matches(self.headers.get("If-None-Match")):
+            self.send_response(304)
+            self.send_header("ETag", response.etag)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            return
+        body = response.body
+        gzipped = len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = response.gzipped()
+        self.send_response(response.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", response.etag)
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("Vary", "Accept-Encoding")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
         self.wfile.write(body)
 
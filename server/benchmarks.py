@@ -0,0 +1,929 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+from server.domain import ActionRequest, GameSession, PlayerState
+from server.interest import InterestManager, Viewport
+from server.models import UNIT_MODELS, MapModel
+from server.pathfinding import terrain_allowed
+from server.persistence import ACTION_LOG_COLUMNS, action_row, rows_to_batch
+from server.sessions import synthetic_session
+from server.visibility import VisibilityIndex
+
+
+def _jitter_units(session: GameSession, rng: random.Random, fraction: float) -> None:
+    units = list(session.units.values())
+    for unit in rng.sample(units, max(1, int(len(units) * fraction))):
+        unit.x = min(session.game_map.width - 1, max(0, unit.x + rng.choice((-1, 1))))
+
+
+def _sample_rows(rows: int) -> list:
+    action_types = ("move", "fire", "mine", "spawn_unit")
+    return [
+        action_row(
+            ActionRequest(f"s-{i % 16}", f"p-{i % 64}", i, action_types[i % 4], unit_id=f"u-{i % 512}", target_x=i % 20, target_y=i % 17),
+            accepted=i % 5 != 0,
+            reason="accepted" if i % 5 != 0 else "target out of range",
+        )
+        for i in range(rows)
+    ]
+
+
+def _start_flight_stand_in():
+    """Local Flight server that counts rows from DoPut batches and per-row ``insert`` actions."""
+    import pyarrow.flight as flight
+
+    class FlightStandIn(flight.FlightServerBase):
+        def __init__(self) -> None:
+            super().__init__("grpc://127.0.0.1:0")
+            self.rows = 0
+
+        def do_put(self, context, descriptor, reader, writer):
+            for chunk in reader:
+                self.rows += chunk.data.num_rows
+
+        def do_action(self, context, action):
+            if action.type == "insert":
+                self.rows += 1
+            return []
+
+    server = FlightStandIn()
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    return server, flight.FlightClient(f"grpc://127.0.0.1:{server.port}")
+
+
+def bench_arrow_ingest(rows: int = 20000, batch_rows: int = 4096) -> dict:
+    import pyarrow.flight as flight
+
+    sample = _sample_rows(rows)
+    server, client = _start_flight_stand_in()
+    try:
+        start = time.perf_counter()
+        for row in sample:
+            list(client.do_action(flight.Action("insert", json.dumps(row).encode("utf-8"))))
+        per_row_seconds = time.perf_counter() - start
+        per_row_received = server.rows
+
+        server.rows = 0
+        start = time.perf_counter()
+        descriptor = flight.FlightDescriptor.for_path("action_log")
+        first = rows_to_batch(ACTION_LOG_COLUMNS, sample[:batch_rows])
+        writer, _ = client.do_put(descriptor, first.schema)
+        writer.write_batch(first)
+        for offset in range(batch_rows, rows, batch_rows):
+            writer.write_batch(rows_to_batch(ACTION_LOG_COLUMNS, sample[offset : offset + batch_rows]))
+        writer.close()
+        arrow_seconds = time.perf_counter() - start
+        arrow_received = server.rows
+    finally:
+        server.shutdown()
+
+    return {
+        "rows": rows,
+        "batch_rows": batch_rows,
+        "per_row_insert_rows_per_sec": round(per_row_received / per_row_seconds),
+        "arrow_doput_rows_per_sec": round(arrow_received / arrow_seconds),
+        "speedup": round(per_row_seconds / arrow_seconds, 1),
+    }
+
+
+def bench_visibility(players: int = 300, units_per_player: int = 10, ticks: int = 20, moving_fraction: float = 0.05) -> dict:
+    rng = random.Random(3)
+    session = synthetic_session(players=players, units_per_player=units_per_player)
+    index = VisibilityIndex(session.game_map.width, session.game_map.height)
+
+    start = time.perf_counter()
+    index.rebuild(session)
+    full_rebuild_ms = 1000 * (time.perf_counter() - start)
+
+    incremental = 0.0
+    updated = 0
+    for _ in range(ticks):
+        _jitter_units(session, rng, moving_fraction)
+        start = time.perf_counter()
+        updated += index.refresh(session)
+        incremental += time.perf_counter() - start
+
+    start = time.perf_counter()
+    visible = sum(len(index.visible_unit_ids(session, pid)) for pid in session.players)
+    query_seconds = time.perf_counter() - start
+
+    return {
+        "players": players,
+        "units": len(session.units),
+        "map": f"{session.game_map.width}x{session.game_map.height}",
+        "full_rebuild_ms": round(full_rebuild_ms, 2),
+        "incremental_refresh_ms_per_tick": round(1000 * incremental / ticks, 3),
+        "discs_updated_per_tick": updated // ticks,
+        "per_player_query_us": round(1e6 * query_seconds / players, 1),
+        "avg_visible_units_per_player": round(visible / players, 1),
+    }
+
+
+def bench_interest(viewers: int = 200, ticks: int = 10, moving_fraction: float = 0.05) -> dict:
+    rng = random.Random(5)
+    session = synthetic_session(players=100, units_per_player=50)
+    views = InterestManager()
+    for i in range(viewers):
+        views.subscribe(f"v-{i}", Viewport(rng.randrange(0, 96), rng.randrange(0, 96), 32, 24))
+    for i in range(viewers):
+        views.poll(session, f"v-{i}")
+
+    full_bytes = 0
+    full_seconds = 0.0
+    delta_bytes = 0
+    delta_seconds = 0.0
+    for _ in range(ticks):
+        _jitter_units(session, rng, moving_fraction)
+        session.version += 1
+        start = time.perf_counter()
+        for _ in range(viewers):
+            full_bytes += len(json.dumps(session.state_payload()))
+        full_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(viewers):
+            delta_bytes += len(json.dumps(views.poll(session, f"v-{i}")))
+        delta_seconds += time.perf_counter() - start
+
+    polls = viewers * ticks
+    return {
+        "units": len(session.units),
+        "viewers": viewers,
+        "full_state_bytes_per_poll": full_bytes // polls,
+        "aoi_delta_bytes_per_poll": delta_bytes // polls,
+        "full_state_us_per_poll": round(1e6 * full_seconds / polls, 1),
+        "aoi_delta_us_per_poll": round(1e6 * delta_seconds / polls, 1),
+    }
+
+
+def bench_bots(bots: int = 50, units_per_bot: int = 60, ticks: int = 10) -> dict:
+    from server.persistence import InMemoryRepository
+    from server.service import GameService
+
+    session = synthetic_session(players=bots, units_per_player=units_per_bot)
+    service = GameService(repository=InMemoryRepository(), sessions={session.session_id: session})
+    start = time.perf_counter()
+    orders = 0
+    for tick in range(1, ticks + 1):
+        orders += sum(result["orders"] for result in service.tick_bots(session.session_id, tick))
+    seconds = time.perf_counter() - start
+    return {
+        "bots": bots,
+        "units": len(session.units),
+        "orders_per_tick": orders // ticks,
+        "ms_per_tick": round(1000 * seconds / ticks, 2),
+        "orders_per_sec": round(orders / seconds),
+        "last_tick": service.bot_stats[session.session_id],
+    }
+
+
+def bench_vector_env(steps: int = 50) -> dict:
+    import numpy as np
+
+    from server.env import VectorEnv
+
+    results = {}
+    for num_envs in (1, 16, 256):
+        env = VectorEnv(num_envs, seed=1)
+        env.reset()
+        rng = np.random.default_rng(0)
+        start = time.perf_counter()
+        for _ in range(steps):
+            actions = np.stack(
+                [rng.integers(0, 4, num_envs), rng.integers(0, 8, num_envs), rng.integers(0, 20, num_envs), rng.integers(0, 20, num_envs)],
+                axis=1,
+            )
+            env.step(actions)
+        seconds = time.perf_counter() - start
+        results[f"K={num_envs}"] = {"env_steps_per_sec": round(num_envs * steps / seconds, 1), "batch_steps_per_sec": round(steps / seconds, 1)}
+    return results
+
+
+def bench_volley(shooters: int = 1000, rounds: int = 3) -> dict:
+    rng = random.Random(9)
+    session = synthetic_session(players=2, units_per_player=shooters, size=96)
+    shots = 0
+    hits = 0
+    seconds = 0.0
+    for tick in range(1, rounds + 1):
+        orders = []
+        for unit in session.units_of("p-0"):
+            reach = UNIT_MODELS[unit.unit_type].attack_range
+            tx = min(session.game_map.width - 1, max(0, unit.x + rng.randint(-reach, reach) // 2))
+            ty = min(session.game_map.height - 1, max(0, unit.y + rng.randint(-reach, reach) // 2))
+            orders.append(ActionRequest(session.session_id, "p-0", tick, "fire", unit_id=unit.unit_id, target_x=tx, target_y=ty))
+        start = time.perf_counter()
+        results = session.apply_batch("p-0", tick, orders)
+        seconds += time.perf_counter() - start
+        shots += len(orders)
+        hits += sum(1 for result in results if "hits" in result.reason)
+    return {
+        "shooters": shooters,
+        "units": len(session.units),
+        "shots": shots,
+        "hits": hits,
+        "shots_per_sec": round(shots / seconds),
+        "ms_per_volley": round(1000 * seconds / rounds, 2),
+    }
+
+
+def bench_movement(units: int = 1000, ticks: int = 15, distance: int = 30) -> dict:
+    results = {}
+    for mode in ("resubmit", "persistent"):
+        session = synthetic_session(players=1, units_per_player=units, size=128, seed=5)
+        game_map = session.game_map
+        taken = {(u.x, u.y) for u in session.units.values()}
+        goals = {}
+        for unit in sorted(session.units.values(), key=lambda u: u.unit_id):
+            goal = (unit.x, (unit.y + distance) % game_map.height)
+            if goal not in taken and terrain_allowed(unit.domain, game_map.tile(*goal)):
+                goals[unit.unit_id] = goal
+                taken.add(goal)
+
+        actions = 0
+        start = time.perf_counter()
+        for tick in range(1, ticks + 1):
+            if mode == "persistent" and tick > 1:
+                session.advance_movement(tick)
+                session.tick = tick
+                continue
+            orders = []
+            for unit_id, (gx, gy) in goals.items():
+                unit = session.units[unit_id]
+                if (unit.x, unit.y) == (gx, gy):
+                    continue
+                if mode == "resubmit":
+                    step = UNIT_MODELS[unit.unit_type].speed
+                    gy = unit.y + max(-step, min(step, gy - unit.y))
+                orders.append(ActionRequest(session.session_id, "p-0", tick, "move", unit_id=unit_id, target_x=gx, target_y=gy))
+            actions += len(orders)
+            session.apply_batch("p-0", tick, orders)
+        seconds = time.perf_counter() - start
+        arrived = sum(1 for unit_id, goal in goals.items() if (session.units[unit_id].x, session.units[unit_id].y) == goal)
+        results[mode] = {
+            "actions": actions,
+            "ms_per_tick": round(1000 * seconds / ticks, 2),
+            "arrived": arrived,
+            **session.movement_stats,
+        }
+    results["orders"] = len(goals)
+    return results
+
+
+def bench_rally(units: int = 200, spread: int = 10, seed: int = 3) -> dict:
+    rng = random.Random(seed)
+    session = synthetic_session(players=1, units_per_player=units, size=64, seed=seed)
+    cx, cy = 16, 32
+    orders = [
+        ActionRequest(session.session_id, "p-0", 1, "move", unit_id=unit.unit_id, target_x=cx + rng.randint(-spread, spread), target_y=cy + rng.randint(-spread, spread))
+        for unit in session.units_of("p-0")
+    ]
+    start = time.perf_counter()
+    results = session.apply_batch("p-0", 1, orders)
+    seconds = time.perf_counter() - start
+    reasons = {}
+    for result in results:
+        key = result.reason.split(":")[0]
+        reasons[key] = reasons.get(key, 0) + 1
+    return {
+        "orders": len(orders),
+        "accepted": sum(1 for result in results if result.accepted),
+        "reasons": reasons,
+        "resolve_ms": round(1000 * seconds, 2),
+        "goal_shifts": session.movement_stats["goal_shifts"],
+    }
+
+
+def bench_map_memory(sessions: int = 500, map_name: str = "plains") -> dict:
+    import tracemalloc
+
+    from server.maps import _TEMPLATES, get_map
+
+    build_uncached = _TEMPLATES[map_name].__wrapped__
+    get_map(map_name)
+    results = {}
+    for mode, factory in (("copied_terrain", lambda: MapModel(build_uncached())), ("shared_template", lambda: get_map(map_name))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        maps = [factory() for _ in range(sessions)]
+        seconds = time.perf_counter() - start
+        for game_map in maps[::2]:
+            for coord in list(game_map.template.resources)[:4]:
+                game_map.take_resource(coord, 25)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[mode] = {"bytes_per_session": size // sessions, "us_per_session": round(1e6 * seconds / sessions, 1)}
+        del maps
+    results["sessions"] = sessions
+    results["map"] = map_name
+    return results
+
+
+def bench_sessions(sessions: int = 1000, units_per_bot: int = 20, max_resident: int = 50) -> dict:
+    import tracemalloc
+
+    from server.offline_sim import build_headless_session
+    from server.sessions import SessionManager
+
+    results = {}
+    for mode, cap in (("all_resident", None), ("lru_hibernation", max_resident)):
+        tracemalloc.start()
+        manager = SessionManager(max_resident=cap)
+        start = time.perf_counter()
+        for seed in range(sessions):
+            manager.add(build_headless_session(seed, units_per_bot=units_per_bot))
+        seconds = time.perf_counter() - start
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        restore_start = time.perf_counter()
+        for seed in range(0, sessions, max(1, sessions // 100)):
+            manager.get(f"headless-{seed}")
+        restore_seconds = time.perf_counter() - restore_start
+        results[mode] = {
+            "traced_mb": round(size / 1e6, 2),
+            "bytes_per_session": size // sessions,
+            "create_us_per_session": round(1e6 * seconds / sessions, 1),
+            "access_ms": round(1000 * restore_seconds / 100, 3),
+            **manager.metrics(),
+        }
+    results["sessions"] = sessions
+    return results
+
+
+def bench_session_list(sessions: int = 10000, pages: int = 50, limit: int = 50) -> dict:
+    from server.maps import get_map
+    from server.sessions import SessionManager, session_summary
+
+    maps = ("islands", "desert", "archipelago")
+    manager = SessionManager(
+        {
+            f"s-{i:05d}": GameSession(
+                f"s-{i:05d}", 0, get_map(maps[i % 3]), {f"p-{j}": PlayerState(f"p-{j}", is_bot=j == 0) for j in range(2 + i % 6)}, {}
+            )
+            for i in range(sessions)
+        }
+    )
+    resident = list(manager._resident.values())
+
+    start = time.perf_counter()
+    for _ in range(pages):
+        summaries = sorted((session_summary(session) for session in resident), key=lambda x: x["session_id"])[:limit]
+    rescan = (time.perf_counter() - start) / pages
+
+    start = time.perf_counter()
+    cursor = None
+    for _ in range(pages):
+        _, cursor = manager.page(limit=limit, cursor=cursor)
+    indexed = (time.perf_counter() - start) / pages
+
+    start = time.perf_counter()
+    for _ in range(pages):
+        manager.page(limit=limit, map_name="desert", min_players=5)
+    filtered = (time.perf_counter() - start) / pages
+    return {
+        "sessions": sessions,
+        "page_size": limit,
+        "rescan_ms_per_call": round(1000 * rescan, 3),
+        "indexed_ms_per_page": round(1000 * indexed, 3),
+        "indexed_filtered_ms_per_page": round(1000 * filtered, 3),
+        "rows_last_page": len(summaries),
+    }
+
+
+def bench_state_poll(players: int = 20, units_per_player: int = 50, polls: int = 200, writes_every: int = 20) -> dict:
+    """Viewers polling ``/state`` and ``/metrics``: rebuild + ``json.dumps`` per poll vs version-keyed cached bytes."""
+    from server.persistence import InMemoryRepository
+    from server.service import GameService
+
+    session = synthetic_session(players, units_per_player)
+    service = GameService(repository=InMemoryRepository(), sessions={session.session_id: session})
+    mover = next(unit for unit in session.units.values() if unit.owner_player_id == "p-0")
+
+    def write(tick: int) -> None:
+        service.submit_action(ActionRequest(session.session_id, "p-0", tick, "stop", unit_id=mover.unit_id))
+
+    start = time.perf_counter()
+    for i in range(polls):
+        if i % writes_every == 0:
+            write(i + 1)
+        json.dumps(service.get_state(session.session_id)).encode("utf-8")
+        json.dumps(service.get_metrics(session.session_id)).encode("utf-8")
+    uncached = (time.perf_counter() - start) / polls
+
+    start = time.perf_counter()
+    for i in range(polls):
+        if i % writes_every == 0:
+            write(polls + i + 1)
+        body = service.state_response(session.session_id)
+        service.metrics_response(session.session_id)
+    cached = (time.perf_counter() - start) / polls
+    return {
+        "units": len(session.units),
+        "polls": polls,
+        "writes_every": writes_every,
+        "state_bytes": len(body.body),
+        "state_gzip_bytes": len(body.gzipped()),
+        "uncached_ms_per_poll": round(1000 * uncached, 3),
+        "cached_ms_per_poll": round(1000 * cached, 3),
+        "cache": service.responses.metrics(),
+    }
+
+
+def bench_serialization(unit_counts: tuple = (1000, 10000), rounds: int = 20, moving_fraction: float = 0.05) -> dict:
+    """ms per full ``/state`` encode at 1k and 10k units, plus per-action byte counting."""
+    from dataclasses import asdict
+
+    from server.serialization import ENCODER, action_wire_size, dumps, encode_state
+
+    def timed(fn, repeat: int = rounds) -> float:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return round(1000 * (time.perf_counter() - start) / repeat, 3)
+
+    rng = random.Random(5)
+    results = {"encoder": ENCODER}
+    for units in unit_counts:
+        session = synthetic_session(players=100, units_per_player=units // 100)
+        encode_state(session)
+
+        def cold() -> bytes:
+            session._wire_fragments = None
+            return encode_state(session)
+
+        jitter_ms = timed(lambda: _jitter_units(session, rng, moving_fraction))
+        results[f"{units}_units"] = {
+            "bytes": len(encode_state(session)),
+            "stdlib_dumps_ms": timed(lambda: json.dumps(session.state_payload()).encode("utf-8")),
+            "encoder_dumps_ms": timed(lambda: dumps(session.state_payload())),
+            "direct_cold_ms": timed(cold),
+            "direct_idle_ms": timed(lambda: encode_state(session)),
+            "direct_moved_ms": round(timed(lambda: (_jitter_units(session, rng, moving_fraction), encode_state(session))) - jitter_ms, 3),
+        }
+
+    actions = [ActionRequest("bench", f"p-{i % 50}", i, "move", unit_id=f"u-{i}", target_x=i % 97, target_y=i % 89) for i in range(20000)]
+    results["action_bytes_20k"] = {
+        "asdict_dumps_ms": timed(lambda: [len(json.dumps(asdict(action))) for action in actions], 3),
+        "wire_size_ms": timed(lambda: [action_wire_size(action) for action in actions], 3),
+    }
+    return results
+
+
+def bench_action_alloc(actions: int = 20000, units: int = 10000) -> dict:
+    """tracemalloc bytes retained per parsed action, per logged action row and per restored unit."""
+    import gc
+    import tracemalloc
+
+    from server.persistence import InMemoryRepository
+    from server.snapshot import session_from_dict, session_to_dict
+
+    bodies = [
+        json.dumps(
+            {"session_id": "bench", "player_id": f"p-{i % 50}", "tick": i, "action_type": "move", "unit_id": f"u-{i % 1000}", "target_x": i % 97, "target_y": i % 89}
+        )
+        for i in range(actions)
+    ]
+    payloads = [json.loads(body) for body in bodies]
+    session = synthetic_session(players=100, units_per_player=units // 100)
+    image = json.loads(json.dumps(session_to_dict(session)))
+    repository = InMemoryRepository()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        parsed = [ActionRequest.from_payload(payload) for payload in payloads]
+        after_parse = tracemalloc.get_traced_memory()[0]
+        for action in parsed:
+            repository.persist_action(action, True, "accepted")
+        after_log = tracemalloc.get_traced_memory()[0]
+        restored = session_from_dict(image)
+        after_restore = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return {
+        "bytes_per_action": round((after_parse - before) / actions, 1),
+        "bytes_per_logged_row": round((after_log - after_parse) / actions, 1),
+        "bytes_per_restored_unit": round((after_restore - after_log) / len(restored.units), 1),
+        "snapshot_bytes_per_unit": round(len(json.dumps(image)) / len(session.units), 1),
+    }
+
+
+def bench_rejections(actions: int = 20000, busy_seconds: float = 0.5, hold_ms: float = 20.0) -> dict:
+    """Rejected-action throughput through ``GameService.submit_action``, idle and while ticks hold the lock."""
+    from server.persistence import NullRepository
+    from server.service import GameService
+
+    service = GameService(repository=NullRepository())
+    service.submit_action(ActionRequest("demo", "p-1", 100, "stop", unit_id="u-1"))
+    invalid = [
+        ActionRequest("demo", "p-1", 5, "move", unit_id="u-1", target_x=5, target_y=5),
+        ActionRequest("demo", "p-2", 500, "move", unit_id="u-1", target_x=5, target_y=5),
+        ActionRequest("demo", "p-2", 500, "fire", unit_id="u-404", target_x=5, target_y=5),
+        ActionRequest("demo", "p-2", 500, "spawn_unit", unit_type="land_tank", target_x=-1, target_y=3),
+        ActionRequest("demo", "p-2", 500, "teleport", unit_id="u-2"),
+    ]
+
+    start = time.perf_counter()
+    for i in range(actions):
+        service.submit_action(invalid[i % len(invalid)])
+    idle = actions / (time.perf_counter() - start)
+
+    lock = service.sessions.lock("demo")
+    stop = threading.Event()
+
+    def ticker() -> None:
+        while not stop.is_set():
+            with lock:
+                time.sleep(hold_ms / 1000)
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=ticker)
+    thread.start()
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < busy_seconds:
+        service.submit_action(invalid[done % len(invalid)])
+        done += 1
+    busy = done / (time.perf_counter() - start)
+    stop.set()
+    thread.join()
+    return {
+        "rejected_per_sec_idle": round(idle),
+        "rejected_per_sec_while_ticking": round(busy),
+        "tick_hold_ms": hold_ms,
+        "reasons": sorted({service.submit_action(action)["reason"] for action in invalid}),
+    }
+
+
+def bench_admission(flood: int = 5000, victims: int = 200) -> dict:
+    """One client flooding ``submit_action`` next to well-behaved players: rows persisted and victim latency."""
+    from server.admission import AdmissionController
+    from server.persistence import InMemoryRepository
+    from server.service import GameService
+
+    def run(admission: AdmissionController | None) -> dict:
+        repository = InMemoryRepository()
+        service = GameService(repository=repository, admission=admission)
+        service.create_session("plains", ["flooder"], session_id="flooded")
+        service.create_session("plains", [f"p-{i}" for i in range(victims)], session_id="quiet")
+        start = time.perf_counter()
+        for tick in range(1, flood + 1):
+            service.submit_action(ActionRequest("flooded", "flooder", tick, "create_group", group_id=f"g-{tick}"))
+        flood_s = time.perf_counter() - start
+        start = time.perf_counter()
+        accepted = sum(
+            service.submit_action(ActionRequest("quiet", f"p-{i}", 1, "create_group", group_id="g"))["accepted"] for i in range(victims)
+        )
+        victim_ms = 1000 * (time.perf_counter() - start) / victims
+        return {
+            "flood_rows_persisted": len(repository._records) - accepted,
+            "flood_seconds": round(flood_s, 3),
+            "victim_ms_per_action": round(victim_ms, 3),
+            "victims_accepted": accepted,
+        }
+
+    return {"flood_actions": flood, "without_admission": run(None), "with_admission": run(AdmissionController())}
+
+
+def bench_query_classes(writes: int = 200, reporters: int = 4, report_ms: float = 20.0) -> dict:
+    """``persist_action`` latency while dashboards run slow breakdown reports on the write pool vs the analytics pool.
+
+    AwanDB is stood in for by sqlite files whose ``GROUP BY`` queries hold their connection an
+    extra ``report_ms``, as a scan over a large action log would.
+    """
+    import sqlite3
+    import tempfile
+    from pathlib import Path
+
+    from server.persistence import AwanDbRepository
+    from server.pool import PoolUnavailable
+
+    class Cursor:
+        def __init__(self, conn):
+            self.conn = conn
+            self.cursor = conn.cursor()
+
+        def execute(self, sql, params=()):
+            if "GROUP BY" in sql:
+                time.sleep(report_ms / 1000)
+            self.cursor.execute(sql, params)
+            self.conn.commit()
+
+        def fetchall(self):
+            return self.cursor.fetchall()
+
+    class Connection:
+        def __init__(self, path):
+            self.conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+
+        def cursor(self):
+            return Cursor(self.conn)
+
+        def close(self):
+            self.conn.close()
+
+    def run(shared_pool: bool) -> dict:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "awan.db")
+            repo = AwanDbRepository("grpc://unused", "admin", "admin", connect=lambda: Connection(path), checkout_timeout=0.05)
+            stop = threading.Event()
+
+            def report() -> None:
+                while not stop.is_set():
+                    if not shared_pool:
+                        repo.breakdown("bench", "player")
+                        continue
+                    try:
+                        with repo._pool.connection() as cursor:
+                            cursor.execute("SELECT player_id, COUNT(*) FROM action_log WHERE session_id = ? GROUP BY player_id", ("bench",))
+                            cursor.fetchall()
+                    except PoolUnavailable:
+                        pass
+
+            threads = [threading.Thread(target=report) for _ in range(reporters)]
+            for thread in threads:
+                thread.start()
+            latencies = []
+            for tick in range(1, writes + 1):
+                start = time.perf_counter()
+                repo.persist_action(ActionRequest("bench", f"p-{tick % 8}", tick, "stop", unit_id="u-1"), True, "accepted")
+                latencies.append(1000 * (time.perf_counter() - start))
+            stop.set()
+            for thread in threads:
+                thread.join()
+            latencies.sort()
+            return {
+                "write_ms_p50": round(latencies[len(latencies) // 2], 3),
+                "write_ms_p99": round(latencies[int(len(latencies) * 0.99)], 3),
+                "write_ms_max": round(latencies[-1], 3),
+                "write_pool_timeouts": repo.operational_metrics()["pool"]["timeouts"],
+            }
+
+    return {
+        "writes": writes,
+        "reporters": reporters,
+        "reports_on_write_pool": run(shared_pool=True),
+        "reports_on_analytics_pool": run(shared_pool=False),
+    }
+
+
+def bench_analytics(actions: int = 200_000, players: int = 50, queries: int = 20) -> dict:
+    """``GET /analytics`` over a long action log: scanning the log per query vs reading tick-bucketed rollups."""
+    from server.persistence import InMemoryRepository
+    from server.rollups import summarize
+
+    rng = random.Random(5)
+    types = ("move", "stop", "fire", "mine")
+    requests = [
+        ActionRequest("bench", f"p-{rng.randrange(players)}", tick // players + 1, rng.choice(types), unit_id="u-1", target_x=3, target_y=4)
+        for tick in range(actions)
+    ]
+    repository = InMemoryRepository()
+    start = time.perf_counter()
+    for i, request in enumerate(requests):
+        accepted = i % 7 != 0
+        repository.persist_action(request, accepted, "accepted" if accepted else "target out of bounds")
+    persist_us = 1e6 * (time.perf_counter() - start) / actions
+    last_tick = requests[-1].tick
+    bucket_ticks = repository.rollups.bucket_ticks
+
+    def scan(from_tick: int, to_tick: int) -> dict:
+        first, last = from_tick // bucket_ticks, to_tick // bucket_ticks
+        series, reasons, mix = {}, {}, {}
+        for row in repository._records:
+            bucket = row[2] // bucket_ticks
+            if row[0] != "bench" or not first <= bucket <= last:
+                continue
+            player_id, action_type, accepted, reason, network_bytes = row[1], row[3], row[10], row[11], row[12]
+            point = series.setdefault(bucket, [0, 0, 0])
+            point[0] += 1
+            point[1] += accepted
+            point[2] += network_bytes
+            if not accepted:
+                reasons[reason] = reasons.get(reason, 0) + 1
+            player_mix = mix.setdefault(player_id, {})
+            player_mix[action_type] = player_mix.get(action_type, 0) + 1
+        return summarize("bench", bucket_ticks, (series, reasons, mix))
+
+    def timed(query) -> float:
+        start = time.perf_counter()
+        for i in range(queries):
+            query(last_tick * i // (2 * queries), last_tick)
+        return 1000 * (time.perf_counter() - start) / queries
+
+    assert scan(0, last_tick) == repository.analytics("bench", 0, last_tick)
+    return {
+        "actions": actions,
+        "persist_us_per_action": round(persist_us, 3),
+        "scan_ms_per_query": round(timed(scan), 3),
+        "rollup_ms_per_query": round(timed(lambda a, b: repository.analytics("bench", a, b)), 3),
+    }
+
+
+def bench_history(players: int = 100, units_per_player: int = 20, ticks: int = 300, moving_fraction: float = 0.05, seeks: int = 50) -> dict:
+    """War-review storage per tick: indented full JSON snapshots vs keyframes + compressed diffs, and seek latency."""
+    from server.history import SnapshotHistory
+
+    rng = random.Random(3)
+    session = synthetic_session(players, units_per_player)
+    history = SnapshotHistory(keyframe_interval=50)
+    full_bytes = 0
+    record_s = 0.0
+    for tick in range(1, ticks + 1):
+        _jitter_units(session, rng, moving_fraction)
+        session.tick = tick
+        full_bytes += len(json.dumps({"state": session.state_payload()}, indent=2))
+        start = time.perf_counter()
+        history.record(session)
+        record_s += time.perf_counter() - start
+    for tick in range(seeks):
+        history.seek(session.session_id, rng.randrange(1, ticks + 1))
+    metrics = history.metrics()
+    return {
+        "units": len(session.units),
+        "ticks": ticks,
+        "full_json_bytes_per_tick": full_bytes // ticks,
+        "history_bytes_per_tick": metrics["bytes_per_tick"],
+        "record_ms_per_tick": round(1000 * record_s / ticks, 3),
+        "seek_ms_avg": metrics["seek_ms_avg"],
+        "seek_ms_max": metrics["seek_ms_max"],
+    }
+
+
+def bench_viewer(units: int = 10_000, ticks: int = 10, moving_fraction: float = 0.05, screen: tuple = (1280, 720), tile_px: int = 16) -> dict:
+    """Server side of the web viewer: a whole-map view subscription vs a screen-sized window (plus the
+    viewer's 8-tile margin), and the one-off terrain fetch. Browser frame time is shown in its HUD."""
+    from server.persistence import InMemoryRepository
+    from server.service import GameService, stress_session
+
+    rng = random.Random(9)
+    session = stress_session(units)
+    service = GameService(repository=InMemoryRepository(), sessions={"stress": session})
+    width, height = screen[0] // tile_px + 17, screen[1] // tile_px + 17
+    x, y = (session.game_map.width - width) // 2, (session.game_map.height - height) // 2
+    windows = {"full": (0, 0, 256, 256), "window": (x, y, width, height)}
+    subscribe_bytes = {}
+    in_view = {}
+    for name, (vx, vy, vw, vh) in windows.items():
+        delta = service.subscribe_view("stress", name, vx, vy, vw, vh)
+        subscribe_bytes[name] = len(json.dumps(delta))
+        in_view[name] = len(delta["enter"])
+    poll_bytes = dict.fromkeys(windows, 0)
+    poll_seconds = dict.fromkeys(windows, 0.0)
+    for _ in range(ticks):
+        _jitter_units(session, rng, moving_fraction)
+        session.version += 1
+        for name in windows:
+            start = time.perf_counter()
+            poll_bytes[name] += len(json.dumps(service.poll_view("stress", name)))
+            poll_seconds[name] += time.perf_counter() - start
+    info = session.game_map
+    return {
+        "units": len(session.units),
+        "map": f"{info.width}x{info.height}",
+        "window": f"{width}x{height}",
+        "map_bytes": len(service.map_response(info.name, info.width, info.height).body),
+        "full_units_in_view": in_view["full"],
+        "window_units_in_view": in_view["window"],
+        "full_subscribe_bytes": subscribe_bytes["full"],
+        "window_subscribe_bytes": subscribe_bytes["window"],
+        "full_poll_bytes": poll_bytes["full"] // ticks,
+        "window_poll_bytes": poll_bytes["window"] // ticks,
+        "full_poll_ms": round(1000 * poll_seconds["full"] / ticks, 3),
+        "window_poll_ms": round(1000 * poll_seconds["window"] / ticks, 3),
+    }
+
+
+def bench_map_encoding(sizes: tuple = (96, 512, 1024)) -> dict:
+    """``GET /maps`` bytes per plains size: terrain as one JSON string of tile codes per row vs the encoded blob."""
+    import gzip
+
+    from server.maps import describe_map, plains_template
+
+    results = {}
+    for size in sizes:
+        template = plains_template(size, size)
+        start = time.perf_counter()
+        description = describe_map(template)
+        encode_ms = 1000 * (time.perf_counter() - start)
+        rows = ["".join(str(int(tile == "water")) for tile in row) for row in template.terrain]
+        bodies = {
+            "rows": json.dumps({**description, "terrain": rows}).encode(),
+            "encoded": json.dumps(description).encode(),
+        }
+        results[f"{size}x{size}"] = {
+            "encoding": description["terrain_encoding"],
+            "rows_terrain_bytes": len(json.dumps(rows)),
+            "encoded_terrain_bytes": len(description["terrain"]),
+            **{f"{name}_body_bytes": len(body) for name, body in bodies.items()},
+            **{f"{name}_body_gzip_bytes": len(gzip.compress(body, compresslevel=5)) for name, body in bodies.items()},
+            "encode_ms": round(encode_ms, 2),
+        }
+    return results
+
+
+def bench_scheduler(active: int = 8, idle: int = 200, units_per_bot: int = 40, tick_rate: float = 10.0, seconds: float = 3.0, workers: int = 4) -> dict:
+    """Fixed-rate ticking of ``active`` bot sessions among ``idle`` ones: a driver that ticks every session
+    in turn each frame (what per-session ``POST /bots/tick`` callers amount to) vs ``TickScheduler``."""
+    from server.persistence import InMemoryRepository
+    from server.scheduler import TickScheduler
+    from server.service import GameService
+
+    def sessions() -> dict:
+        built = {}
+        for i in range(active + idle):
+            session = synthetic_session(players=4, units_per_player=units_per_bot if i < active else 2, size=64, seed=i)
+            session.session_id = f"s-{i}"
+            built[session.session_id] = session
+        return built
+
+    interval = 1.0 / tick_rate
+    active_ids = {f"s-{i}" for i in range(active)}
+    service = GameService(repository=InMemoryRepository(), sessions=sessions())
+    lags, ticks, started = [], 0, time.perf_counter()
+    frame = 0
+    while time.perf_counter() - started < seconds:
+        due = started + frame * interval
+        time.sleep(max(0.0, due - time.perf_counter()))
+        for session_id in list(service.sessions.session_ids()):
+            lags.append(time.perf_counter() - due)
+            service.tick_bots(session_id, frame + 1)
+            ticks += session_id in active_ids
+        frame += 1
+    driver_seconds = time.perf_counter() - started
+    lags.sort()
+
+    results = {
+        "driver": {
+            "active_ticks_per_sec": round(ticks / driver_seconds, 1),
+            "target_ticks_per_sec": active * tick_rate,
+            "lag_ms_p50": round(1000 * lags[len(lags) // 2], 1),
+            "lag_ms_max": round(1000 * lags[-1], 1),
+            "idle_ticks": frame * idle,
+        }
+    }
+    for mode in ("thread", "process"):
+        scheduler = TickScheduler(tick_rate=tick_rate, workers=workers, processes=mode == "process")
+        service = GameService(repository=InMemoryRepository(), sessions=sessions(), scheduler=scheduler)
+        for session_id in active_ids:
+            scheduler.wake(session_id)
+        scheduler.start()
+        time.sleep(seconds)
+        metrics = scheduler.metrics()
+        per_session = [scheduler.metrics(session_id)["session"] for session_id in active_ids]
+        scheduler.stop()
+        results[mode] = {
+            "active_ticks_per_sec": round(metrics["ticks"] / seconds, 1),
+            "target_ticks_per_sec": active * tick_rate,
+            "lag_ms_last_max": max(stats["lag_ms"] for stats in per_session),
+            "lag_ms_max": max(stats["lag_ms_max"] for stats in per_session),
+            "tick_ms_last_avg": round(sum(stats["tick_ms"] for stats in per_session) / active, 2),
+            "skipped_ticks": metrics["skipped_ticks"],
+            "utilization": metrics["utilization"],
+            "idle_ticks": 0,
+        }
+    return {"active": active, "idle": idle, "units_per_active_session": 4 * units_per_bot, "workers": workers, "cpus": os.cpu_count(), **results}
+
+
+BENCHMARKS = {
+    "arrow-ingest": bench_arrow_ingest,
+    "visibility": bench_visibility,
+    "interest": bench_interest,
+    "bots": bench_bots,
+    "vector-env": bench_vector_env,
+    "volley": bench_volley,
+    "movement": bench_movement,
+    "rally": bench_rally,
+    "map-memory": bench_map_memory,
+    "sessions": bench_sessions,
+    "session-list": bench_session_list,
+    "state-poll": bench_state_poll,
+    "serialization": bench_serialization,
+    "action-alloc": bench_action_alloc,
+    "rejections": bench_rejections,
+    "admission": bench_admission,
+    "query-classes": bench_query_classes,
+    "analytics": bench_analytics,
+    "history": bench_history,
+    "viewer": bench_viewer,
+    "map-encoding": bench_map_encoding,
+    "scheduler": bench_scheduler,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MMORTS micro-benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    args = parser.parse_args()
+    print(json.dumps(BENCHMARKS[args.benchmark](), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import random
+import time
+import zlib
+from concurrent.futures import Executor
+from typing import AbstractSet, Dict, List, Set, Tuple
+
+from server.domain import ActionRequest, GameSession, Unit
+from server.interest import SpatialHash
+from server.models import UNIT_MODELS
+from server.pathfinding import terrain_allowed
+
+Coord = Tuple[int, int]
+
+
+class BotPlanner:
+    """Plans one order for every unit a bot owns in a tick.
+
+    Units fire at the nearest attackable enemy in range, otherwise step towards the nearest enemy
+    they can see, otherwise wander. Enemy lookups go through a per-tick ``SpatialHash`` and the
+    owner index on ``GameSession``, so planning cost scales with the bot's own army rather than the
+    whole session. When ``deadline`` (a ``time.perf_counter`` value) passes, the remaining units
+    are deferred and planned first on the bot's next tick. Randomness is seeded from
+    ``(seed, session, player, tick)``, and ``plan_from`` only reads the occupied tiles and the
+    cursor it is given, so ``plan_bots`` gives the same plans whether bots plan one after another
+    or concurrently; ``settle_moves`` then drops move orders that claim a tile another bot took.
+    """
+
+    def __init__(self, seed: int = 7) -> None:
+        self.seed = seed
+        self._cursor: Dict[Tuple[str, str], int] = {}
+
+    def cursors(self, session_id: str) -> Dict[str, int]:
+        """Where each bot of the session resumes after a deferred tick (for planning in another process)."""
+        return {player_id: offset for (sid, player_id), offset in self._cursor.items() if sid == session_id}
+
+    def set_cursors(self, session_id: str, cursors: Dict[str, int]) -> None:
+        for key in [key for key in self._cursor if key[0] == session_id]:
+            del self._cursor[key]
+        self._cursor.update({(session_id, player_id): offset for player_id, offset in cursors.items() if offset})
+
+    def plan_bots(
+        self,
+        session: GameSession,
+        bots: List[str],
+        tick: int,
+        deadline: float | None = None,
+        pool: Executor | None = None,
+    ) -> List[Tuple[List[ActionRequest], int]]:
+        """Plans every bot in ``bots`` for ``tick``, on ``pool`` when given; cursors are advanced afterwards."""
+        index = SpatialHash()
+        index.rebuild(session)
+        occupied = frozenset((unit.x, unit.y) for unit in session.units.values())
+        offsets = [self._cursor.get((session.session_id, player_id), 0) for player_id in bots]
+
+        def plan(player_id: str, offset: int) -> Tuple[List[ActionRequest], int, int]:
+            return self.plan_from(session, player_id, tick, index, occupied, offset, deadline)
+
+        results = list(pool.map(plan, bots, offsets)) if pool is not None else [plan(*job) for job in zip(bots, offsets)]
+        cursors = self.cursors(session.session_id)
+        cursors.update({player_id: cursor for player_id, (_, _, cursor) in zip(bots, results)})
+        self.set_cursors(session.session_id, cursors)
+        return [(orders, deferred) for orders, deferred, _ in results]
+
+    def plan(
+        self,
+        session: GameSession,
+        player_id: str,
+        tick: int,
+        index: SpatialHash,
+        occupied: AbstractSet[Coord],
+        deadline: float | None = None,
+    ) -> Tuple[List[ActionRequest], int]:
+        """Plans one bot and advances its cursor."""
+        key = (session.session_id, player_id)
+        orders, deferred, cursor = self.plan_from(session, player_id, tick, index, occupied, self._cursor.get(key, 0), deadline)
+        if cursor:
+            self._cursor[key] = cursor
+        else:
+            self._cursor.pop(key, None)
+        return orders, deferred
+
+    def plan_from(
+        self,
+        session: GameSession,
+        player_id: str,
+        tick: int,
+        index: SpatialHash,
+        occupied: AbstractSet[Coord],
+        offset: int,
+        deadline: float | None = None,
+    ) -> Tuple[List[ActionRequest], int, int]:
+        """Orders for one bot starting at unit ``offset``, the number deferred and the cursor to resume from.
+
+        Reads but never changes ``occupied`` or the planner, so it is safe to call concurrently.
+        """
+        units = sorted(session.units_of(player_id), key=lambda u: u.unit_id)
+        if not units:
+            return [], 0, 0
+        rng = random.Random(zlib.crc32(f"{self.seed}:{session.session_id}:{player_id}:{tick}".encode("utf-8")))
+        offset %= len(units)
+        ordered = units[offset:] + units[:offset]
+
+        orders: List[ActionRequest] = []
+        claimed: Set[Coord] = set()
+        for planned, unit in enumerate(ordered):
+            if deadline is not None and planned and time.perf_counter() >= deadline:
+                return orders, len(ordered) - planned, offset + planned
+            order = self._plan_unit(session, unit, tick, index, occupied, claimed, rng)
+            if order is not None:
+                orders.append(order)
+        return orders, 0, 0
+
+    def _plan_unit(
+        self,
+        session: GameSession,
+        unit: Unit,
+        tick: int,
+        index: SpatialHash,
+        occupied: AbstractSet[Coord],
+        claimed: Set[Coord],
+        rng: random.Random,
+    ) -> ActionRequest | None:
+        model = UNIT_MODELS[unit.unit_type]
+        reach = max(model.attack_range, model.sight_range)
+        target: Unit | None = None
+        chase: Unit | None = None
+        target_d2 = chase_d2 = reach * reach + 1
+        for other_id in index.query(unit.x - reach, unit.y - reach, unit.x + reach, unit.y + reach):
+            other = session.units.get(other_id)
+            if other is None or other.owner_player_id == unit.owner_player_id:
+                continue
+            d2 = (other.x - unit.x) ** 2 + (other.y - unit.y) ** 2
+            if other.domain in model.attack_domains and d2 <= model.attack_range * model.attack_range and d2 < target_d2:
+                target, target_d2 = other, d2
+            if d2 < chase_d2:
+                chase, chase_d2 = other, d2
+
+        if target is not None:
+            return ActionRequest(session.session_id, unit.owner_player_id, tick, "fire", unit_id=unit.unit_id, target_x=target.x, target_y=target.y)
+
+        candidates = [(unit.x + 1, unit.y), (unit.x - 1, unit.y), (unit.x, unit.y + 1), (unit.x, unit.y - 1)]
+        rng.shuffle(candidates)
+        if chase is not None:
+            candidates.sort(key=lambda c: abs(c[0] - chase.x) + abs(c[1] - chase.y))
+        game_map = session.game_map
+        for tx, ty in candidates:
+            if not game_map.in_bounds(tx, ty) or (tx, ty) in occupied or (tx, ty) in claimed:
+                continue
+            if not terrain_allowed(unit.domain, game_map.tile(tx, ty)):
+                continue
+            claimed.add((tx, ty))
+            return ActionRequest(session.session_id, unit.owner_player_id, tick, "move", unit_id=unit.unit_id, target_x=tx, target_y=ty)
+        return None
+
+
+def settle_moves(bots: List[str], plans: List[Tuple[List[ActionRequest], int]]) -> List[Tuple[List[ActionRequest], int]]:
+    """Drops ``move`` orders whose target tile a bot earlier in player id order already claimed this tick."""
+    taken: Set[Coord] = set()
+    settled: Dict[str, Tuple[List[ActionRequest], int]] = {}
+    for player_id, (orders, deferred) in sorted(zip(bots, plans), key=lambda item: item[0]):
+        kept = []
+        for order in orders:
+            if order.action_type == "move":
+                target = (order.target_x, order.target_y)
+                if target in taken:
+                    continue
+                taken.add(target)
+            kept.append(order)
+        settled[player_id] = (kept, deferred)
+    return [settled[player_id] for player_id in bots]
+
+
+def plan_snapshot(
+    payload: dict,
+    seed: int,
+    bots: List[str],
+    tick: int,
+    cursors: Dict[str, int],
+    budget_ms: float | None = None,
+) -> Tuple[List[Tuple[List[ActionRequest], int]], Dict[str, int]]:
+    """Plans ``bots`` on a ``session_to_dict`` copy of a session; runs in a worker process.
+
+    ``budget_ms`` is relative because ``time.perf_counter`` values are not comparable across
+    processes; the deadline is taken from this process's clock when planning starts. Returns each
+    bot's ``plan`` result and the planner cursors to carry into the next tick.
+    """
+    from server.snapshot import session_from_dict
+
+    deadline = time.perf_counter() + budget_ms / 1000 if budget_ms else None
+    session = session_from_dict(payload)
+    planner = BotPlanner(seed)
+    planner.set_cursors(session.session_id, cursors)
+    plans = planner.plan_bots(session, bots, tick, deadline)
+    return plans, planner.cursors(session.session_id)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+from server.models import UNIT_MODELS
+from server.stencils import RAY_TABLE, disc_offsets
+
+if TYPE_CHECKING:
+    from server.domain import ActionRequest, GameSession, Unit
+
+Coord = Tuple[int, int]
+
+
+class OccupancyGrid:
+    """Tile -> units lookup built once per combat stage instead of scanning every unit per ray cell."""
+
+    def __init__(self, units: Iterable[Unit]) -> None:
+        cells: Dict[Coord, List[Unit]] = {}
+        for unit in units:
+            key = (unit.x, unit.y)
+            occupants = cells.get(key)
+            if occupants is None:
+                cells[key] = [unit]
+            else:
+                occupants.append(unit)
+        self.cells = cells
+
+    def first_at(self, point: Coord, exclude_unit: str) -> Unit | None:
+        for unit in self.cells.get(point, ()):
+            if unit.unit_id != exclude_unit:
+                return unit
+        return None
+
+    def within(self, center: Coord, radius: int) -> List[Unit]:
+        cx, cy = center
+        cells = self.cells
+        found: List[Unit] = []
+        for dx, dy in disc_offsets(radius):
+            occupants = cells.get((cx + dx, cy + dy))
+            if occupants:
+                found.extend(occupants)
+        return found
+
+
+def resolve_volley(session: GameSession, actions: List[ActionRequest]) -> List[Tuple[bool, str]]:
+    """Resolves every ``fire`` action of a tick against the same pre-volley board.
+
+    All rays are traced over one ``OccupancyGrid``, splash uses one radius query per impact, and
+    damage is summed per target and applied afterwards in unit-id order, so the outcome does not
+    depend on the order shots were submitted in (a unit killed this tick still gets its shot off).
+    """
+    grid = OccupancyGrid(session.units.values())
+    damage: Dict[str, int] = {}
+    outcomes: List[Tuple[bool, str]] = []
+    for action in actions:
+        outcomes.append(_trace_shot(session, grid, action, damage))
+    for unit_id in sorted(damage):
+        session._apply_damage(unit_id, damage[unit_id])
+    return outcomes
+
+
+def _trace_shot(session: GameSession, grid: OccupancyGrid, action: ActionRequest, damage: Dict[str, int]) -> Tuple[bool, str]:
+    shooter = session.units.get(action.unit_id)
+    if shooter is None:
+        return False, "shooter missing"
+    if shooter.owner_player_id != action.player_id:
+        return False, "shooter does not belong to player"
+
+    model = UNIT_MODELS[shooter.unit_type]
+    sx, sy = shooter.x, shooter.y
+    dx, dy = action.target_x - sx, action.target_y - sy
+    if dx * dx + dy * dy > model.attack_range * model.attack_range:
+        return False, "target out of range"
+
+    offsets, drop_steps = RAY_TABLE[(dx, dy)]
+    impact_index = len(offsets) - 1
+    if model.bullet_drop and len(offsets) > 3:
+        impact_index = max(1, impact_index - drop_steps)
+
+    ix, iy = offsets[impact_index]
+    impact_point = (sx + ix, sy + iy)
+
+    direct_target = None
+    for ox, oy in offsets[1 : impact_index + 1]:
+        collider = grid.first_at((sx + ox, sy + oy), shooter.unit_id)
+        if collider is not None:
+            direct_target = collider
+            impact_point = (sx + ox, sy + oy)
+            break
+
+    hit_units: List[str] = []
+    if direct_target is not None and direct_target.owner_player_id != shooter.owner_player_id and direct_target.domain in model.attack_domains:
+        damage[direct_target.unit_id] = damage.get(direct_target.unit_id, 0) + model.attack_damage
+        hit_units.append(direct_target.unit_id)
+
+    if model.aoe_radius > 0:
+        splash_damage = max(1, model.attack_damage // 2)
+        for unit in grid.within(impact_point, model.aoe_radius):
+            if unit.unit_id == shooter.unit_id or unit.owner_player_id == shooter.owner_player_id:
+                continue
+            if direct_target is not None and unit.unit_id == direct_target.unit_id:
+                continue
+            if unit.domain not in model.attack_domains:
+                continue
+            damage[unit.unit_id] = damage.get(unit.unit_id, 0) + splash_damage
+            hit_units.append(unit.unit_id)
+
+    if hit_units:
+        return True, f"impact@{impact_point} hits {','.join(sorted(set(hit_units)))}"
+
+    if model.bullet_drop and impact_point != (action.target_x, action.target_y):
+        return True, "projectile dropped before target"
+    return True, "projectile missed"
@@ -1,16 +1,25 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from math import dist
+from sys import intern
 from typing import Dict, List, Tuple
 
-from server.models import MapModel, UNIT_MODELS
-from server.pathfinding import astar_path, raytrace_line
+from server.actions import ACTIONS, known_unit_type, prevalidate, register_action
+from server.combat import resolve_volley
+from server.models import ACTION_TYPE_CODES, ACTION_TYPES, DOMAIN_CODES, DOMAINS, UNIT_MODELS, UNIT_TYPE_CODES, UNIT_TYPES, MapModel
+from server.movement import advance_movement, resolve_moves
+from server.visibility import VisibilityIndex
 
 Coord = Tuple[int, int]
 
 
-@dataclass(frozen=True)
+# Largest tick accepted from clients; ``action_log.tick`` is an INT column.
+MAX_TICK = 2**31 - 1
+
+_INTERNED_ACTION_FIELDS = ("session_id", "player_id", "unit_id", "group_id", "resource_type")
+
+
+@dataclass(frozen=True, slots=True)
 class ActionRequest:
     session_id: str
     player_id: str
@@ -20,25 +29,51 @@ class ActionRequest:
     target_x: int = 0
     target_y: int = 0
     group_id: str = ""
-    unit_ids: List[str] = field(default_factory=list)
+    unit_ids: Tuple[str, ...] = ()
     unit_type: str = ""
     resource_type: str = ""
 
-
-@dataclass
+    @classmethod
+    def from_payload(cls, payload: dict) -> ActionRequest:
+        """Builds an action from a decoded JSON body.
+
+        Ids are interned and known ``action_type`` / ``unit_type`` names are swapped for the shared
+        strings of the code tables, so logged actions do not each keep their own copies.
+        """
+        values = dict(payload)
+        for name in _INTERNED_ACTION_FIELDS:
+            value = values.get(name)
+            if type(value) is str:
+                values[name] = intern(value)
+        action_type = values.get("action_type")
+        if action_type in ACTION_TYPE_CODES:
+            values["action_type"] = ACTION_TYPES[ACTION_TYPE_CODES[action_type]]
+        unit_type = values.get("unit_type")
+        if unit_type in UNIT_TYPE_CODES:
+            values["unit_type"] = UNIT_TYPES[UNIT_TYPE_CODES[unit_type]]
+        unit_ids = values.get("unit_ids")
+        if isinstance(unit_ids, list):
+            values["unit_ids"] = tuple(intern(uid) if type(uid) is str else uid for uid in unit_ids)
+        action = cls(**values)
+        if type(action.tick) is not int or not 0 <= action.tick <= MAX_TICK:
+            raise ValueError(f"tick must be an integer from 0 to {MAX_TICK}")
+        return action
+
+
+@dataclass(slots=True)
 class ValidationResult:
     accepted: bool
     reason: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class Resources:
     metal: int
     energy: int
     food: int
 
 
-@dataclass
+@dataclass(slots=True)
 class PlayerState:
     player_id: str
     is_bot: bool = False
@@ -46,7 +81,7 @@ class PlayerState:
     groups: Dict[str, List[str]] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class Unit:
     unit_id: str
     owner_player_id: str
@@ -55,6 +90,28 @@ class Unit:
     x: int
     y: int
     hp: int
+    path: List[Coord] = field(default_factory=list)
+    path_tick: int = 0
+
+    def to_tuple(self) -> tuple:
+        """Compact JSON-safe row: ids, unit-type and domain codes, position, hp, flattened path, path tick."""
+        return (
+            self.unit_id,
+            self.owner_player_id,
+            UNIT_TYPE_CODES[self.unit_type],
+            DOMAIN_CODES[self.domain],
+            self.x,
+            self.y,
+            self.hp,
+            [c for step in self.path for c in step],
+            self.path_tick,
+        )
+
+    @classmethod
+    def from_tuple(cls, row) -> Unit:
+        unit_id, owner_player_id, type_code, domain_code, x, y, hp, flat_path, path_tick = row
+        path = list(zip(flat_path[::2], flat_path[1::2]))
+        return cls(unit_id, intern(owner_player_id), UNIT_TYPES[type_code], DOMAINS[domain_code], x, y, hp, path, path_tick)
 
 
 @dataclass
@@ -66,114 +123,149 @@ class GameSession:
     units: Dict[str, Unit]
     latest_tick_by_player: Dict[str, int] = field(default_factory=dict)
     next_unit_index: int = 1000
+    version: int = 0
+    _visibility: VisibilityIndex | None = field(default=None, init=False, repr=False, compare=False)
+    _units_by_owner: Dict[str, Dict[str, Unit]] | None = field(default=None, init=False, repr=False, compare=False)
+    _movers: Dict[str, Unit] | None = field(default=None, init=False, repr=False, compare=False)
+    _wire_fragments: Dict[str, Tuple[tuple, str]] | None = field(default=None, init=False, repr=False, compare=False)
+    movement_stats: Dict[str, float] = field(
+        default_factory=lambda: {
+            "ticks": 0,
+            "orders": 0,
+            "rejected": 0,
+            "goal_shifts": 0,
+            "path_searches": 0,
+            "repairs": 0,
+            "steps": 0,
+            "cancelled": 0,
+            "resolve_ms": 0.0,
+        },
+        init=False,
+        repr=False,
+        compare=False,
+    )
 
     def apply_action(self, action: ActionRequest) -> ValidationResult:
-        if action.player_id not in self.players:
-            return ValidationResult(False, "player does not exist")
-
-        latest_tick = self.latest_tick_by_player.get(action.player_id, -1)
-        if action.tick <= latest_tick:
-            return ValidationResult(False, "tick must increase per player")
+        spec, reason = prevalidate(self, action)
+        if reason is not None:
+            return ValidationResult(False, reason)
 
-        result = self._dispatch(action)
+        result = spec.handler(self, action)
         if result.accepted:
-            self.latest_tick_by_player[action.player_id] = action.tick
-            self.tick = max(self.tick, action.tick)
-            self._apply_upkeep()
+            self._commit_tick(action.player_id, action.tick)
         return result
 
-    def _dispatch(self, action: ActionRequest) -> ValidationResult:
-        if action.action_type == "move":
-            return self._move(action)
-        if action.action_type == "fire":
-            return self._fire_projectile(action)
-        if action.action_type == "create_group":
-            return self._create_group(action)
-        if action.action_type == "assign_group":
-            return self._assign_group(action)
-        if action.action_type == "spawn_unit":
-            return self._spawn_unit(action)
-        if action.action_type == "mine":
-            return self._mine(action)
-        return ValidationResult(False, f"unsupported action_type: {action.action_type}")
+    def prevalidate(self, action: ActionRequest) -> ValidationResult | None:
+        """The rejection ``apply_action`` would return from the registry checks alone, or ``None``.
+
+        Read-only and lock-free, so callers can turn away obviously invalid actions before
+        taking the session lock.
+        """
+        _, reason = prevalidate(self, action)
+        return None if reason is None else ValidationResult(False, reason)
+
+    def apply_batch(self, player_id: str, tick: int, actions: List[ActionRequest]) -> List[ValidationResult]:
+        """Applies several orders from one player for one tick, paying the tick check and upkeep once."""
+        return self.apply_tick_orders(tick, {player_id: actions})[player_id]
+
+    def apply_tick_orders(self, tick: int, orders: Dict[str, List[ActionRequest]]) -> Dict[str, List[ValidationResult]]:
+        """Applies one tick of orders from several players.
+
+        Other orders are dispatched in player/submission order; every ``move`` order of the tick
+        is then resolved together against one reservation table, followed by every ``fire`` order
+        as a single simultaneous volley. Upkeep is charged once.
+        """
+        results: Dict[str, List[ValidationResult]] = {}
+        moves: List[Tuple[str, int, ActionRequest]] = []
+        volley: List[Tuple[str, int, ActionRequest]] = []
+        for player_id, actions in orders.items():
+            if player_id not in self.players:
+                results[player_id] = [ValidationResult(False, "player does not exist") for _ in actions]
+                continue
+            if tick <= self.latest_tick_by_player.get(player_id, -1):
+                results[player_id] = [ValidationResult(False, "tick must increase per player") for _ in actions]
+                continue
+            player_results: List[ValidationResult] = []
+            for action in actions:
+                spec = ACTIONS.get(action.action_type)
+                reason = None if spec is None else spec.check(self, action)
+                if action.player_id != player_id or action.tick != tick:
+                    player_results.append(ValidationResult(False, "batch actions must share player and tick"))
+                elif spec is None:
+                    player_results.append(ValidationResult(False, f"unsupported action_type: {action.action_type}"))
+                elif reason is not None:
+                    player_results.append(ValidationResult(False, reason))
+                elif spec.stage == "move":
+                    moves.append((player_id, len(player_results), action))
+                    player_results.append(ValidationResult(False, "pending"))
+                elif spec.stage == "fire":
+                    volley.append((player_id, len(player_results), action))
+                    player_results.append(ValidationResult(False, "pending"))
+                else:
+                    player_results.append(spec.handler(self, action))
+            results[player_id] = player_results
+
+        if moves:
+            outcomes = self._resolve_moves([action for _, _, action in moves], max(self.tick, tick))
+            for (player_id, position, _), outcome in zip(moves, outcomes):
+                results[player_id][position] = outcome
+        if volley:
+            outcomes = self._resolve_volley([action for _, _, action in volley])
+            for (player_id, position, _), outcome in zip(volley, outcomes):
+                results[player_id][position] = outcome
+
+        committed = [player_id for player_id, player_results in results.items() if any(r.accepted for r in player_results)]
+        for player_id in committed:
+            self.latest_tick_by_player[player_id] = tick
+        if committed:
+            self.advance_movement(max(self.tick, tick))
+            self.tick = max(self.tick, tick)
+            self._apply_upkeep()
+            self.version += 1
+        return results
+
+    def advance_to(self, tick: int) -> bool:
+        """Runs an order-free tick: movement, the session tick and upkeep; ``False`` if ``tick`` is not ahead."""
+        if tick <= self.tick:
+            return False
+        self.advance_movement(tick)
+        self.tick = tick
+        self._apply_upkeep()
+        self.version += 1
+        return True
+
+    def _commit_tick(self, player_id: str, tick: int) -> None:
+        self.latest_tick_by_player[player_id] = tick
+        self.advance_movement(max(self.tick, tick))
+        self.tick = max(self.tick, tick)
+        self._apply_upkeep()
+        self.version += 1
 
     def _move(self, action: ActionRequest) -> ValidationResult:
-        unit = self.units.get(action.unit_id)
-        if unit is None:
-            return ValidationResult(False, "unit missing")
-        if unit.owner_player_id != action.player_id:
-            return ValidationResult(False, "unit does not belong to player")
-        if self._unit_at((action.target_x, action.target_y), exclude_unit=action.unit_id) is not None:
-            return ValidationResult(False, "target tile occupied (collision)")
-
-        path = astar_path(self.game_map, (unit.x, unit.y), (action.target_x, action.target_y), unit.domain)
-        if path is None:
-            return ValidationResult(False, "no valid path")
-
-        max_steps = UNIT_MODELS[unit.unit_type].speed
-        if len(path) - 1 > max_steps:
-            return ValidationResult(False, "path too long for one tick")
-
-        unit.x, unit.y = action.target_x, action.target_y
+        return self._resolve_moves([action], max(self.tick, action.tick))[0]
+
+    def _resolve_moves(self, actions: List[ActionRequest], tick: int) -> List[ValidationResult]:
+        return [ValidationResult(accepted, reason) for accepted, reason in resolve_moves(self, actions, tick)]
+
+    def _stop(self, action: ActionRequest) -> ValidationResult:
+        unit = self.units[action.unit_id]
+        unit.path = []
+        self._moving_units().pop(unit.unit_id, None)
         return ValidationResult(True, "accepted")
 
+    def advance_movement(self, tick: int) -> int:
+        return advance_movement(self, tick)
+
+    def _moving_units(self) -> Dict[str, Unit]:
+        if self._movers is None:
+            self._movers = {unit.unit_id: unit for unit in self.units.values() if unit.path}
+        return self._movers
+
     def _fire_projectile(self, action: ActionRequest) -> ValidationResult:
-        shooter = self.units.get(action.unit_id)
-        if shooter is None:
-            return ValidationResult(False, "shooter missing")
-        if shooter.owner_player_id != action.player_id:
-            return ValidationResult(False, "shooter does not belong to player")
-
-        model = UNIT_MODELS[shooter.unit_type]
-        target_distance = dist((shooter.x, shooter.y), (action.target_x, action.target_y))
-        if target_distance > model.attack_range:
-            return ValidationResult(False, "target out of range")
-
-        ray = raytrace_line((shooter.x, shooter.y), (action.target_x, action.target_y))
-        impact_index = len(ray) - 1
-        if model.bullet_drop and len(ray) > 3:
-            drop_steps = max(0, int(target_distance // 3))
-            impact_index = max(1, impact_index - drop_steps)
-
-        impact_point = ray[impact_index]
-
-        direct_target = None
-        for point in ray[1 : impact_index + 1]:
-            collider = self._unit_at(point, exclude_unit=shooter.unit_id)
-            if collider is not None:
-                direct_target = collider
-                impact_point = point
-                break
-
-        hit_units: List[str] = []
-        if direct_target is not None and direct_target.owner_player_id != shooter.owner_player_id and self._can_attack(model, direct_target):
-            self._apply_damage(direct_target.unit_id, model.attack_damage)
-            hit_units.append(direct_target.unit_id)
-
-        if model.aoe_radius > 0:
-            for unit in list(self.units.values()):
-                if unit.unit_id == shooter.unit_id:
-                    continue
-                if unit.owner_player_id == shooter.owner_player_id:
-                    continue
-                if direct_target and unit.unit_id == direct_target.unit_id:
-                    continue
-                if not self._can_attack(model, unit):
-                    continue
-                if dist((unit.x, unit.y), impact_point) <= model.aoe_radius:
-                    splash_damage = max(1, model.attack_damage // 2)
-                    self._apply_damage(unit.unit_id, splash_damage)
-                    hit_units.append(unit.unit_id)
-
-        if hit_units:
-            return ValidationResult(True, f"impact@{impact_point} hits {','.join(sorted(set(hit_units)))}")
-
-        if model.bullet_drop and impact_point != (action.target_x, action.target_y):
-            return ValidationResult(True, "projectile dropped before target")
-        return ValidationResult(True, "projectile missed")
-
-    def _can_attack(self, attacker_model, target: Unit) -> bool:
-        return target.domain in attacker_model.attack_domains
+        return self._resolve_volley([action])[0]
+
+    def _resolve_volley(self, actions: List[ActionRequest]) -> List[ValidationResult]:
+        return [ValidationResult(accepted, reason) for accepted, reason in resolve_volley(self, actions)]
 
     def _apply_damage(self, unit_id: str, damage: int) -> None:
         target = self.units.get(unit_id)
@@ -181,7 +273,28 @@ class GameSession:
             return
         target.hp -= damage
         if target.hp <= 0:
-            del self.units[target.unit_id]
+            self.remove_unit(target.unit_id)
+
+    def units_of(self, player_id: str) -> List[Unit]:
+        if self._units_by_owner is None:
+            index: Dict[str, Dict[str, Unit]] = {}
+            for unit in self.units.values():
+                index.setdefault(unit.owner_player_id, {})[unit.unit_id] = unit
+            self._units_by_owner = index
+        return list(self._units_by_owner.get(player_id, {}).values())
+
+    def add_unit(self, unit: Unit) -> None:
+        self.units[unit.unit_id] = unit
+        if self._units_by_owner is not None:
+            self._units_by_owner.setdefault(unit.owner_player_id, {})[unit.unit_id] = unit
+
+    def remove_unit(self, unit_id: str) -> Unit | None:
+        unit = self.units.pop(unit_id, None)
+        if unit is not None and self._units_by_owner is not None:
+            self._units_by_owner.get(unit.owner_player_id, {}).pop(unit_id, None)
+        if self._movers is not None:
+            self._movers.pop(unit_id, None)
+        return unit
 
     def _unit_at(self, point: Coord, exclude_unit: str) -> Unit | None:
         for unit in self.units.values():
@@ -193,8 +306,6 @@ class GameSession:
 
     def _create_group(self, action: ActionRequest) -> ValidationResult:
         player = self.players[action.player_id]
-        if not action.group_id:
-            return ValidationResult(False, "group_id required")
         if action.group_id in player.groups:
             return ValidationResult(False, "group already exists")
         player.groups[action.group_id] = []
@@ -204,23 +315,12 @@ class GameSession:
         player = self.players[action.player_id]
         if action.group_id not in player.groups:
             return ValidationResult(False, "group does not exist")
-
-        for unit_id in action.unit_ids:
-            unit = self.units.get(unit_id)
-            if unit is None or unit.owner_player_id != action.player_id:
-                return ValidationResult(False, "invalid unit in assignment")
         player.groups[action.group_id] = list(sorted(set(action.unit_ids)))
         return ValidationResult(True, "accepted")
 
     def _spawn_unit(self, action: ActionRequest) -> ValidationResult:
-        model = UNIT_MODELS.get(action.unit_type)
-        if model is None:
-            return ValidationResult(False, "unknown unit_type")
-
+        model = UNIT_MODELS[action.unit_type]
         player = self.players[action.player_id]
-        if not self.game_map.in_bounds(action.target_x, action.target_y):
-            return ValidationResult(False, "spawn out of bounds")
-
         tile = self.game_map.tile(action.target_x, action.target_y)
         if model.domain == "land" and tile != "land":
             return ValidationResult(False, "land unit must spawn on land")
@@ -238,15 +338,12 @@ class GameSession:
 
         unit_id = f"u-{self.next_unit_index}"
         self.next_unit_index += 1
-        self.units[unit_id] = Unit(unit_id, action.player_id, action.unit_type, model.domain, action.target_x, action.target_y, model.hp)
+        self.add_unit(Unit(unit_id, player.player_id, model.unit_type, model.domain, action.target_x, action.target_y, model.hp))
         return ValidationResult(True, "accepted")
 
     def _mine(self, action: ActionRequest) -> ValidationResult:
-        unit = self.units.get(action.unit_id)
-        if unit is None or unit.owner_player_id != action.player_id:
-            return ValidationResult(False, "invalid mining unit")
-
-        node = self.game_map.resources.get((unit.x, unit.y))
+        unit = self.units[action.unit_id]
+        node = self.game_map.resource_at((unit.x, unit.y))
         if node is None:
             return ValidationResult(False, "no resource node")
         if node.resource_type != action.resource_type:
@@ -255,8 +352,7 @@ class GameSession:
             return ValidationResult(False, "resource depleted")
 
         player = self.players[action.player_id]
-        amount = min(25, node.amount)
-        node.amount -= amount
+        amount = self.game_map.take_resource((unit.x, unit.y), 25)
         if action.resource_type == "metal":
             player.resources.metal += amount
         elif action.resource_type == "energy":
@@ -277,13 +373,27 @@ class GameSession:
             player.resources.energy = max(0, player.resources.energy - energy)
             player.resources.food = max(0, player.resources.food - food)
 
-    def unit_counts(self) -> Dict[str, int]:
+    def unit_counts(self, unit_ids: List[str] | None = None) -> Dict[str, int]:
         counts: Dict[str, int] = {}
-        for unit in self.units.values():
+        units = self.units.values() if unit_ids is None else (self.units[uid] for uid in unit_ids)
+        for unit in units:
             counts[unit.unit_type] = counts.get(unit.unit_type, 0) + 1
         return counts
 
-    def state_payload(self) -> dict:
+    def visibility(self) -> VisibilityIndex:
+        if self._visibility is None:
+            self._visibility = VisibilityIndex(self.game_map.width, self.game_map.height)
+        self._visibility.refresh(self)
+        return self._visibility
+
+    def state_payload(self, player_id: str | None = None) -> dict:
+        """Authoritative state; with ``player_id`` it is that player's view.
+
+        The view holds only units inside the player's fog-of-war, and other players are listed
+        without their resources and groups (which name their unit ids).
+        """
+        unit_ids = None if player_id is None else self.visibility().visible_unit_ids(self, player_id)
+        units = self.units if unit_ids is None else {uid: self.units[uid] for uid in unit_ids}
         return {
             "session_id": self.session_id,
             "map": self.game_map.name,
@@ -294,6 +404,8 @@ class GameSession:
                     "resources": {"metal": p.resources.metal, "energy": p.resources.energy, "food": p.resources.food},
                     "groups": p.groups,
                 }
+                if player_id is None or pid == player_id
+                else {"is_bot": p.is_bot}
                 for pid, p in self.players.items()
             },
             "units": {
@@ -305,7 +417,16 @@ class GameSession:
                     "y": u.y,
                     "hp": u.hp,
                 }
-                for uid, u in self.units.items()
+                for uid, u in units.items()
             },
-            "unit_counts": self.unit_counts(),
+            "unit_counts": self.unit_counts(unit_ids),
         }
+
+
+register_action("move", GameSession._move, owned_unit=("unit missing", "unit does not belong to player"), target_in_bounds="target out of bounds", stage="move")
+register_action("stop", GameSession._stop, owned_unit=("invalid unit", "invalid unit"))
+register_action("fire", GameSession._fire_projectile, owned_unit=("shooter missing", "shooter does not belong to player"), stage="fire")
+register_action("create_group", GameSession._create_group, required=(("group_id", "group_id required"),))
+register_action("assign_group", GameSession._assign_group, owned_units="invalid unit in assignment")
+register_action("spawn_unit", GameSession._spawn_unit, checks=(known_unit_type("unknown unit_type"),), target_in_bounds="spawn out of bounds")
+register_action("mine", GameSession._mine, owned_unit=("invalid mining unit", "invalid mining unit"))
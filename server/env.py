@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from server.bots import BotPlanner
+from server.domain import ActionRequest, GameSession
+from server.interest import SpatialHash
+from server.maps import get_template
+from server.models import MapModel, MapTemplate
+from server.offline_sim import build_headless_session
+
+OBS_CHANNELS: Tuple[str, ...] = (
+    "terrain_land",
+    "terrain_water",
+    "metal",
+    "energy",
+    "food",
+    "own_land",
+    "own_air",
+    "own_water",
+    "enemy_land",
+    "enemy_air",
+    "enemy_water",
+)
+RESOURCE_CHANNEL = {"metal": 2, "energy": 3, "food": 4}
+DOMAIN_OFFSET = {"land": 0, "air": 1, "water": 2}
+
+ACTION_NOOP = 0
+ACTION_MOVE = 1
+ACTION_FIRE = 2
+ACTION_MINE = 3
+_ACTION_TYPES = {ACTION_MOVE: "move", ACTION_FIRE: "fire", ACTION_MINE: "mine"}
+_MINE_TYPES = ("metal", "energy", "food")
+
+
+class _Template:
+    """Observation planes derived once per map template; every env instance shares its terrain."""
+
+    def __init__(self, template: MapTemplate) -> None:
+        self.map_template = template
+        self.static = np.zeros((2, template.height, template.width), dtype=np.float32)
+        for y, row in enumerate(template.terrain):
+            for x, tile in enumerate(row):
+                self.static[0 if tile == "land" else 1, y, x] = 1.0
+
+    def instantiate(self) -> MapModel:
+        return MapModel(self.map_template)
+
+
+_TEMPLATES: Dict[str, _Template] = {}
+
+
+def _template(map_name: str) -> _Template:
+    template = _TEMPLATES.get(map_name)
+    if template is None:
+        template = _TEMPLATES[map_name] = _Template(get_template(map_name))
+    return template
+
+
+class VectorEnv:
+    """Gym-style vectorized environment stepping ``num_envs`` independent bot-vs-agent sessions.
+
+    ``step`` takes an ``int`` array of shape ``(num_envs, 4)`` holding
+    ``[action_code, unit_slot, target_x, target_y]`` per env, where ``unit_slot`` indexes the agent's
+    units in the order returned at reset (``action_code``: 0 noop, 1 move, 2 fire, 3 mine; for mine
+    ``target_x`` selects metal/energy/food). The opponent is driven by ``BotPlanner``.
+    Observations are ``{"grid": float32 (K, C, H, W), "resources": int32 (K, 3)}`` with channels
+    ``OBS_CHANNELS``; finished envs are reset automatically and report ``final_info``.
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        map_name: str = "desert",
+        units_per_side: int = 8,
+        max_ticks: int = 200,
+        seed: int = 0,
+        agent_id: str = "bot-0",
+        opponent_id: str = "bot-1",
+    ) -> None:
+        self.num_envs = num_envs
+        self.map_name = map_name
+        self.units_per_side = units_per_side
+        self.max_ticks = max_ticks
+        self.agent_id = agent_id
+        self.opponent_id = opponent_id
+        self.template = _template(map_name)
+        height, width = self.template.map_template.height, self.template.map_template.width
+        self.observation_shape = (len(OBS_CHANNELS), height, width)
+        self._grid = np.zeros((num_envs, *self.observation_shape), dtype=np.float32)
+        self._resources = np.zeros((num_envs, 3), dtype=np.int32)
+        self._planner = BotPlanner(seed)
+        self._next_seed = seed
+        self.sessions: List[GameSession] = [None] * num_envs  # type: ignore[list-item]
+        self.unit_slots: List[List[str]] = [[] for _ in range(num_envs)]
+        self._hp: np.ndarray = np.zeros((num_envs, 2), dtype=np.int64)
+
+    def reset(self) -> Dict[str, np.ndarray]:
+        for k in range(self.num_envs):
+            self._reset_env(k)
+        return self._observe()
+
+    def step(self, actions: np.ndarray) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray, List[dict]]:
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs, 4)
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        infos: List[dict] = [{} for _ in range(self.num_envs)]
+
+        for k, session in enumerate(self.sessions):
+            tick = session.tick + 1
+            code, slot, tx, ty = (int(v) for v in actions[k])
+            if code in _ACTION_TYPES and 0 <= slot < len(self.unit_slots[k]):
+                unit_id = self.unit_slots[k][slot]
+                if unit_id in session.units:
+                    action = ActionRequest(
+                        session.session_id,
+                        self.agent_id,
+                        tick,
+                        _ACTION_TYPES[code],
+                        unit_id=unit_id,
+                        target_x=tx,
+                        target_y=ty,
+                        resource_type=_MINE_TYPES[tx % 3] if code == ACTION_MINE else "",
+                    )
+                    infos[k]["accepted"] = session.apply_action(action).accepted
+
+            index = SpatialHash()
+            index.rebuild(session)
+            occupied = {(u.x, u.y) for u in session.units.values()}
+            orders, _ = self._planner.plan(session, self.opponent_id, tick, index, occupied)
+            if orders:
+                session.apply_batch(self.opponent_id, tick, orders)
+            session.tick = tick
+
+            hp = self._hp_totals(session)
+            own_loss, enemy_loss = self._hp[k] - hp
+            rewards[k] = (enemy_loss - own_loss) / 100.0
+            self._hp[k] = hp
+            if hp[0] == 0 or hp[1] == 0 or tick >= self.max_ticks:
+                dones[k] = True
+                infos[k]["final_info"] = {
+                    "seed": int(session.session_id.rsplit("-", 1)[1]),
+                    "ticks": tick,
+                    "winner": self.agent_id if hp[1] == 0 and hp[0] > 0 else self.opponent_id if hp[0] == 0 and hp[1] > 0 else None,
+                }
+                self._reset_env(k)
+        return self._observe(), rewards, dones, infos
+
+    def _reset_env(self, k: int) -> None:
+        seed = self._next_seed
+        self._next_seed += 1
+        session = build_headless_session(seed, self.map_name, units_per_bot=self.units_per_side, game_map=self.template.instantiate())
+        self.sessions[k] = session
+        self.unit_slots[k] = [unit.unit_id for unit in sorted(session.units_of(self.agent_id), key=lambda u: u.unit_id)]
+        self._hp[k] = self._hp_totals(session)
+
+    def _hp_totals(self, session: GameSession) -> np.ndarray:
+        return np.array(
+            [sum(u.hp for u in session.units_of(self.agent_id)), sum(u.hp for u in session.units_of(self.opponent_id))],
+            dtype=np.int64,
+        )
+
+    def _observe(self) -> Dict[str, np.ndarray]:
+        grid = self._grid
+        grid[:, 0:2] = self.template.static
+        grid[:, 2:] = 0.0
+        ks: List[int] = []
+        channels: List[int] = []
+        ys: List[int] = []
+        xs: List[int] = []
+        amounts: List[float] = []
+        agent = self.agent_id
+        for k, session in enumerate(self.sessions):
+            for (x, y), node in session.game_map.resources.items():
+                if node.amount > 0:
+                    ks.append(k)
+                    channels.append(RESOURCE_CHANNEL[node.resource_type])
+                    ys.append(y)
+                    xs.append(x)
+                    amounts.append(node.amount / 1000.0)
+            for unit in session.units.values():
+                ks.append(k)
+                channels.append((5 if unit.owner_player_id == agent else 8) + DOMAIN_OFFSET[unit.domain])
+                ys.append(unit.y)
+                xs.append(unit.x)
+                amounts.append(1.0)
+            player = session.players[agent]
+            self._resources[k] = (player.resources.metal, player.resources.energy, player.resources.food)
+        grid[ks, channels, ys, xs] = amounts
+        return {"grid": grid.copy(), "resources": self._resources.copy()}
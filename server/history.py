@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from server.domain import GameSession
+from server.serialization import dumps, loads
+from server.sessions import valid_session_id
+from server.snapshot import session_to_dict
+
+_SCALAR_FIELDS = ("tick", "version", "next_unit_index", "latest_tick_by_player", "movement_stats")
+
+
+def capture(session: GameSession) -> dict:
+    """``session_to_dict`` with units and resource nodes keyed for diffing and nothing shared with the session."""
+    image = session_to_dict(session)
+    image["units"] = {row[0]: list(row) for row in image["units"]}
+    image["map"]["resource_amounts"] = {(x, y): amount for x, y, amount in image["map"]["resource_amounts"]}
+    for player in image["players"].values():
+        player["groups"] = {name: list(unit_ids) for name, unit_ids in player["groups"].items()}
+    return image
+
+
+def collapse(image: dict) -> dict:
+    """Turns a ``capture`` image back into ``session_to_dict`` form (what ``session_from_dict`` reads)."""
+    return {
+        **image,
+        "map": {**image["map"], "resource_amounts": [[x, y, amount] for (x, y), amount in image["map"]["resource_amounts"].items()]},
+        "units": list(image["units"].values()),
+    }
+
+
+def expand(payload: dict) -> dict:
+    return {
+        **payload,
+        "map": {**payload["map"], "resource_amounts": {(x, y): amount for x, y, amount in payload["map"]["resource_amounts"]}},
+        "units": {row[0]: row for row in payload["units"]},
+        "players": dict(payload["players"]),
+    }
+
+
+def diff(before: dict, after: dict) -> dict:
+    """What changed between two images: changed/new unit rows, removed unit ids, changed players and nodes."""
+    changes: dict = {}
+    fields = {name: after[name] for name in _SCALAR_FIELDS if after[name] != before[name]}
+    if fields:
+        changes["fields"] = fields
+    players = {pid: player for pid, player in after["players"].items() if before["players"].get(pid) != player}
+    if players:
+        changes["players"] = players
+    old_units, new_units = before["units"], after["units"]
+    units = [row for unit_id, row in new_units.items() if old_units.get(unit_id) != row]
+    if units:
+        changes["units"] = units
+    gone = [unit_id for unit_id in old_units if unit_id not in new_units]
+    if gone:
+        changes["gone"] = gone
+    old_nodes, new_nodes = before["map"]["resource_amounts"], after["map"]["resource_amounts"]
+    nodes = [[x, y, amount] for (x, y), amount in new_nodes.items() if old_nodes.get((x, y)) != amount]
+    nodes += [[x, y, 0] for (x, y) in old_nodes if (x, y) not in new_nodes]
+    if nodes:
+        changes["nodes"] = nodes
+    return changes
+
+
+def apply(image: dict, changes: dict) -> None:
+    """Applies a ``diff`` to an ``expand``ed image in place (rows are replaced, never mutated)."""
+    image.update(changes.get("fields", {}))
+    image["players"].update(changes.get("players", {}))
+    units = image["units"]
+    for row in changes.get("units", ()):
+        units[row[0]] = row
+    for unit_id in changes.get("gone", ()):
+        del units[unit_id]
+    nodes = image["map"]["resource_amounts"]
+    for x, y, amount in changes.get("nodes", ()):
+        if amount:
+            nodes[(x, y)] = amount
+        else:
+            nodes.pop((x, y), None)
+
+
+class _Segment:
+    """A keyframe and the per-tick diffs after it; closed segments are one zlib-compressed blob."""
+
+    __slots__ = ("first_tick", "last_tick", "frames", "size", "blob", "path")
+
+    def __init__(self, first_tick: int) -> None:
+        self.first_tick = first_tick
+        self.last_tick = first_tick
+        self.frames = 0
+        self.size = 0
+        self.blob: bytes | None = None
+        self.path: Path | None = None
+
+
+class _Timeline:
+    __slots__ = ("segments", "ticks", "frames", "last", "before_last")
+
+    def __init__(self) -> None:
+        self.segments: List[_Segment] = []
+        self.ticks: List[int] = []
+        self.frames: List[dict] = []
+        self.last: dict | None = None
+        self.before_last: dict | None = None
+
+
+class SnapshotHistory:
+    """Per-tick session history stored as a keyframe every ``keyframe_interval`` ticks plus diffs.
+
+    ``record`` is called after each committed change with the tick it belongs to (player actions
+    carry their own ticks, which ``GameSession.tick`` does not follow); several changes in one tick
+    collapse into that tick's frame, and a change for an older tick lands in the latest frame.
+    Once a segment spans ``keyframe_interval`` ticks it is closed, compressed with zlib as a whole
+    (frames in one segment share most of their keys, so this compresses far better than
+    per-frame) and kept in memory, or written to ``directory/<session_id>/`` when one is given.
+    ``seek`` decompresses one segment and applies at most ``keyframe_interval`` diffs to its
+    keyframe; the last decoded segment is kept so scrubbing through nearby ticks stays cheap.
+    """
+
+    def __init__(self, directory: str | None = None, keyframe_interval: int = 50, level: int = 6) -> None:
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval must be positive")
+        self.directory = Path(directory) if directory else None
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self._timelines: Dict[str, _Timeline] = {}
+        self._decoded: Tuple[str, int, List[int], List[dict]] | None = None
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {"frames": 0, "keyframes": 0, "stored_bytes": 0, "seeks": 0, "seek_ms_total": 0.0, "seek_ms_max": 0.0}
+
+    def record(self, session: GameSession, tick: int | None = None) -> None:
+        """Captures the session's current state as of ``tick`` (default ``session.tick``); the caller holds the session lock."""
+        if self.directory is not None and not valid_session_id(session.session_id):
+            raise ValueError(f"invalid session id: {session.session_id!r}")
+        with self._lock:
+            timeline = self._timelines.get(session.session_id)
+            if timeline is None:
+                timeline = self._timelines[session.session_id] = _Timeline()
+            latest = timeline.ticks[-1] if timeline.ticks else None
+        last = timeline.last
+        image = capture(session)
+        tick = max(session.tick if tick is None else tick, session.tick, latest if latest is not None else -1)
+        # Only this session's (locked) caller changes its timeline's images, so diffs are built unlocked.
+        if latest == tick:
+            frame = collapse(image) if len(timeline.frames) == 1 else diff(timeline.before_last, image)
+            with self._lock:
+                timeline.frames[-1] = frame
+        else:
+            closing = bool(timeline.ticks) and tick - timeline.ticks[0] >= self.keyframe_interval
+            keyframe = closing or not timeline.frames
+            frame = collapse(image) if keyframe else diff(last, image)
+            with self._lock:
+                if closing:
+                    self._close(session.session_id, timeline)
+                timeline.frames.append(frame)
+                timeline.ticks.append(tick)
+                self.stats["frames"] += 1
+                self.stats["keyframes"] += keyframe
+            timeline.before_last = last
+        timeline.last = image
+
+    def seek(self, session_id: str, tick: int) -> dict | None:
+        """The session as of ``tick`` in ``session_to_dict`` form, or ``None`` if nothing is recorded by then."""
+        started = time.perf_counter()
+        with self._lock:
+            timeline = self._timelines.get(session_id)
+            if timeline is None:
+                return None
+            if timeline.ticks and timeline.ticks[0] <= tick:
+                ticks, frames = timeline.ticks, timeline.frames
+            else:
+                index = bisect.bisect_right([segment.first_tick for segment in timeline.segments], tick) - 1
+                if index < 0:
+                    return None
+                ticks, frames = self._decode(session_id, timeline.segments[index])
+            frames = frames[: bisect.bisect_right(ticks, tick)]
+        image = expand(frames[0])
+        for changes in frames[1:]:
+            apply(image, changes)
+        payload = collapse(image)
+        elapsed = 1000 * (time.perf_counter() - started)
+        with self._lock:
+            self.stats["seeks"] += 1
+            self.stats["seek_ms_total"] += elapsed
+            self.stats["seek_ms_max"] = max(self.stats["seek_ms_max"], elapsed)
+        return payload
+
+    def ticks(self, session_id: str) -> Tuple[int, int] | None:
+        """First and last recorded tick for the session."""
+        timeline = self._timelines.get(session_id)
+        if timeline is None or not (timeline.segments or timeline.ticks):
+            return None
+        first = timeline.segments[0].first_tick if timeline.segments else timeline.ticks[0]
+        last = timeline.ticks[-1] if timeline.ticks else timeline.segments[-1].last_tick
+        return first, last
+
+    def flush(self, session_id: str) -> None:
+        """Closes the session's open segment; the next ``record`` starts a new keyframe."""
+        with self._lock:
+            timeline = self._timelines.get(session_id)
+            if timeline is not None and timeline.frames:
+                self._close(session_id, timeline)
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            timeline = self._timelines.pop(session_id, None)
+            if self._decoded is not None and self._decoded[0] == session_id:
+                self._decoded = None
+            for segment in timeline.segments if timeline is not None else ():
+                if segment.path is not None:
+                    segment.path.unlink(missing_ok=True)
+                self.stats["stored_bytes"] -= segment.size
+
+    def metrics(self) -> dict:
+        frames, seeks = self.stats["frames"], self.stats["seeks"]
+        closed = sum(segment.frames for timeline in self._timelines.values() for segment in timeline.segments)
+        return {
+            "frames": int(frames),
+            "keyframes": int(self.stats["keyframes"]),
+            "stored_bytes": int(self.stats["stored_bytes"]),
+            "bytes_per_tick": round(self.stats["stored_bytes"] / closed, 1) if closed else 0.0,
+            "seeks": int(seeks),
+            "seek_ms_avg": round(self.stats["seek_ms_total"] / seeks, 3) if seeks else 0.0,
+            "seek_ms_max": round(self.stats["seek_ms_max"], 3),
+        }
+
+    def _close(self, session_id: str, timeline: _Timeline) -> None:
+        segment = _Segment(timeline.ticks[0])
+        segment.last_tick = timeline.ticks[-1]
+        segment.frames = len(timeline.frames)
+        blob = zlib.compress(dumps({"ticks": timeline.ticks, "frames": timeline.frames}), self.level)
+        segment.size = len(blob)
+        if self.directory is None:
+            segment.blob = blob
+        else:
+            segment.path = self.directory / session_id / f"{segment.first_tick:010d}.history.z"
+            segment.path.parent.mkdir(parents=True, exist_ok=True)
+            segment.path.write_bytes(blob)
+        timeline.segments.append(segment)
+        timeline.ticks, timeline.frames = [], []
+        self.stats["stored_bytes"] += segment.size
+
+    def _decode(self, session_id: str, segment: _Segment) -> Tuple[List[int], List[dict]]:
+        decoded = self._decoded
+        if decoded is not None and decoded[0] == session_id and decoded[1] == segment.first_tick:
+            return decoded[2], decoded[3]
+        blob = segment.blob if segment.blob is not None else segment.path.read_bytes()
+        payload = loads(zlib.decompress(blob))
+        self._decoded = (session_id, segment.first_tick, payload["ticks"], payload["frames"])
+        return payload["ticks"], payload["frames"]
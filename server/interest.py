@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from server.domain import GameSession, Unit
+
+UnitView = Tuple[str, str, str, int, int, int]
+
+
+@dataclass
+class Viewport:
+    """Axis-aligned rectangle ``[x, x + width) x [y, y + height)``, or a circle when ``radius`` is set."""
+
+    x: int
+    y: int
+    width: int = 0
+    height: int = 0
+    radius: int = 0
+
+    def bounds(self) -> Tuple[int, int, int, int]:
+        if self.radius > 0:
+            return self.x - self.radius, self.y - self.radius, self.x + self.radius, self.y + self.radius
+        return self.x, self.y, self.x + self.width - 1, self.y + self.height - 1
+
+    def contains(self, x: int, y: int) -> bool:
+        if self.radius > 0:
+            dx, dy = x - self.x, y - self.y
+            return dx * dx + dy * dy <= self.radius * self.radius
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+
+@dataclass
+class Subscription:
+    viewport: Viewport
+    player_id: str | None = None
+    known: Dict[str, UnitView] = field(default_factory=dict)
+    last_seen: float = 0.0
+
+
+class SpatialHash:
+    """Uniform-grid bucket index of unit ids, rebuilt once per session state version."""
+
+    def __init__(self, cell_size: int = 8) -> None:
+        self.cell_size = cell_size
+        self.buckets: Dict[Tuple[int, int], List[str]] = {}
+        self.version = -1
+
+    def rebuild(self, session: GameSession) -> None:
+        size = self.cell_size
+        buckets: Dict[Tuple[int, int], List[str]] = {}
+        for unit_id, unit in session.units.items():
+            key = (unit.x // size, unit.y // size)
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [unit_id]
+            else:
+                bucket.append(unit_id)
+        self.buckets = buckets
+        self.version = session.version
+
+    def query(self, x0: int, y0: int, x1: int, y1: int) -> List[str]:
+        size = self.cell_size
+        found: List[str] = []
+        for cy in range(y0 // size, y1 // size + 1):
+            for cx in range(x0 // size, x1 // size + 1):
+                bucket = self.buckets.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+
+class InterestManager:
+    """Area-of-interest subscriptions for one session.
+
+    ``poll`` resolves a subscriber's viewport through the spatial hash and diffs the result against
+    what that subscriber was last sent, returning ``enter`` (full unit records), ``update``
+    (position/hp of known units that changed) and ``leave`` (ids that died or left the region).
+    Subscriptions are kept least recently used first: one not subscribed to or polled for
+    ``idle_ttl`` seconds is dropped, as is the oldest once there are more than ``max_subscribers``.
+    """
+
+    def __init__(
+        self,
+        cell_size: int = 8,
+        idle_ttl: float = 120.0,
+        max_subscribers: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.subscriptions: Dict[str, Subscription] = {}
+        self.index = SpatialHash(cell_size)
+        self.idle_ttl = idle_ttl
+        self.max_subscribers = max_subscribers
+        self._clock = clock
+        self.expired = 0
+
+    def subscribe(self, subscriber_id: str, viewport: Viewport, player_id: str | None = None) -> None:
+        existing = self.subscriptions.pop(subscriber_id, None)
+        if existing is None:
+            existing = Subscription(viewport, player_id)
+        else:
+            existing.viewport = viewport
+            existing.player_id = player_id
+        existing.last_seen = self._clock()
+        self.subscriptions[subscriber_id] = existing
+        self.expire()
+
+    def unsubscribe(self, subscriber_id: str) -> bool:
+        return self.subscriptions.pop(subscriber_id, None) is not None
+
+    def expire(self) -> int:
+        """Drops idle subscriptions, then the least recently used ones above the cap; returns how many."""
+        cutoff = self._clock() - self.idle_ttl
+        dropped = 0
+        for subscriber_id, subscription in list(self.subscriptions.items()):
+            if subscription.last_seen > cutoff and len(self.subscriptions) <= self.max_subscribers:
+                break
+            del self.subscriptions[subscriber_id]
+            dropped += 1
+        self.expired += dropped
+        return dropped
+
+    def poll(self, session: GameSession, subscriber_id: str) -> dict:
+        subscription = self.subscriptions.pop(subscriber_id)
+        subscription.last_seen = self._clock()
+        self.subscriptions[subscriber_id] = subscription
+        if self.index.version != session.version:
+            self.index.rebuild(session)
+
+        viewport = subscription.viewport
+        candidates = self.index.query(*viewport.bounds())
+        visibility = session.visibility() if subscription.player_id is not None else None
+
+        current: Dict[str, UnitView] = {}
+        enter: Dict[str, dict] = {}
+        update: Dict[str, dict] = {}
+        known = subscription.known
+        for unit_id in candidates:
+            unit = session.units[unit_id]
+            if not viewport.contains(unit.x, unit.y):
+                continue
+            if visibility is not None and unit.owner_player_id != subscription.player_id and not visibility.is_visible(subscription.player_id, unit.x, unit.y):
+                continue
+            view = (unit.owner_player_id, unit.unit_type, unit.domain, unit.x, unit.y, unit.hp)
+            current[unit_id] = view
+            previous = known.get(unit_id)
+            if previous is None:
+                enter[unit_id] = _unit_record(unit)
+            elif previous != view:
+                update[unit_id] = {"x": unit.x, "y": unit.y, "hp": unit.hp}
+
+        leave = sorted(unit_id for unit_id in known if unit_id not in current)
+        subscription.known = current
+        return {"tick": session.tick, "version": session.version, "enter": enter, "update": update, "leave": leave}
+
+
+def _unit_record(unit: Unit) -> dict:
+    return {
+        "owner_player_id": unit.owner_player_id,
+        "unit_type": unit.unit_type,
+        "domain": unit.domain,
+        "x": unit.x,
+        "y": unit.y,
+        "hp": unit.hp,
+    }
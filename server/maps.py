@@ -1,16 +1,31 @@
 from __future__ import annotations
 
+import base64
+import hashlib
+from functools import lru_cache
 from typing import Dict, List, Tuple
 
-from server.models import MapModel, ResourceNode
+from server.models import MapModel, MapTemplate, ResourceNode, template_cache
+from server.response_cache import CachedResponse
+from server.serialization import dumps
 
 Coord = Tuple[int, int]
 
+TERRAIN_TYPES: Tuple[str, ...] = ("land", "water")
+MAX_GENERATED_SIDE = 1024
+PLAINS_SIDE = 96
+# Non-default generated sizes kept built at once; each one holds its terrain and encoded /maps response.
+GENERATED_TEMPLATE_CACHE = 8
+
 
 def _fill(width: int, height: int, tile: str) -> List[List[str]]:
     return [[tile for _ in range(width)] for _ in range(height)]
 
 
+def _freeze(terrain: List[List[str]]) -> Tuple[Tuple[str, ...], ...]:
+    return tuple(tuple(row) for row in terrain)
+
+
 def _nodes(ore: Dict[Coord, int], oil: Dict[Coord, int], food: Dict[Coord, int]) -> Dict[Coord, ResourceNode]:
     result: Dict[Coord, ResourceNode] = {}
     for k, v in ore.items():
@@ -22,7 +37,8 @@ def _nodes(ore: Dict[Coord, int], oil: Dict[Coord, int], food: Dict[Coord, int])
     return result
 
 
-def islands_map() -> MapModel:
+@lru_cache(maxsize=None)
+def islands_template() -> MapTemplate:
     terrain = _fill(20, 20, "water")
     for y in range(3, 9):
         for x in range(2, 8):
@@ -33,16 +49,17 @@ def islands_map() -> MapModel:
     for y in range(7, 13):
         for x in range(8, 12):
             terrain[y][x] = "land"
-    return MapModel(
+    return MapTemplate(
         name="islands",
         width=20,
         height=20,
-        terrain=terrain,
+        terrain=_freeze(terrain),
         resources=_nodes({(4, 4): 500, (13, 13): 600, (9, 10): 400}, {(5, 7): 400, (15, 14): 500}, {(3, 6): 350, (14, 12): 400}),
     )
 
 
-def desert_map() -> MapModel:
+@lru_cache(maxsize=None)
+def desert_template() -> MapTemplate:
     terrain = _fill(20, 20, "land")
     for y in range(0, 20):
         terrain[y][9] = "water"
@@ -50,33 +67,191 @@ def desert_map() -> MapModel:
     for y in range(8, 12):
         terrain[y][9] = "land"
         terrain[y][10] = "land"
-    return MapModel(
+    return MapTemplate(
         name="desert",
         width=20,
         height=20,
-        terrain=terrain,
+        terrain=_freeze(terrain),
         resources=_nodes({(2, 2): 700, (17, 17): 700, (8, 9): 300}, {(6, 15): 650, (14, 4): 650}, {(4, 10): 300, (15, 10): 300}),
     )
 
 
-def archipelago_map() -> MapModel:
+@lru_cache(maxsize=None)
+def archipelago_template() -> MapTemplate:
     terrain = _fill(24, 24, "water")
     islands = [(2, 2, 6, 6), (10, 3, 14, 8), (16, 12, 22, 18), (4, 15, 9, 21), (12, 18, 16, 22)]
     for x0, y0, x1, y1 in islands:
         for y in range(y0, y1):
             for x in range(x0, x1):
                 terrain[y][x] = "land"
-    return MapModel(
+    return MapTemplate(
         name="archipelago",
         width=24,
         height=24,
-        terrain=terrain,
+        terrain=_freeze(terrain),
         resources=_nodes({(3, 3): 350, (11, 4): 300, (18, 15): 450, (6, 17): 400}, {(5, 5): 300, (19, 16): 450, (13, 20): 250}, {(4, 4): 300, (12, 6): 250, (17, 14): 350, (7, 19): 250}),
     )
 
 
-def get_map(name: str) -> MapModel:
-    maps = {"islands": islands_map, "desert": desert_map, "archipelago": archipelago_map}
-    if name not in maps:
+def _build_plains(width: int, height: int) -> MapTemplate:
+    terrain = _fill(width, height, "land")
+    for y in range(height):
+        for x in range(width // 2 - 2, width // 2 + 2):
+            terrain[y][x] = "water"
+    for y in range(height // 2 - 3, height // 2 + 3):
+        for x in range(width // 2 - 2, width // 2 + 2):
+            terrain[y][x] = "land"
+    ore = {(x, y): 800 for x in range(8, width, 24) for y in range(8, height, 24)}
+    oil = {(x + 6, y): 600 for x in range(8, width - 6, 24) for y in range(14, height, 24)}
+    food = {(x, y + 6): 500 for x in range(14, width, 24) for y in range(8, height - 6, 24)}
+    return MapTemplate(name="plains", width=width, height=height, terrain=_freeze(terrain), resources=_nodes(ore, oil, food))
+
+
+@lru_cache(maxsize=None)
+def _default_plains_template() -> MapTemplate:
+    return _build_plains(PLAINS_SIDE, PLAINS_SIDE)
+
+
+@lru_cache(maxsize=GENERATED_TEMPLATE_CACHE)
+def _generated_plains_template(width: int, height: int) -> MapTemplate:
+    return _build_plains(width, height)
+
+
+def plains_template(width: int = PLAINS_SIDE, height: int = PLAINS_SIDE) -> MapTemplate:
+    """The default size is cached for the process; other sizes share a small LRU cache."""
+    if width == PLAINS_SIDE and height == PLAINS_SIDE:
+        return _default_plains_template()
+    return _generated_plains_template(width, height)
+
+
+def islands_map() -> MapModel:
+    return MapModel(islands_template())
+
+
+def desert_map() -> MapModel:
+    return MapModel(desert_template())
+
+
+def archipelago_map() -> MapModel:
+    return MapModel(archipelago_template())
+
+
+def plains_map(width: int = PLAINS_SIDE, height: int = PLAINS_SIDE) -> MapModel:
+    return MapModel(plains_template(width, height))
+
+
+_TEMPLATES = {"islands": islands_template, "desert": desert_template, "archipelago": archipelago_template, "plains": plains_template}
+
+
+def get_template(name: str, width: int | None = None, height: int | None = None) -> MapTemplate:
+    """Shared, immutable template for ``name``; built on first use and cached for the process.
+
+    ``width``/``height`` select a size for generated maps (``plains``) and are ignored otherwise;
+    only the ``GENERATED_TEMPLATE_CACHE`` most recently used sizes other than the default stay cached.
+    """
+    if name not in _TEMPLATES:
         raise ValueError(f"unknown map: {name}")
-    return maps[name]()
+    if name == "plains" and width and height:
+        return plains_template(width, height)
+    return _TEMPLATES[name]()
+
+
+def get_map(name: str) -> MapModel:
+    """Fresh per-session map: shares the cached template's terrain, starts with full resource nodes."""
+    return MapModel(get_template(name))
+
+
+def _code_bits() -> int:
+    """Bits per packed tile code: 1, 2, 4 or 8, so a code never straddles a byte."""
+    needed = (len(TERRAIN_TYPES) - 1).bit_length()
+    return next(width for width in (1, 2, 4, 8) if width >= needed)
+
+
+def encode_terrain(template: MapTemplate) -> Tuple[str, bytes]:
+    """Row-major tile codes (indices into ``TERRAIN_TYPES``) in the smaller of two encodings.
+
+    ``rle`` is one LEB128 varint ``run_length * len(TERRAIN_TYPES) + code`` per run of equal tiles;
+    ``bits`` packs ``_code_bits`` wide codes least-significant bit first, which wins on noisy terrain.
+    """
+    codes = {name: code for code, name in enumerate(TERRAIN_TYPES)}
+    tiles = [codes[tile] for row in template.terrain for tile in row]
+    rle = bytearray()
+    start = 0
+    for index in range(1, len(tiles) + 1):
+        if index == len(tiles) or tiles[index] != tiles[start]:
+            value = (index - start) * len(TERRAIN_TYPES) + tiles[start]
+            while value >= 0x80:
+                rle.append(value & 0x7F | 0x80)
+                value >>= 7
+            rle.append(value)
+            start = index
+    width = _code_bits()
+    bits = bytearray((len(tiles) * width + 7) // 8)
+    for index, code in enumerate(tiles):
+        if code:
+            offset = index * width
+            bits[offset >> 3] |= code << (offset & 7)
+    return ("rle", bytes(rle)) if len(rle) <= len(bits) else ("bits", bytes(bits))
+
+
+def decode_terrain(encoding: str, blob: bytes, width: int, height: int) -> List[List[str]]:
+    """Inverse of ``encode_terrain``: terrain rows of ``TERRAIN_TYPES`` names."""
+    tiles: List[int] = []
+    if encoding == "rle":
+        value = shift = 0
+        for byte in blob:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                run, code = divmod(value, len(TERRAIN_TYPES))
+                if len(tiles) + run > width * height:
+                    raise ValueError("terrain blob does not match map size")
+                tiles.extend([code] * run)
+                value = shift = 0
+    elif encoding == "bits":
+        bit_width = _code_bits()
+        mask = (1 << bit_width) - 1
+        if len(blob) * 8 < width * height * bit_width:
+            raise ValueError("terrain blob does not match map size")
+        tiles = [(blob[offset >> 3] >> (offset & 7)) & mask for offset in range(0, width * height * bit_width, bit_width)]
+    else:
+        raise ValueError(f"unknown terrain encoding: {encoding}")
+    if len(tiles) != width * height:
+        raise ValueError("terrain blob does not match map size")
+    return [[TERRAIN_TYPES[code] for code in tiles[y * width : (y + 1) * width]] for y in range(height)]
+
+
+def describe_map(template: MapTemplate) -> dict:
+    """Dimensions, encoded terrain and base resource nodes of a template, for clients that draw the map.
+
+    ``terrain`` is the base64 ``encode_terrain`` blob and ``hash`` a digest of everything else in
+    the payload, so a client that has the map for a hash never needs to fetch it again. Built once
+    per template and kept in its ``template_cache``, like the passability masks.
+    """
+    cache = template_cache(template)
+    cached = cache.get("description")
+    if cached is None:
+        encoding, blob = encode_terrain(template)
+        cached = {
+            "name": template.name,
+            "width": template.width,
+            "height": template.height,
+            "terrain_types": list(TERRAIN_TYPES),
+            "terrain_encoding": encoding,
+            "terrain": base64.b64encode(blob).decode("ascii"),
+            "resource_nodes": [[x, y, node.resource_type, node.amount] for (x, y), node in sorted(template.resources.items())],
+        }
+        cached["hash"] = hashlib.blake2b(dumps(cached), digest_size=12).hexdigest()
+        cache["description"] = cached
+    return cached
+
+
+def map_response(template: MapTemplate) -> CachedResponse:
+    """``describe_map`` as cached JSON bytes whose ETag is the map hash."""
+    cache = template_cache(template)
+    cached = cache.get("response")
+    if cached is None:
+        description = describe_map(template)
+        cached = cache["response"] = CachedResponse.from_payload(200, description)
+        cached.etag = f'"{description["hash"]}"'
+    return cached
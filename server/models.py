@@ -1,10 +1,30 @@
 from __future__ import annotations
 
+import sys
+import weakref
+from array import array
 from dataclasses import dataclass, field
-from typing import Dict, List, Tuple
+from enum import IntEnum
+from typing import Dict, Tuple
 
 Coord = Tuple[int, int]
 
+_TEMPLATE_CACHES: Dict[int, dict] = {}
+
+
+def template_cache(template: MapTemplate) -> dict:
+    """Derived data of a template (masks, labels, encoded payloads), kept beside it rather than on it.
+
+    Keyed by identity, since hashing a template hashes its whole terrain; the entry is dropped
+    when the template is garbage collected.
+    """
+    key = id(template)
+    cache = _TEMPLATE_CACHES.get(key)
+    if cache is None:
+        cache = _TEMPLATE_CACHES.setdefault(key, {})
+        weakref.finalize(template, _TEMPLATE_CACHES.pop, key, None)
+    return cache
+
 
 @dataclass
 class UnitModel:
@@ -21,6 +41,7 @@ class UnitModel:
     attack_domains: Tuple[str, ...]
     bullet_drop: bool = False
     aoe_radius: int = 0
+    sight_range: int = 5
 
 
 @dataclass
@@ -29,13 +50,20 @@ class ResourceNode:
     amount: int
 
 
-@dataclass
-class MapModel:
+@dataclass(frozen=True)
+class MapTemplate:
+    """Immutable map definition shared by every session that plays on it.
+
+    Terrain is stored as nested tuples and base resource amounts as a mapping that is never
+    mutated. Passability masks and connected-component labels per unit domain are derived lazily
+    into ``template_cache``, so they are computed once per map rather than once per session.
+    """
+
     name: str
     width: int
     height: int
-    terrain: List[List[str]]
-    resources: Dict[Coord, ResourceNode] = field(default_factory=dict)
+    terrain: Tuple[Tuple[str, ...], ...]
+    resources: Dict[Coord, ResourceNode] = field(default_factory=dict, compare=False)
 
     def in_bounds(self, x: int, y: int) -> bool:
         return 0 <= x < self.width and 0 <= y < self.height
@@ -43,17 +71,131 @@ class MapModel:
     def tile(self, x: int, y: int) -> str:
         return self.terrain[y][x]
 
+    def passable(self, domain: str) -> bytes:
+        """Row-major ``width * height`` mask with 1 where units of ``domain`` may stand."""
+        cache = template_cache(self).setdefault("passable", {})
+        mask = cache.get(domain)
+        if mask is None:
+            mask = cache[domain] = bytes(
+                1 if domain == "air" or tile == domain else 0 for row in self.terrain for tile in row
+            )
+        return mask
+
+    def component(self, domain: str, x: int, y: int) -> int:
+        """Connected-component label of a tile for ``domain`` (4-neighbour), ``-1`` if impassable."""
+        cache = template_cache(self).setdefault("components", {})
+        labels = cache.get(domain)
+        if labels is None:
+            labels = cache[domain] = self._label_components(self.passable(domain))
+        return labels[y * self.width + x]
+
+    def _label_components(self, mask: bytes) -> array:
+        width, height = self.width, self.height
+        labels = array("i", [-1]) * (width * height)
+        next_label = 0
+        for start in range(width * height):
+            if not mask[start] or labels[start] >= 0:
+                continue
+            labels[start] = next_label
+            stack = [start]
+            while stack:
+                i = stack.pop()
+                x, y = i % width, i // width
+                for j, ok in ((i - 1, x > 0), (i + 1, x < width - 1), (i - width, y > 0), (i + width, y < height - 1)):
+                    if ok and mask[j] and labels[j] < 0:
+                        labels[j] = next_label
+                        stack.append(j)
+            next_label += 1
+        return labels
+
+
+@dataclass
+class MapModel:
+    """A session's view of a ``MapTemplate``.
+
+    Terrain and derived data are shared with the template; the only per-session state is
+    ``resource_amounts``, a copy-on-write overlay holding amounts for nodes that have been mined.
+    """
+
+    template: MapTemplate = field(repr=False)
+    resource_amounts: Dict[Coord, int] = field(default_factory=dict)
+    name: str = field(init=False)
+    width: int = field(init=False)
+    height: int = field(init=False)
+    terrain: Tuple[Tuple[str, ...], ...] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.name = self.template.name
+        self.width = self.template.width
+        self.height = self.template.height
+        self.terrain = self.template.terrain
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def tile(self, x: int, y: int) -> str:
+        return self.terrain[y][x]
+
+    def resource_at(self, coord: Coord) -> ResourceNode | None:
+        base = self.template.resources.get(coord)
+        if base is None:
+            return None
+        return ResourceNode(base.resource_type, self.resource_amounts.get(coord, base.amount))
+
+    def take_resource(self, coord: Coord, amount: int) -> int:
+        """Removes up to ``amount`` from the node at ``coord`` and returns how much was taken."""
+        node = self.resource_at(coord)
+        if node is None:
+            return 0
+        taken = min(amount, node.amount)
+        self.resource_amounts[coord] = node.amount - taken
+        return taken
+
+    @property
+    def resources(self) -> Dict[Coord, ResourceNode]:
+        """Current amount of every resource node (a fresh mapping; mutate through ``take_resource``)."""
+        amounts = self.resource_amounts
+        return {
+            coord: ResourceNode(node.resource_type, amounts.get(coord, node.amount)) for coord, node in self.template.resources.items()
+        }
+
 
 UNIT_MODELS: Dict[str, UnitModel] = {
-    "land_artillery": UnitModel("land_artillery", "land", 130, 2, 70, 8, 120, 60, 4, (2, 3, 1), attack_domains=("land", "water"), bullet_drop=True, aoe_radius=2),
-    "land_sniper": UnitModel("land_sniper", "land", 70, 3, 55, 10, 50, 20, 2, (1, 1, 1), attack_domains=("land",), bullet_drop=False, aoe_radius=0),
-    "land_tank": UnitModel("land_tank", "land", 180, 2, 40, 6, 160, 80, 3, (3, 3, 1), attack_domains=("land", "water"), bullet_drop=False, aoe_radius=1),
-    "land_infantry": UnitModel("land_infantry", "land", 55, 3, 18, 4, 20, 10, 2, (0, 1, 1), attack_domains=("land",), bullet_drop=True, aoe_radius=0),
-    "air_scout": UnitModel("air_scout", "air", 65, 5, 14, 4, 70, 100, 2, (1, 4, 1), attack_domains=("air",), bullet_drop=False, aoe_radius=0),
-    "air_bomber": UnitModel("air_bomber", "air", 120, 4, 65, 7, 180, 160, 3, (3, 5, 1), attack_domains=("land", "water"), bullet_drop=True, aoe_radius=2),
-    "air_fighter": UnitModel("air_fighter", "air", 100, 5, 36, 6, 130, 130, 2, (2, 4, 1), attack_domains=("air",), bullet_drop=False, aoe_radius=0),
-    "water_submarine": UnitModel("water_submarine", "water", 140, 3, 44, 7, 170, 90, 2, (2, 3, 1), attack_domains=("water",), bullet_drop=False, aoe_radius=1),
-    "water_destroyer": UnitModel("water_destroyer", "water", 210, 2, 56, 8, 240, 130, 5, (4, 4, 1), attack_domains=("water", "air"), bullet_drop=False, aoe_radius=1),
-    "water_aircraft_carrier": UnitModel("water_aircraft_carrier", "water", 350, 1, 50, 9, 500, 300, 8, (6, 7, 2), attack_domains=("air", "water"), bullet_drop=False, aoe_radius=1),
-    "water_battleship": UnitModel("water_battleship", "water", 320, 2, 62, 9, 420, 240, 6, (5, 6, 2), attack_domains=("land", "water"), bullet_drop=True, aoe_radius=2),
+    "land_artillery": UnitModel("land_artillery", "land", 130, 2, 70, 8, 120, 60, 4, (2, 3, 1), attack_domains=("land", "water"), bullet_drop=True, aoe_radius=2, sight_range=6),
+    "land_sniper": UnitModel("land_sniper", "land", 70, 3, 55, 10, 50, 20, 2, (1, 1, 1), attack_domains=("land",), bullet_drop=False, aoe_radius=0, sight_range=10),
+    "land_tank": UnitModel("land_tank", "land", 180, 2, 40, 6, 160, 80, 3, (3, 3, 1), attack_domains=("land", "water"), bullet_drop=False, aoe_radius=1, sight_range=5),
+    "land_infantry": UnitModel("land_infantry", "land", 55, 3, 18, 4, 20, 10, 2, (0, 1, 1), attack_domains=("land",), bullet_drop=True, aoe_radius=0, sight_range=5),
+    "air_scout": UnitModel("air_scout", "air", 65, 5, 14, 4, 70, 100, 2, (1, 4, 1), attack_domains=("air",), bullet_drop=False, aoe_radius=0, sight_range=9),
+    "air_bomber": UnitModel("air_bomber", "air", 120, 4, 65, 7, 180, 160, 3, (3, 5, 1), attack_domains=("land", "water"), bullet_drop=True, aoe_radius=2, sight_range=6),
+    "air_fighter": UnitModel("air_fighter", "air", 100, 5, 36, 6, 130, 130, 2, (2, 4, 1), attack_domains=("air",), bullet_drop=False, aoe_radius=0, sight_range=7),
+    "water_submarine": UnitModel("water_submarine", "water", 140, 3, 44, 7, 170, 90, 2, (2, 3, 1), attack_domains=("water",), bullet_drop=False, aoe_radius=1, sight_range=5),
+    "water_destroyer": UnitModel("water_destroyer", "water", 210, 2, 56, 8, 240, 130, 5, (4, 4, 1), attack_domains=("water", "air"), bullet_drop=False, aoe_radius=1, sight_range=7),
+    "water_aircraft_carrier": UnitModel("water_aircraft_carrier", "water", 350, 1, 50, 9, 500, 300, 8, (6, 7, 2), attack_domains=("air", "water"), bullet_drop=False, aoe_radius=1, sight_range=8),
+    "water_battleship": UnitModel("water_battleship", "water", 320, 2, 62, 9, 420, 240, 6, (5, 6, 2), attack_domains=("land", "water"), bullet_drop=True, aoe_radius=2, sight_range=7),
 }
+
+
+class Domain(IntEnum):
+    LAND = 0
+    AIR = 1
+    WATER = 2
+
+
+class ActionType(IntEnum):
+    MOVE = 0
+    STOP = 1
+    FIRE = 2
+    CREATE_GROUP = 3
+    ASSIGN_GROUP = 4
+    SPAWN_UNIT = 5
+    MINE = 6
+
+
+# Code <-> name tables. Names handed out by these tables are the canonical shared string objects,
+# so decoding a code (or canonicalizing a parsed name) never allocates a new string.
+DOMAINS: Tuple[str, ...] = tuple(sys.intern(code.name.lower()) for code in Domain)
+DOMAIN_CODES: Dict[str, int] = {name: code for code, name in enumerate(DOMAINS)}
+ACTION_TYPES: Tuple[str, ...] = tuple(sys.intern(code.name.lower()) for code in ActionType)
+ACTION_TYPE_CODES: Dict[str, int] = {name: code for code, name in enumerate(ACTION_TYPES)}
+UNIT_TYPES: Tuple[str, ...] = tuple(UNIT_MODELS)
+UNIT_TYPE_CODES: Dict[str, int] = {name: code for code, name in enumerate(UNIT_TYPES)}
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+from server.models import UNIT_MODELS
+from server.pathfinding import astar_path, repair_path, terrain_allowed
+from server.stencils import disc_offsets
+
+if TYPE_CHECKING:
+    from server.domain import ActionRequest, GameSession, Unit
+
+Coord = Tuple[int, int]
+
+GOAL_SHIFT_RADIUS = 3
+# Most ticks of movement one ``advance_movement`` call grants a unit (the scheduler's catch-up cap).
+MAX_ELAPSED_TICKS = 5
+_SHIFT_OFFSETS = sorted(disc_offsets(GOAL_SHIFT_RADIUS), key=lambda o: (o[0] * o[0] + o[1] * o[1], o[1], o[0]))[1:]
+
+
+class ReservationTable:
+    """Tile claims for one tick of movement.
+
+    ``occupied`` tracks where every unit stands as moves are applied step by step, and ``goals``
+    maps each claimed destination to the unit heading there (standing orders included), so two
+    orders never end on the same tile whatever order they were submitted in.
+    """
+
+    def __init__(self, units: Iterable[Unit]) -> None:
+        self.occupied: Dict[Coord, Unit] = {}
+        self.goals: Dict[Coord, str] = {}
+        for unit in units:
+            self.occupied[(unit.x, unit.y)] = unit
+            if unit.path:
+                self.goals[unit.path[-1]] = unit.unit_id
+
+    def goal_free(self, tile: Coord, unit: Unit, leaving: Dict[str, Unit]) -> bool:
+        claimant = self.goals.get(tile)
+        if claimant is not None and claimant != unit.unit_id:
+            return False
+        occupant = self.occupied.get(tile)
+        return occupant is None or occupant is unit or occupant.unit_id in leaving
+
+
+def resolve_moves(session: GameSession, actions: List[ActionRequest], tick: int) -> List[Tuple[bool, str]]:
+    """Resolves every ``move`` order of a tick in one pass over a shared ``ReservationTable``.
+
+    Orders are granted in a deterministic priority (shortest straight-line distance, then unit
+    id). A goal already claimed this tick is shifted to the nearest free tile around it instead of
+    being rejected; only goals held by a unit that is not moving are refused. Granted units then
+    take their first ``speed`` steps together, so the result does not depend on submission order.
+    """
+    started = time.perf_counter()
+    stats = session.movement_stats
+    outcomes: List[Tuple[bool, str]] = [(False, "pending")] * len(actions)
+    movers = session._moving_units()
+    table = ReservationTable(session.units.values())
+
+    valid: List[Tuple[int, Unit, ActionRequest]] = []
+    ordered: Dict[str, Unit] = {}
+    for position, action in enumerate(actions):
+        unit = session.units.get(action.unit_id)
+        if unit is None:
+            outcomes[position] = (False, "unit missing")
+        elif unit.owner_player_id != action.player_id:
+            outcomes[position] = (False, "unit does not belong to player")
+        elif unit.unit_id in ordered:
+            outcomes[position] = (False, "unit already ordered this tick")
+        else:
+            ordered[unit.unit_id] = unit
+            valid.append((position, unit, action))
+
+    leaving = {**movers, **ordered}
+    valid.sort(key=lambda item: ((item[2].target_x - item[1].x) ** 2 + (item[2].target_y - item[1].y) ** 2, item[1].unit_id))
+    granted: List[Unit] = []
+    for position, unit, action in valid:
+        goal = (action.target_x, action.target_y)
+        occupant = table.occupied.get(goal)
+        if occupant is not None and occupant is not unit and occupant.unit_id not in leaving:
+            outcomes[position] = (False, "target tile occupied (collision)")
+            continue
+        reason = "accepted"
+        if not table.goal_free(goal, unit, leaving):
+            shifted = _nearest_free_goal(session, table, unit, goal, leaving)
+            if shifted is None:
+                outcomes[position] = (False, "target tile reserved (collision)")
+                continue
+            goal = shifted
+            reason = f"accepted: goal shifted to {goal}"
+            stats["goal_shifts"] += 1
+
+        path = astar_path(session.game_map, (unit.x, unit.y), goal, unit.domain)
+        stats["path_searches"] += 1
+        if path is None:
+            outcomes[position] = (False, "no valid path")
+            continue
+
+        previous_goal = unit.path[-1] if unit.path else None
+        if previous_goal is not None and table.goals.get(previous_goal) == unit.unit_id:
+            del table.goals[previous_goal]
+        unit.path = path[1:]
+        unit.path_tick = tick
+        if unit.path:
+            table.goals[goal] = unit.unit_id
+            movers[unit.unit_id] = unit
+        outcomes[position] = (True, reason)
+        granted.append(unit)
+
+    step_units(session, table, [(unit, UNIT_MODELS[unit.unit_type].speed) for unit in granted])
+    for unit in granted:
+        if not unit.path:
+            movers.pop(unit.unit_id, None)
+
+    stats["orders"] += len(actions)
+    stats["rejected"] += sum(1 for accepted, _ in outcomes if not accepted)
+    stats["resolve_ms"] += 1000 * (time.perf_counter() - started)
+    return outcomes
+
+
+def advance_movement(session: GameSession, tick: int) -> int:
+    """Steps every unit with a standing move order along its path up to ``tick``; returns movers left.
+
+    Ticks come from clients, so a unit is moved for at most ``MAX_ELAPSED_TICKS`` ticks per call
+    however far ``tick`` jumps ahead.
+    """
+    if tick > session.tick:
+        session.movement_stats["ticks"] += 1
+    movers = session._moving_units()
+    if not movers:
+        return 0
+    started = time.perf_counter()
+    table = ReservationTable(session.units.values())
+    budgets: List[Tuple[Unit, int]] = []
+    for unit_id in sorted(movers):
+        unit = movers[unit_id]
+        elapsed = min(tick - unit.path_tick, MAX_ELAPSED_TICKS)
+        if elapsed > 0:
+            unit.path_tick = tick
+            budgets.append((unit, UNIT_MODELS[unit.unit_type].speed * elapsed))
+    step_units(session, table, budgets)
+    for unit_id in [uid for uid, unit in movers.items() if not unit.path]:
+        del movers[unit_id]
+    session.movement_stats["resolve_ms"] += 1000 * (time.perf_counter() - started)
+    return len(movers)
+
+
+def step_units(session: GameSession, table: ReservationTable, budgets: List[Tuple[Unit, int]]) -> None:
+    """Moves units up to their step budgets in list order.
+
+    A unit blocked by another mover waits; waiting units retry (most recently blocked first, so a
+    column listed tail-first drains in one round) for as long as any of them makes progress.
+    Units still stuck then repair their paths locally around the blocker, re-planning in full only
+    when no local detour exists. Orders that cannot get past a stationary unit even then are
+    cancelled; units stuck behind movers keep their order and retry next tick.
+    """
+    pending = budgets
+    while pending:
+        waiting: List[Tuple[Unit, int]] = []
+        progressed = False
+        for unit, budget in pending:
+            leftover = _advance_unit(session, table, unit, budget, patient=True)
+            if leftover:
+                waiting.append((unit, leftover))
+            progressed = progressed or leftover < budget
+        if not progressed:
+            break
+        pending = waiting[::-1]
+    for unit, budget in pending:
+        _advance_unit(session, table, unit, budget, patient=False)
+
+
+def _advance_unit(session: GameSession, table: ReservationTable, unit: Unit, budget: int, patient: bool) -> int:
+    occupied = table.occupied
+    stats = session.movement_stats
+    steps = 0
+    while steps < budget and unit.path:
+        step = unit.path[0]
+        blocker = occupied.get(step)
+        if blocker is not None and blocker is not unit:
+            if patient and blocker.path:
+                stats["steps"] += steps
+                return budget - steps
+            detour = repair_path(session.game_map, (unit.x, unit.y), unit.path, unit.domain, occupied)
+            if detour is None:
+                detour = astar_path(session.game_map, (unit.x, unit.y), unit.path[-1], unit.domain, occupied)
+                detour = detour[1:] if detour is not None else None
+                stats["path_searches"] += 1
+            if detour is None:
+                if not blocker.path:
+                    unit.path = []
+                    stats["cancelled"] += 1
+                break
+            unit.path = detour
+            stats["repairs"] += 1
+            continue
+        if occupied.get((unit.x, unit.y)) is unit:
+            del occupied[(unit.x, unit.y)]
+        unit.x, unit.y = step
+        occupied[step] = unit
+        unit.path.pop(0)
+        steps += 1
+    stats["steps"] += steps
+    return 0
+
+
+def _nearest_free_goal(session: GameSession, table: ReservationTable, unit: Unit, goal: Coord, leaving: Dict[str, Unit]) -> Coord | None:
+    game_map = session.game_map
+    gx, gy = goal
+    for dx, dy in _SHIFT_OFFSETS:
+        tile = (gx + dx, gy + dy)
+        if not game_map.in_bounds(*tile) or not terrain_allowed(unit.domain, game_map.tile(*tile)):
+            continue
+        if table.goal_free(tile, unit, leaving):
+            return tile
+    return None
+
@@ -1,9 +1,19 @@
 from __future__ import annotations
 
+import argparse
 import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List
 
-from server.domain import ActionRequest
-from server.persistence import InMemoryRepository
+from server.domain import ActionRequest, GameSession, PlayerState, Unit
+from server.maps import get_map
+from server.models import UNIT_MODELS, MapModel
+from server.pathfinding import terrain_allowed
+from server.persistence import InMemoryRepository, NullRepository
 from server.service import GameService
 
 
@@ -25,5 +35,156 @@ def run_offline_demo() -> None:
     print(json.dumps(service.get_state("demo"), indent=2))
 
 
+@dataclass
+class GameSummary:
+    seed: int
+    map: str
+    winner: str | None
+    ticks: int
+    resources: Dict[str, Dict[str, int]]
+    units_lost: Dict[str, int]
+    units_remaining: Dict[str, int]
+    actions: int
+
+
+def build_headless_session(
+    seed: int,
+    map_name: str = "desert",
+    bots: int = 2,
+    units_per_bot: int = 8,
+    game_map: MapModel | None = None,
+) -> GameSession:
+    """All-bot session with each bot's army placed deterministically in its own vertical band of the map."""
+    rng = random.Random(seed)
+    game_map = game_map or get_map(map_name)
+    unit_types = sorted(unit_type for unit_type, model in UNIT_MODELS.items() if model.domain != "water")
+    session = GameSession(
+        session_id=f"headless-{seed}",
+        tick=0,
+        game_map=game_map,
+        players={f"bot-{b}": PlayerState(f"bot-{b}", is_bot=True) for b in range(bots)},
+        units={},
+    )
+    band = game_map.width // bots
+    occupied = set()
+    for b in range(bots):
+        placed = 0
+        while placed < units_per_bot:
+            unit_type = rng.choice(unit_types)
+            model = UNIT_MODELS[unit_type]
+            x, y = rng.randrange(b * band, (b + 1) * band), rng.randrange(game_map.height)
+            if (x, y) in occupied or not terrain_allowed(model.domain, game_map.tile(x, y)):
+                continue
+            occupied.add((x, y))
+            unit_id = f"u-{session.next_unit_index}"
+            session.next_unit_index += 1
+            session.add_unit(Unit(unit_id, f"bot-{b}", unit_type, model.domain, x, y, model.hp))
+            placed += 1
+    return session
+
+
+def simulate_game(seed: int, map_name: str = "desert", bots: int = 2, units_per_bot: int = 8, max_ticks: int = 300) -> GameSummary:
+    """Fast-forwards one bot-vs-bot game without HTTP, state payloads or action-log storage."""
+    session = build_headless_session(seed, map_name, bots, units_per_bot)
+    repository = NullRepository()
+    service = GameService(repository=repository, sessions={session.session_id: session}, seed=seed)
+    initial = {player_id: len(session.units_of(player_id)) for player_id in session.players}
+
+    tick = 0
+    alive = set(initial)
+    while tick < max_ticks and len(alive) > 1:
+        tick += 1
+        service.tick_bots(session.session_id, tick)
+        alive = {player_id for player_id in initial if session.units_of(player_id)}
+
+    remaining = {player_id: len(session.units_of(player_id)) for player_id in initial}
+    return GameSummary(
+        seed=seed,
+        map=map_name,
+        winner=next(iter(alive)) if len(alive) == 1 else None,
+        ticks=tick,
+        resources={
+            pid: {"metal": p.resources.metal, "energy": p.resources.energy, "food": p.resources.food}
+            for pid, p in session.players.items()
+        },
+        units_lost={player_id: initial[player_id] - remaining[player_id] for player_id in initial},
+        units_remaining=remaining,
+        actions=repository.analytics_snapshot(session.session_id)["total_actions"],
+    )
+
+
+def _simulate_kwargs(kwargs: dict) -> GameSummary:
+    return simulate_game(**kwargs)
+
+
+def run_headless(
+    games: int,
+    workers: int = 0,
+    seed: int = 1,
+    map_name: str = "desert",
+    bots: int = 2,
+    units_per_bot: int = 8,
+    max_ticks: int = 300,
+) -> tuple[List[GameSummary], dict]:
+    """Runs ``games`` independent games (seeds ``seed .. seed + games - 1``) across a process pool.
+
+    ``workers=0`` runs in-process. Results are identical for any worker count since each game
+    only depends on its own seed.
+    """
+    jobs = [
+        {"seed": seed + i, "map_name": map_name, "bots": bots, "units_per_bot": units_per_bot, "max_ticks": max_ticks}
+        for i in range(games)
+    ]
+    started = time.perf_counter()
+    if workers > 0:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            summaries = list(pool.map(_simulate_kwargs, jobs, chunksize=max(1, games // (workers * 4))))
+    else:
+        summaries = [_simulate_kwargs(job) for job in jobs]
+    seconds = time.perf_counter() - started
+
+    total_ticks = sum(summary.ticks for summary in summaries)
+    wins: Dict[str, int] = {}
+    for summary in summaries:
+        key = summary.winner or "draw"
+        wins[key] = wins.get(key, 0) + 1
+    report = {
+        "games": games,
+        "workers": workers,
+        "map": map_name,
+        "seconds": round(seconds, 3),
+        "games_per_sec": round(games / seconds, 2) if seconds else 0.0,
+        "ticks_per_sec": round(total_ticks / seconds, 1) if seconds else 0.0,
+        "avg_ticks": round(total_ticks / games, 1) if games else 0.0,
+        "results": dict(sorted(wins.items())),
+    }
+    return summaries, report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MMORTS offline simulation")
+    parser.add_argument("--headless", action="store_true", help="fast-forward many bot-vs-bot games instead of the scripted demo")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--map", default="desert")
+    parser.add_argument("--bots", type=int, default=2)
+    parser.add_argument("--units-per-bot", type=int, default=8)
+    parser.add_argument("--max-ticks", type=int, default=300)
+    parser.add_argument("--summaries", help="write one JSON summary per game to this path")
+    args = parser.parse_args()
+
+    if not args.headless:
+        run_offline_demo()
+        return
+
+    summaries, report = run_headless(args.games, args.workers, args.seed, args.map, args.bots, args.units_per_bot, args.max_ticks)
+    if args.summaries:
+        with open(args.summaries, "w", encoding="utf-8") as handle:
+            for summary in summaries:
+                handle.write(json.dumps(asdict(summary)) + "\n")
+    print(json.dumps(report, indent=2))
+
+
 if __name__ == "__main__":
-    run_offline_demo()
+    main()
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import heapq
-from typing import Dict, List, Optional, Tuple
+from typing import Container, Dict, List, Optional, Tuple
 
 from server.models import MapModel
 
@@ -26,26 +26,41 @@ def terrain_allowed(unit_domain: str, tile: str) -> bool:
     return False
 
 
-def astar_path(game_map: MapModel, start: Coord, goal: Coord, unit_domain: str) -> Optional[List[Coord]]:
+def astar_path(
+    game_map: MapModel,
+    start: Coord,
+    goal: Coord,
+    unit_domain: str,
+    blocked: Container[Coord] = (),
+    max_expansions: int | None = None,
+) -> Optional[List[Coord]]:
     if not game_map.in_bounds(*start) or not game_map.in_bounds(*goal):
         return None
-    if not terrain_allowed(unit_domain, game_map.tile(*goal)):
+    template = game_map.template
+    width, height = template.width, template.height
+    passable = template.passable(unit_domain)
+    if not passable[goal[1] * width + goal[0]]:
+        return None
+    start_component = template.component(unit_domain, *start)
+    if start_component >= 0 and start_component != template.component(unit_domain, *goal):
         return None
 
     open_heap: List[Tuple[int, Coord]] = [(0, start)]
     came_from: Dict[Coord, Coord] = {}
     g_score: Dict[Coord, int] = {start: 0}
 
+    expansions = 0
     while open_heap:
         _, current = heapq.heappop(open_heap)
         if current == goal:
             return _reconstruct(came_from, current)
+        expansions += 1
+        if max_expansions is not None and expansions > max_expansions:
+            return None
 
         for nxt in _neighbors(*current):
             x, y = nxt
-            if not game_map.in_bounds(x, y):
-                continue
-            if not terrain_allowed(unit_domain, game_map.tile(x, y)):
+            if not (0 <= x < width and 0 <= y < height) or not passable[y * width + x] or nxt in blocked:
                 continue
 
             tentative = g_score[current] + 1
@@ -57,6 +72,32 @@ def astar_path(game_map: MapModel, start: Coord, goal: Coord, unit_domain: str)
     return None
 
 
+def repair_path(
+    game_map: MapModel,
+    start: Coord,
+    path: List[Coord],
+    unit_domain: str,
+    blocked: Container[Coord],
+    lookahead: int = 8,
+    max_expansions: int = 256,
+) -> Optional[List[Coord]]:
+    """Detours around blocked waypoints of ``path`` (the remaining steps after ``start``).
+
+    The search re-joins the original path at the first free waypoint within ``lookahead`` steps
+    (falling back to the final goal) and is bounded by ``max_expansions``, so a blocked unit pays
+    for a small local search rather than a full re-plan. Returns ``None`` when no detour is found.
+    """
+    rejoin = next((i for i in range(min(lookahead, len(path))) if path[i] not in blocked), None)
+    if rejoin is None:
+        if not path or path[-1] in blocked:
+            return None
+        rejoin = len(path) - 1
+    detour = astar_path(game_map, start, path[rejoin], unit_domain, blocked, max_expansions)
+    if detour is None:
+        return None
+    return detour[1:] + path[rejoin + 1 :]
+
+
 def raytrace_line(start: Coord, end: Coord) -> List[Coord]:
     x0, y0 = start
     x1, y1 = end
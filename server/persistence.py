@@ -1,11 +1,150 @@
 from __future__ import annotations
 
 import base64
-import json
-from dataclasses import asdict
-from typing import Dict
+import threading
+import time
+from collections import deque
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Sequence, Tuple
 
-from server.domain import ActionRequest
+from server.domain import ActionRequest, GameSession
+from server.pool import QUERY_CLASSES, ConnectionPool, PoolUnavailable, QueryClass
+from server.rollups import ROLLUP_COLUMNS, ROLLUP_TICKS, Breakdown, Rollups, bucket_range, merge, summarize
+from server.serialization import action_wire_size
+
+ACTION_LOG_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("session_id", "STRING"),
+    ("player_id", "STRING"),
+    ("tick", "INT"),
+    ("action_type", "STRING"),
+    ("unit_id", "STRING"),
+    ("target_x", "INT"),
+    ("target_y", "INT"),
+    ("group_id", "STRING"),
+    ("unit_type", "STRING"),
+    ("resource_type", "STRING"),
+    ("accepted", "BOOLEAN"),
+    ("reason", "STRING"),
+    ("network_bytes", "INT"),
+)
+
+_ACCEPTED = [name for name, _ in ACTION_LOG_COLUMNS].index("accepted")
+_NETWORK_BYTES = [name for name, _ in ACTION_LOG_COLUMNS].index("network_bytes")
+_REASON = [name for name, _ in ACTION_LOG_COLUMNS].index("reason")
+
+# ``breakdown(session_id, by)`` groups the session's action log by one of these columns.
+BREAKDOWNS: Dict[str, str] = {"player": "player_id", "action_type": "action_type"}
+
+UNIT_STATE_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("session_id", "STRING"),
+    ("tick", "INT"),
+    ("unit_id", "STRING"),
+    ("owner_player_id", "STRING"),
+    ("unit_type", "STRING"),
+    ("domain", "STRING"),
+    ("x", "INT"),
+    ("y", "INT"),
+    ("hp", "INT"),
+)
+
+
+def table_ddl(table_name: str, columns: Sequence[Tuple[str, str]]) -> str:
+    body = ",\n".join(f"    {name} {sql_type}" for name, sql_type in columns)
+    return f"CREATE TABLE IF NOT EXISTS {table_name} (\n{body}\n)"
+
+
+def action_row(action: ActionRequest, accepted: bool, reason: str) -> tuple:
+    return (
+        action.session_id,
+        action.player_id,
+        action.tick,
+        action.action_type,
+        action.unit_id,
+        action.target_x,
+        action.target_y,
+        action.group_id,
+        action.unit_type,
+        action.resource_type,
+        accepted,
+        reason,
+        action_wire_size(action),
+    )
+
+
+def add_to_rollups(rollups: Rollups, row: tuple) -> None:
+    rollups.add(row[0], row[1], row[2], row[3], row[_ACCEPTED], row[_REASON], row[_NETWORK_BYTES])
+
+
+def unit_state_rows(session: GameSession) -> List[tuple]:
+    return [
+        (session.session_id, session.tick, u.unit_id, u.owner_player_id, u.unit_type, u.domain, u.x, u.y, u.hp)
+        for u in session.units.values()
+    ]
+
+
+def arrow_schema(columns: Sequence[Tuple[str, str]]):
+    import pyarrow as pa
+
+    types = {"STRING": pa.string(), "INT": pa.int32(), "BOOLEAN": pa.bool_()}
+    return pa.schema([(name, types[sql_type]) for name, sql_type in columns])
+
+
+def rows_to_batch(columns: Sequence[Tuple[str, str]], rows: Sequence[tuple]):
+    import pyarrow as pa
+
+    schema = arrow_schema(columns)
+    values = list(zip(*rows)) if rows else [() for _ in columns]
+    arrays = [pa.array(list(column), type=field.type) for column, field in zip(values, schema)]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class ArrowFileSink:
+    """Writes each table as Arrow IPC (``.arrow``/``.feather``) or Parquet files under ``directory``."""
+
+    def __init__(self, directory: str, fmt: str = "arrow") -> None:
+        if fmt not in ("arrow", "feather", "parquet"):
+            raise ValueError(f"unsupported arrow export format: {fmt}")
+        self.directory = Path(directory)
+        self.fmt = fmt
+        self._parts: Dict[str, int] = {}
+
+    def write(self, table_name: str, batch) -> str:
+        import pyarrow as pa
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        part = self._parts.get(table_name, 0)
+        self._parts[table_name] = part + 1
+        path = self.directory / f"{table_name}-{part:06d}.{self.fmt}"
+        table = pa.Table.from_batches([batch])
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, path)
+        else:
+            import pyarrow.feather as feather
+
+            feather.write_feather(table, path, compression="uncompressed")
+        return str(path)
+
+
+class FlightPutSink:
+    """Streams batches to a Flight endpoint with DoPut, one descriptor path per table."""
+
+    def __init__(self, endpoint: str, username: str = "admin", password: str = "admin") -> None:
+        import pyarrow.flight as flight
+
+        self._flight = flight
+        self._client = flight.FlightClient(endpoint)
+        auth = base64.b64encode(f"{username}:{password}".encode("utf-8"))
+        self._options = flight.FlightCallOptions(headers=[(b"authorization", b"Basic " + auth)])
+
+    def write(self, table_name: str, batch) -> str:
+        descriptor = self._flight.FlightDescriptor.for_path(table_name)
+        writer, _ = self._client.do_put(descriptor, batch.schema, options=self._options)
+        writer.write_batch(batch)
+        writer.close()
+        return table_name
 
 
 class Repository:
@@ -15,23 +154,63 @@ class Repository:
     def analytics_snapshot(self, session_id: str) -> Dict[str, int]:
         raise NotImplementedError
 
+    def breakdown(self, session_id: str, by: str) -> List[Dict[str, Any]]:
+        """Action counts for the session grouped by ``BREAKDOWNS[by]``, one row per value in order."""
+        return []
+
+    def analytics(self, session_id: str, from_tick: int | None = None, to_tick: int | None = None) -> dict:
+        """Rollup series, rejection reasons and action mix for buckets overlapping ``from_tick..to_tick``."""
+        return summarize(session_id, ROLLUP_TICKS, ({}, {}, {}))
+
+    def record_unit_state(self, session: GameSession) -> None:
+        return None
+
+    def operational_metrics(self) -> dict:
+        return {}
+
+
+class NullRepository(Repository):
+    """Discards action rows and keeps only per-session counters; used by headless simulation runs."""
 
-class InMemoryRepository(Repository):
     def __init__(self) -> None:
-        self._records = []
+        self._counts: Dict[str, List[int]] = {}
 
     def persist_action(self, action: ActionRequest, accepted: bool, reason: str) -> None:
-        payload = asdict(action)
-        payload["accepted"] = accepted
-        payload["reason"] = reason
-        payload["network_bytes"] = len(json.dumps(asdict(action)))
-        self._records.append(payload)
+        counts = self._counts.get(action.session_id)
+        if counts is None:
+            counts = self._counts[action.session_id] = [0, 0]
+        counts[0] += 1
+        if accepted:
+            counts[1] += 1
 
     def analytics_snapshot(self, session_id: str) -> Dict[str, int]:
-        scoped = [record for record in self._records if record["session_id"] == session_id]
-        accepted = len([record for record in scoped if record["accepted"]])
+        total, accepted = self._counts.get(session_id, (0, 0))
+        return {
+            "session_id": session_id,
+            "total_actions": total,
+            "accepted_actions": accepted,
+            "rejected_actions": total - accepted,
+            "network_bytes": 0,
+        }
+
+
+class InMemoryRepository(Repository):
+    """Keeps every action as its ``action_log`` row tuple, plus rollups per ``rollup_ticks`` ticks."""
+
+    def __init__(self, rollup_ticks: int = ROLLUP_TICKS) -> None:
+        self._records: List[tuple] = []
+        self.rollups = Rollups(rollup_ticks)
+
+    def persist_action(self, action: ActionRequest, accepted: bool, reason: str) -> None:
+        row = action_row(action, accepted, reason)
+        self._records.append(row)
+        add_to_rollups(self.rollups, row)
+
+    def analytics_snapshot(self, session_id: str) -> Dict[str, int]:
+        scoped = [record for record in self._records if record[0] == session_id]
+        accepted = sum(1 for record in scoped if record[_ACCEPTED])
         total = len(scoped)
-        network_bytes = sum(record["network_bytes"] for record in scoped)
+        network_bytes = sum(record[_NETWORK_BYTES] for record in scoped)
         return {
             "session_id": session_id,
             "total_actions": total,
@@ -40,81 +219,388 @@ class InMemoryRepository(Repository):
             "network_bytes": network_bytes,
         }
 
+    def breakdown(self, session_id: str, by: str) -> List[Dict[str, Any]]:
+        column = BREAKDOWNS[by]
+        index = [name for name, _ in ACTION_LOG_COLUMNS].index(column)
+        groups: Dict[Any, List[int]] = {}
+        for record in self._records:
+            if record[0] != session_id:
+                continue
+            counts = groups.get(record[index])
+            if counts is None:
+                counts = groups[record[index]] = [0, 0, 0]
+            counts[0] += 1
+            counts[1] += 1 if record[_ACCEPTED] else 0
+            counts[2] += record[_NETWORK_BYTES]
+        return [_breakdown_row(column, key, *groups[key]) for key in sorted(groups)]
+
+    def analytics(self, session_id: str, from_tick: int | None = None, to_tick: int | None = None) -> dict:
+        bucket_ticks = self.rollups.bucket_ticks
+        return summarize(session_id, bucket_ticks, self.rollups.query(session_id, *bucket_range(bucket_ticks, from_tick, to_tick)))
+
+    def export_action_log(self, session_id: str | None = None):
+        rows = [record for record in self._records if session_id is None or record[0] == session_id]
+        return rows_to_batch(ACTION_LOG_COLUMNS, rows)
+
+
+class ArrowExportRepository(Repository):
+    """Wraps another repository and mirrors action_log and unit-state rows into Arrow batches.
+
+    Rows are buffered and handed to ``sink`` as one RecordBatch per ``batch_rows`` rows, so the
+    gameplay path pays a tuple append per action instead of a columnar write.
+    """
+
+    def __init__(self, inner: Repository, sink, batch_rows: int = 4096) -> None:
+        self.inner = inner
+        self.sink = sink
+        self.batch_rows = batch_rows
+        self._action_rows: List[tuple] = []
+        self._unit_rows: List[tuple] = []
+        self.exported_locations: List[str] = []
+
+    def persist_action(self, action: ActionRequest, accepted: bool, reason: str) -> None:
+        self.inner.persist_action(action, accepted, reason)
+        self._action_rows.append(action_row(action, accepted, reason))
+        if len(self._action_rows) >= self.batch_rows:
+            self._flush_table("action_log", ACTION_LOG_COLUMNS, self._action_rows)
+            self._action_rows = []
+
+    def analytics_snapshot(self, session_id: str) -> Dict[str, int]:
+        return self.inner.analytics_snapshot(session_id)
+
+    def breakdown(self, session_id: str, by: str) -> List[Dict[str, Any]]:
+        return self.inner.breakdown(session_id, by)
+
+    def analytics(self, session_id: str, from_tick: int | None = None, to_tick: int | None = None) -> dict:
+        return self.inner.analytics(session_id, from_tick, to_tick)
+
+    def operational_metrics(self) -> dict:
+        return self.inner.operational_metrics()
+
+    def record_unit_state(self, session: GameSession) -> None:
+        self.inner.record_unit_state(session)
+        self._unit_rows.extend(unit_state_rows(session))
+        if len(self._unit_rows) >= self.batch_rows:
+            self._flush_table("unit_state", UNIT_STATE_COLUMNS, self._unit_rows)
+            self._unit_rows = []
+
+    def flush(self) -> None:
+        if self._action_rows:
+            self._flush_table("action_log", ACTION_LOG_COLUMNS, self._action_rows)
+            self._action_rows = []
+        if self._unit_rows:
+            self._flush_table("unit_state", UNIT_STATE_COLUMNS, self._unit_rows)
+            self._unit_rows = []
+
+    def _flush_table(self, table_name: str, columns: Sequence[Tuple[str, str]], rows: Iterable[tuple]) -> None:
+        batch = rows_to_batch(columns, list(rows))
+        self.exported_locations.append(self.sink.write(table_name, batch))
+
 
 class AwanDbRepository(Repository):
-    def __init__(self, endpoint: str, username: str, password: str) -> None:
-        from adbc_driver_flightsql import dbapi
+    """Flight SQL repository with one bounded connection pool per query class.
 
-        self._dbapi = dbapi
-        auth = base64.b64encode(f"{username}:{password}".encode("utf-8")).decode("utf-8")
-        self._conn = self._dbapi.connect(
-            endpoint,
-            db_kwargs={"adbc.flight.sql.rpc.call_header.Authorization": f"Basic {auth}"},
-        )
-        self._cursor = self._conn.cursor()
-        self._cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS action_log (
-                session_id STRING,
-                player_id STRING,
-                tick INT,
-                action_type STRING,
-                unit_id STRING,
-                target_x INT,
-                target_y INT,
-                group_id STRING,
-                unit_type STRING,
-                resource_type STRING,
-                accepted BOOLEAN,
-                reason STRING,
-                network_bytes INT
+    ``persist_action`` uses the ``write`` pool, the per-session counters returned with every action
+    and state response use ``nearline`` and ``breakdown`` reports use ``analytics``, so each class
+    has its own concurrency limit and checkout timeout (``QUERY_CLASSES``, overridden per class by
+    ``query_classes``; ``pool_size`` sizes the write pool) and may point at its own endpoint such
+    as a read replica. Remaining ``pool_options`` apply to every pool.
+
+    Writes that fail while AwanDB is unreachable are buffered (up to ``pending_limit`` rows) and
+    replayed in order by a background thread, retrying every ``replay_interval`` seconds until a
+    connection can be re-established; rows the database rejects (bad values, SQL errors) are
+    counted and dropped instead, so one of them can never hold up the rows behind it. Reads that
+    fail or time out fall back to the last result served for the session.
+
+    Rollups are materialized in ``action_rollup``: ``persist_action`` accumulates them in memory
+    and, every ``rollup_flush_rows`` actions, wakes a background thread that appends them as
+    additive delta rows (retrying every ``replay_interval`` seconds while AwanDB is unreachable).
+    ``analytics`` sums the table's rows with the deltas not yet flushed.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        username: str,
+        password: str,
+        pool_size: int = 4,
+        pending_limit: int = 100_000,
+        connect: Callable[[], Any] | None = None,
+        query_classes: Dict[str, QueryClass] | None = None,
+        rollup_ticks: int = ROLLUP_TICKS,
+        rollup_flush_rows: int = 512,
+        replay_interval: float = 0.5,
+        **pool_options: Any,
+    ) -> None:
+        classes = {**QUERY_CLASSES, "write": replace(QUERY_CLASSES["write"], size=pool_size), **(query_classes or {})}
+        self._pools = {
+            name: ConnectionPool(
+                connect or _flight_sql_connect(query_class.endpoint or endpoint, username, password),
+                size=query_class.size,
+                **{"checkout_timeout": query_class.checkout_timeout, **pool_options},
             )
-            """
-        )
+            for name, query_class in classes.items()
+        }
+        self._pool = self._pools["write"]
+        self._pending: Deque[tuple] = deque()
+        self._pending_limit = pending_limit
+        self._pending_lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._replaying = False
+        self._replay_interval = replay_interval
+        self._dropped_writes = 0
+        self._rejected_writes = 0
+        self._last_snapshots: Dict[str, Dict[str, int]] = {}
+        self._last_breakdowns: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._rollups = Rollups(rollup_ticks)
+        self._rollup_flush_rows = rollup_flush_rows
+        self._rollup_lock = threading.Lock()
+        self._flushing = False
+        self._last_analytics: Dict[Tuple[str, int, int], Breakdown] = {}
+        with self._pool.connection() as cursor:
+            cursor.execute(table_ddl("action_log", ACTION_LOG_COLUMNS))
+            cursor.execute(table_ddl("action_rollup", ROLLUP_COLUMNS))
 
     def persist_action(self, action: ActionRequest, accepted: bool, reason: str) -> None:
-        self._cursor.execute(
-            """
-            INSERT INTO action_log
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                action.session_id,
-                action.player_id,
-                action.tick,
-                action.action_type,
-                action.unit_id,
-                action.target_x,
-                action.target_y,
-                action.group_id,
-                action.unit_type,
-                action.resource_type,
-                accepted,
-                reason,
-                len(json.dumps(asdict(action))),
-            ),
-        )
+        row = action_row(action, accepted, reason)
+        add_to_rollups(self._rollups, row)
+        if self._rollups.added >= self._rollup_flush_rows:
+            self._schedule_flush()
+        if not self._pending:
+            try:
+                self._write(row)
+                return
+            except Exception:
+                pass
+        self._buffer(row)
+
+    def flush_rollups(self) -> bool:
+        """Appends the accumulated rollup deltas to ``action_rollup``; they are kept if the write fails.
+
+        Returns False when the deltas were kept or another flush or ``analytics`` held the lock.
+        """
+        if not self._rollup_lock.acquire(blocking=False):
+            return False
+        try:
+            rows = self._rollups.drain()
+            if not rows:
+                return True
+            try:
+                with self._pool.connection() as cursor:
+                    for row in rows:
+                        cursor.execute("INSERT INTO action_rollup VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+            except Exception:
+                self._rollups.add_rows(rows)
+                return False
+            return True
+        finally:
+            self._rollup_lock.release()
 
     def analytics_snapshot(self, session_id: str) -> Dict[str, int]:
-        self._cursor.execute(
-            """
-            SELECT
-                COUNT(*) AS total_actions,
-                SUM(CASE WHEN accepted THEN 1 ELSE 0 END) AS accepted_actions,
-                SUM(network_bytes) AS network_bytes
-            FROM action_log
-            WHERE session_id = ?
-            """,
-            (session_id,),
-        )
-        row = self._cursor.fetchall()[0]
+        try:
+            with self._pools["nearline"].connection() as cursor:
+                cursor.execute(
+                    """
+                    SELECT
+                        COUNT(*) AS total_actions,
+                        SUM(CASE WHEN accepted THEN 1 ELSE 0 END) AS accepted_actions,
+                        SUM(network_bytes) AS network_bytes
+                    FROM action_log
+                    WHERE session_id = ?
+                    """,
+                    (session_id,),
+                )
+                row = cursor.fetchall()[0]
+        except Exception:
+            return self._last_snapshots.get(session_id, _empty_snapshot(session_id))
         total = int(row[0] or 0)
         accepted = int(row[1] or 0)
         network_bytes = int(row[2] or 0)
-        return {
+        snapshot = {
             "session_id": session_id,
             "total_actions": total,
             "accepted_actions": accepted,
             "rejected_actions": total - accepted,
             "network_bytes": network_bytes,
         }
+        self._last_snapshots[session_id] = snapshot
+        return snapshot
+
+    def breakdown(self, session_id: str, by: str) -> List[Dict[str, Any]]:
+        column = BREAKDOWNS[by]
+        try:
+            with self._pools["analytics"].connection() as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT
+                        {column},
+                        COUNT(*) AS total_actions,
+                        SUM(CASE WHEN accepted THEN 1 ELSE 0 END) AS accepted_actions,
+                        SUM(network_bytes) AS network_bytes
+                    FROM action_log
+                    WHERE session_id = ?
+                    GROUP BY {column}
+                    ORDER BY {column}
+                    """,
+                    (session_id,),
+                )
+                rows = cursor.fetchall()
+        except Exception:
+            return self._last_breakdowns.get((session_id, by), [])
+        result = [_breakdown_row(column, row[0], int(row[1] or 0), int(row[2] or 0), int(row[3] or 0)) for row in rows]
+        self._last_breakdowns[(session_id, by)] = result
+        return result
+
+    def analytics(self, session_id: str, from_tick: int | None = None, to_tick: int | None = None) -> dict:
+        bucket_ticks = self._rollups.bucket_ticks
+        first, last = bucket_range(bucket_ticks, from_tick, to_tick)
+        # Holding the flush lock keeps a concurrent flush from moving deltas between the two reads;
+        # the background flush only try-acquires it and retries later rather than wait.
+        with self._rollup_lock:
+            try:
+                materialized = self._materialized_rollups(session_id, first, last)
+                self._last_analytics[(session_id, first, last)] = materialized
+            except Exception:
+                materialized = self._last_analytics.get((session_id, first, last), ({}, {}, {}))
+            pending = self._rollups.query(session_id, first, last)
+        return summarize(session_id, bucket_ticks, merge(_copy_breakdown(materialized), pending))
+
+    def _materialized_rollups(self, session_id: str, first: int, last: int) -> Breakdown:
+        scope = "FROM action_rollup WHERE session_id = ? AND bucket BETWEEN ? AND ?"
+        params = (session_id, first, last)
+        with self._pools["analytics"].connection() as cursor:
+            cursor.execute(
+                f"""
+                SELECT bucket, SUM(actions), SUM(CASE WHEN accepted THEN actions ELSE 0 END), SUM(network_bytes)
+                {scope}
+                GROUP BY bucket
+                """,
+                params,
+            )
+            series = {row[0]: [int(row[1]), int(row[2]), int(row[3])] for row in cursor.fetchall()}
+            cursor.execute(f"SELECT reason, SUM(actions) {scope} AND NOT accepted GROUP BY reason", params)
+            reasons = {row[0]: int(row[1]) for row in cursor.fetchall()}
+            cursor.execute(f"SELECT player_id, action_type, SUM(actions) {scope} GROUP BY player_id, action_type", params)
+            mix: Dict[str, Dict[str, int]] = {}
+            for player_id, action_type, actions in cursor.fetchall():
+                mix.setdefault(player_id, {})[action_type] = int(actions)
+        return series, reasons, mix
+
+    def operational_metrics(self) -> dict:
+        return {
+            "pool": self._pool.metrics(),
+            "pools": {name: pool.metrics() for name, pool in self._pools.items()},
+            "pending_writes": len(self._pending),
+            "dropped_writes": self._dropped_writes,
+            "rejected_writes": self._rejected_writes,
+        }
+
+    def replay_pending(self) -> None:
+        """Writes buffered rows in order until the buffer is empty or AwanDB is unreachable again."""
+        with self._drain_lock:
+            try:
+                with self._pool.connection():
+                    while self._pending:
+                        row = self._pending[0]
+                        self._write(row)
+                        with self._pending_lock:
+                            if self._pending and self._pending[0] is row:
+                                self._pending.popleft()
+            except Exception:
+                pass
+
+    def _insert(self, cursor: Any, row: tuple) -> None:
+        cursor.execute(
+            """
+            INSERT INTO action_log
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            row,
+        )
+
+    def _write(self, row: tuple) -> None:
+        """Inserts one row; a row the database rejects is counted and dropped, outages raise."""
+        with self._pool.connection() as cursor:
+            try:
+                self._insert(cursor, row)
+            except Exception as exc:
+                if _is_outage(exc):
+                    raise
+                self._rejected_writes += 1
+
+    def _buffer(self, row: tuple) -> None:
+        with self._pending_lock:
+            if len(self._pending) >= self._pending_limit:
+                self._pending.popleft()
+                self._dropped_writes += 1
+            self._pending.append(row)
+            if self._replaying:
+                return
+            self._replaying = True
+        threading.Thread(target=self._replay_loop, name="awandb-replay", daemon=True).start()
+
+    def _replay_loop(self) -> None:
+        while True:
+            self.replay_pending()
+            with self._pending_lock:
+                if not self._pending:
+                    self._replaying = False
+                    return
+            time.sleep(self._replay_interval)
+
+    def _schedule_flush(self) -> None:
+        with self._pending_lock:
+            if self._flushing:
+                return
+            self._flushing = True
+        threading.Thread(target=self._flush_loop, name="awandb-rollups", daemon=True).start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            flushed = self.flush_rollups()
+            with self._pending_lock:
+                if flushed and self._rollups.added < self._rollup_flush_rows:
+                    self._flushing = False
+                    return
+            if not flushed:
+                time.sleep(self._replay_interval)
+
+
+def _is_outage(exc: Exception) -> bool:
+    """Whether a failed write is worth retrying: AwanDB was unreachable rather than rejecting the row."""
+    if isinstance(exc, (PoolUnavailable, OSError, TimeoutError)):
+        return True
+    return any(cls.__name__ in ("OperationalError", "InterfaceError") for cls in type(exc).__mro__)
+
+
+def _flight_sql_connect(endpoint: str, username: str, password: str) -> Callable[[], Any]:
+    from adbc_driver_flightsql import dbapi
+
+    auth = base64.b64encode(f"{username}:{password}".encode("utf-8")).decode("utf-8")
+
+    def connect() -> Any:
+        return dbapi.connect(
+            endpoint,
+            db_kwargs={"adbc.flight.sql.rpc.call_header.Authorization": f"Basic {auth}"},
+        )
+
+    return connect
+
+
+def _breakdown_row(column: str, key: Any, total: int, accepted: int, network_bytes: int) -> Dict[str, Any]:
+    return {
+        column: key,
+        "total_actions": total,
+        "accepted_actions": accepted,
+        "rejected_actions": total - accepted,
+        "network_bytes": network_bytes,
+    }
+
+
+def _copy_breakdown(breakdown: Breakdown) -> Breakdown:
+    series, reasons, mix = breakdown
+    return {bucket: list(point) for bucket, point in series.items()}, dict(reasons), {player: dict(counts) for player, counts in mix.items()}
+
+
+def _empty_snapshot(session_id: str) -> Dict[str, int]:
+    return {"session_id": session_id, "total_actions": 0, "accepted_actions": 0, "rejected_actions": 0, "network_bytes": 0}
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List
+
+
+class PoolUnavailable(Exception):
+    """Raised when no healthy connection can be produced (backend down or in reconnect backoff)."""
+
+
+class PoolTimeout(PoolUnavailable):
+    """Raised when every pooled connection stayed checked out for the whole checkout timeout."""
+
+
+@dataclass(frozen=True)
+class QueryClass:
+    """Pool settings for one class of repository queries.
+
+    ``size`` caps how many queries of the class run at once and ``checkout_timeout`` is how long
+    one waits for a free connection before giving up. ``endpoint`` points the class at another
+    server (e.g. a read replica); ``None`` uses the repository's primary endpoint.
+    """
+
+    size: int = 4
+    checkout_timeout: float = 5.0
+    endpoint: str | None = None
+
+
+# Gameplay writes get the most connections and wait longest; nearline reads (the analytics counters
+# attached to every action and state response) fail fast to their last known value; heavy reporting
+# queries get their own small pool so a slow dashboard can never hold a write connection.
+QUERY_CLASSES: Dict[str, QueryClass] = {
+    "write": QueryClass(size=4, checkout_timeout=5.0),
+    "nearline": QueryClass(size=2, checkout_timeout=0.5),
+    "analytics": QueryClass(size=2, checkout_timeout=1.0),
+}
+
+
+class _PooledConnection:
+    def __init__(self, conn: Any, now: float) -> None:
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.last_used = now
+
+
+class ConnectionPool:
+    """Bounded DB-API connection pool with per-thread checkout, health checks and reconnect backoff.
+
+    Each thread checks out one connection (and its cursor) for the duration of a ``connection()``
+    block; nested blocks on the same thread reuse it. Connections idle for longer than
+    ``health_check_interval`` are probed with ``SELECT 1`` before being handed out, and any error
+    raised inside a block discards the connection. Failed connects back off exponentially between
+    ``backoff_initial`` and ``backoff_max`` seconds; during the backoff window checkouts fail fast.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        size: int = 4,
+        checkout_timeout: float = 5.0,
+        health_check_interval: float = 30.0,
+        backoff_initial: float = 0.1,
+        backoff_max: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._connect = connect
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._idle: List[_PooledConnection] = []
+        self._open = 0
+        self._in_use = 0
+        self._local = threading.local()
+        self._backoff = 0.0
+        self._next_connect_at = 0.0
+        self._stats: Dict[str, float] = {
+            "checkouts": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "connects": 0,
+            "connect_failures": 0,
+            "discarded": 0,
+            "health_check_failures": 0,
+        }
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        held = getattr(self._local, "entry", None)
+        if held is not None:
+            yield held.cursor
+            return
+
+        entry = self._checkout()
+        self._local.entry = entry
+        try:
+            yield entry.cursor
+        except Exception:
+            self._local.entry = None
+            self._discard(entry)
+            raise
+        self._local.entry = None
+        self._release(entry)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            checkouts = self._stats["checkouts"]
+            return {
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "utilization": round(self._in_use / self.size, 3) if self.size else 0.0,
+                "checkouts": int(checkouts),
+                "wait_ms_avg": round(1000 * self._stats["wait_seconds_total"] / checkouts, 3) if checkouts else 0.0,
+                "wait_ms_max": round(1000 * self._stats["wait_seconds_max"], 3),
+                "timeouts": int(self._stats["timeouts"]),
+                "connects": int(self._stats["connects"]),
+                "connect_failures": int(self._stats["connect_failures"]),
+                "discarded": int(self._stats["discarded"]),
+                "health_check_failures": int(self._stats["health_check_failures"]),
+                "backoff_seconds": self._backoff,
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for entry in idle:
+            self._close_quietly(entry)
+
+    def _checkout(self) -> _PooledConnection:
+        started = self._clock()
+        deadline = started + self.checkout_timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    self._in_use += 1
+                    entry = None
+                    break
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"no connection available within {self.checkout_timeout}s")
+                self._cond.wait(remaining)
+            waited = self._clock() - started
+            self._stats["checkouts"] += 1
+            self._stats["wait_seconds_total"] += waited
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+
+        try:
+            if entry is None:
+                return self._open_connection()
+            if self._clock() - entry.last_used >= self.health_check_interval and not self._healthy(entry):
+                self._close_quietly(entry)
+                return self._open_connection()
+            return entry
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def _open_connection(self) -> _PooledConnection:
+        now = self._clock()
+        with self._cond:
+            if now < self._next_connect_at:
+                raise PoolUnavailable(f"reconnect backoff for {self._next_connect_at - now:.2f}s")
+        try:
+            entry = _PooledConnection(self._connect(), now)
+        except Exception as exc:
+            with self._cond:
+                self._stats["connect_failures"] += 1
+                self._backoff = min(self.backoff_max, self._backoff * 2 if self._backoff else self.backoff_initial)
+                self._next_connect_at = self._clock() + self._backoff
+            raise PoolUnavailable(f"connect failed: {exc}") from exc
+        with self._cond:
+            self._stats["connects"] += 1
+            self._backoff = 0.0
+            self._next_connect_at = 0.0
+        return entry
+
+    def _healthy(self, entry: _PooledConnection) -> bool:
+        try:
+            entry.cursor.execute("SELECT 1")
+            entry.cursor.fetchall()
+            return True
+        except Exception:
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+            return False
+
+    def _release(self, entry: _PooledConnection) -> None:
+        entry.last_used = self._clock()
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def _discard(self, entry: _PooledConnection) -> None:
+        self._close_quietly(entry)
+        with self._cond:
+            self._in_use -= 1
+            self._open -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+    def _close_quietly(self, entry: _PooledConnection) -> None:
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Tuple
+
+from server.serialization import dumps
+
+GZIP_MIN_BYTES = 1024
+
+
+class CachedResponse:
+    """Serialized JSON body plus a content ETag; the gzip variant is compressed on first request."""
+
+    __slots__ = ("status", "body", "etag", "_gzipped")
+
+    def __init__(self, status: int, body: bytes) -> None:
+        self.status = status
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        self._gzipped: bytes | None = None
+
+    @classmethod
+    def from_payload(cls, status: int, payload: dict) -> CachedResponse:
+        return cls(status, dumps(payload))
+
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=5, mtime=0)
+        return self._gzipped
+
+    def matches(self, if_none_match: str | None) -> bool:
+        """True when an ``If-None-Match`` header names this body (so a 304 can be sent instead)."""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+
+class ResponseCache:
+    """Serialized read responses keyed by endpoint/session/viewer and tagged with a state version.
+
+    ``get`` returns the stored bytes while the caller's version is unchanged and rebuilds them
+    once when it moves, so a viewer polling an idle session costs a dict lookup instead of a
+    payload rebuild and encode. Entries are bounded LRU; ``invalidate`` drops every entry
+    of a session (used when a session id is closed and may be reused).
+    """
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Tuple[str, str, Hashable], Tuple[Hashable, CachedResponse]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, endpoint: str, session_id: str, variant: Hashable, version: Hashable, build: Callable[[], bytes]) -> CachedResponse:
+        key = (endpoint, session_id, variant)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == version:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return cached[1]
+        response = CachedResponse(200, build())
+        with self._lock:
+            self.stats["misses"] += 1
+            self._entries[key] = (version, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return response
+
+    def invalidate(self, session_id: str) -> int:
+        with self._lock:
+            stale = [key for key in self._entries if key[1] == session_id]
+            for key in stale:
+                del self._entries[key]
+            self.stats["invalidations"] += len(stale)
+        return len(stale)
+
+    def metrics(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": len(self._entries),
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+ROLLUP_TICKS = 10
+COARSE_BUCKETS = 16
+
+ROLLUP_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("session_id", "STRING"),
+    ("bucket", "INT"),
+    ("player_id", "STRING"),
+    ("action_type", "STRING"),
+    ("accepted", "BOOLEAN"),
+    ("reason", "STRING"),
+    ("actions", "INT"),
+    ("network_bytes", "INT"),
+)
+
+# (player_id, action_type, accepted, reason) -> [actions, network_bytes]
+_Detail = Dict[Tuple[str, str, bool, str], List[int]]
+# bucket -> [actions, accepted_actions, network_bytes]
+Series = Dict[int, List[int]]
+Breakdown = Tuple[Series, Dict[str, int], Dict[str, Dict[str, int]]]
+
+
+class _SessionRollups:
+    __slots__ = ("series", "fine", "coarse", "last_bucket")
+
+    def __init__(self) -> None:
+        self.series: Series = {}
+        self.fine: Dict[int, _Detail] = {}
+        self.coarse: Dict[int, _Detail] = {}
+        self.last_bucket = 0
+
+
+class Rollups:
+    """Action-log aggregates per session, bucketed by ``bucket_ticks`` ticks.
+
+    Every bucket keeps its totals (the ``series`` points) and one counter pair per (player, action
+    type, outcome, reason); the latter is also kept per ``COARSE_BUCKETS`` buckets, so a range
+    query reads coarse blocks for the interior and fine buckets only at its two edges. ``query``
+    returns the pieces ``summarize`` turns into the ``GET /analytics`` payload; ``drain`` hands the
+    fine rows out as additive ``ROLLUP_COLUMNS`` deltas for a materialized table.
+    """
+
+    def __init__(self, bucket_ticks: int = ROLLUP_TICKS) -> None:
+        if bucket_ticks < 1:
+            raise ValueError("bucket_ticks must be positive")
+        self.bucket_ticks = bucket_ticks
+        self._sessions: Dict[str, _SessionRollups] = {}
+        self._lock = threading.Lock()
+        self.added = 0
+
+    def add(self, session_id: str, player_id: str, tick: int, action_type: str, accepted: bool, reason: str, network_bytes: int) -> None:
+        with self._lock:
+            self._add(session_id, tick // self.bucket_ticks, (player_id, action_type, accepted, reason), 1, network_bytes)
+            self.added += 1
+
+    def add_rows(self, rows: Iterable[tuple]) -> None:
+        """Adds ``ROLLUP_COLUMNS`` rows back, e.g. after a failed flush."""
+        with self._lock:
+            for session_id, bucket, player_id, action_type, accepted, reason, actions, network_bytes in rows:
+                self._add(session_id, bucket, (player_id, action_type, accepted, reason), actions, network_bytes)
+
+    def query(self, session_id: str, first_bucket: int, last_bucket: int) -> Breakdown:
+        """Series points, rejection reasons and per-player action mix for buckets ``first..last`` inclusive."""
+        series: Series = {}
+        reasons: Dict[str, int] = {}
+        mix: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            rollups = self._sessions.get(session_id)
+            if rollups is None:
+                return series, reasons, mix
+            last_bucket = min(last_bucket, rollups.last_bucket)
+            if last_bucket - first_bucket < len(rollups.series):
+                points = ((bucket, rollups.series.get(bucket)) for bucket in range(first_bucket, last_bucket + 1))
+            else:
+                points = rollups.series.items()
+            for bucket, point in points:
+                if point is not None and first_bucket <= bucket <= last_bucket:
+                    series[bucket] = list(point)
+            coarse_first = -(-first_bucket // COARSE_BUCKETS)
+            coarse_end = (last_bucket + 1) // COARSE_BUCKETS
+            if coarse_first < coarse_end:
+                edges = [(first_bucket, coarse_first * COARSE_BUCKETS - 1), (coarse_end * COARSE_BUCKETS, last_bucket)]
+                if coarse_end - coarse_first < len(rollups.coarse):
+                    details = [rollups.coarse.get(index) for index in range(coarse_first, coarse_end)]
+                else:
+                    details = [detail for index, detail in rollups.coarse.items() if coarse_first <= index < coarse_end]
+            else:
+                edges = [(first_bucket, last_bucket)]
+                details = []
+            for low, high in edges:
+                if high - low < len(rollups.fine):
+                    details.extend(rollups.fine.get(bucket) for bucket in range(low, high + 1))
+                else:
+                    details.extend(detail for bucket, detail in rollups.fine.items() if low <= bucket <= high)
+            for detail in details:
+                if detail:
+                    _fold(detail, reasons, mix)
+        return series, reasons, mix
+
+    def drain(self) -> List[tuple]:
+        """Returns every fine row and starts over, for flushing deltas to a materialized table."""
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+            self.added = 0
+        return [
+            (session_id, bucket, *key, actions, network_bytes)
+            for session_id, rollups in sessions.items()
+            for bucket, detail in rollups.fine.items()
+            for key, (actions, network_bytes) in detail.items()
+        ]
+
+    def _add(self, session_id: str, bucket: int, key: tuple, actions: int, network_bytes: int) -> None:
+        rollups = self._sessions.get(session_id)
+        if rollups is None:
+            rollups = self._sessions[session_id] = _SessionRollups()
+        if bucket > rollups.last_bucket:
+            rollups.last_bucket = bucket
+        point = rollups.series.get(bucket)
+        if point is None:
+            point = rollups.series[bucket] = [0, 0, 0]
+        point[0] += actions
+        point[2] += network_bytes
+        if key[2]:
+            point[1] += actions
+        for details, index in ((rollups.fine, bucket), (rollups.coarse, bucket // COARSE_BUCKETS)):
+            detail = details.get(index)
+            if detail is None:
+                detail = details[index] = {}
+            counts = detail.get(key)
+            if counts is None:
+                detail[key] = [actions, network_bytes]
+            else:
+                counts[0] += actions
+                counts[1] += network_bytes
+
+
+def _fold(detail: _Detail, reasons: Dict[str, int], mix: Dict[str, Dict[str, int]]) -> None:
+    for (player_id, action_type, accepted, reason), (actions, _) in detail.items():
+        if not accepted:
+            reasons[reason] = reasons.get(reason, 0) + actions
+        player_mix = mix.get(player_id)
+        if player_mix is None:
+            player_mix = mix[player_id] = {}
+        player_mix[action_type] = player_mix.get(action_type, 0) + actions
+
+
+def merge(into: Breakdown, other: Breakdown) -> Breakdown:
+    """Adds ``other``'s counts to ``into`` (e.g. materialized rows plus unflushed deltas)."""
+    series, reasons, mix = into
+    for bucket, point in other[0].items():
+        current = series.get(bucket)
+        series[bucket] = point if current is None else [a + b for a, b in zip(current, point)]
+    for reason, actions in other[1].items():
+        reasons[reason] = reasons.get(reason, 0) + actions
+    for player_id, counts in other[2].items():
+        player_mix = mix.setdefault(player_id, {})
+        for action_type, actions in counts.items():
+            player_mix[action_type] = player_mix.get(action_type, 0) + actions
+    return into
+
+
+def bucket_range(bucket_ticks: int, from_tick: int | None, to_tick: int | None) -> Tuple[int, int]:
+    """Inclusive bucket indices covering ``from_tick..to_tick`` (open ends cover everything)."""
+    first = 0 if from_tick is None else max(0, from_tick) // bucket_ticks
+    last = (1 << 62) if to_tick is None else to_tick // bucket_ticks
+    return first, last
+
+
+def summarize(session_id: str, bucket_ticks: int, breakdown: Breakdown) -> dict:
+    """The ``GET /analytics`` payload for one ``query``/``merge`` result."""
+    series, reasons, mix = breakdown
+    return {
+        "session_id": session_id,
+        "bucket_ticks": bucket_ticks,
+        "series": [
+            {
+                "tick": bucket * bucket_ticks,
+                "actions": actions,
+                "accepted_actions": accepted,
+                "rejected_actions": actions - accepted,
+                "actions_per_tick": round(actions / bucket_ticks, 3),
+                "network_bytes": network_bytes,
+            }
+            for bucket, (actions, accepted, network_bytes) in sorted(series.items())
+        ],
+        "rejection_reasons": dict(sorted(reasons.items(), key=lambda item: (-item[1], item[0]))),
+        "action_mix": {player_id: dict(sorted(counts.items())) for player_id, counts in sorted(mix.items())},
+    }
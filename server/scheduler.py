@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Set, Tuple
+
+UTILIZATION_WINDOW = 10.0
+
+
+class TickScheduler:
+    """Runs one tick every ``1 / tick_rate`` seconds for each active session on a pool of workers.
+
+    Sessions wait in a heap ordered by when their next tick is due, so the session furthest behind
+    schedule is always dispatched first, and at most ``workers`` ticks run at once. A session that
+    falls more than ``max_catch_up`` ticks behind skips ahead instead of replaying every missed tick.
+    ``wake`` marks activity (actions, views); a session with none for ``idle_after`` seconds is
+    dropped at its next due time and costs nothing until woken again, and with no active session
+    the dispatcher thread just waits. With ``processes`` the CPU-bound part of a tick (bot planning)
+    runs in ``processes`` (a process pool of the same size) while the owning process applies it.
+    """
+
+    def __init__(
+        self,
+        tick_rate: float = 10.0,
+        workers: int = 4,
+        processes: bool = False,
+        idle_after: float = 30.0,
+        max_catch_up: int = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if tick_rate <= 0 or workers < 1:
+            raise ValueError("tick_rate and workers must be positive")
+        self.interval = 1.0 / tick_rate
+        self.workers = workers
+        self.idle_after = idle_after
+        self.max_catch_up = max_catch_up
+        self._clock = clock
+        self._run_tick: Callable[[str], bool] | None = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="session-tick")
+        self.processes = ProcessPoolExecutor(max_workers=workers) if processes else None
+        self._due: List[Tuple[float, str]] = []
+        self._scheduled: Set[str] = set()
+        self._activity: Dict[str, float] = {}
+        self._sessions: Dict[str, dict] = {}
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopped = False
+        self._window = (clock(), 0.0)
+        self._last_utilization: float | None = None
+        self.last_error: str | None = None
+        self.stats: Dict[str, int] = {"ticks": 0, "skipped_ticks": 0, "parked": 0, "errors": 0}
+
+    def bind(self, run_tick: Callable[[str], bool]) -> None:
+        """Sets the tick function; it returns ``False`` once the session is gone, which unschedules it."""
+        self._run_tick = run_tick
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="tick-scheduler", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._pool.shutdown(wait=True)
+        if self.processes is not None:
+            self.processes.shutdown(wait=True)
+
+    def wake(self, session_id: str) -> None:
+        """Records activity for the session and schedules it if it is not already."""
+        now = self._clock()
+        self._activity[session_id] = now
+        if session_id in self._scheduled:
+            return
+        with self._cond:
+            if session_id in self._scheduled or self._stopped:
+                return
+            self._scheduled.add(session_id)
+            heapq.heappush(self._due, (now, session_id))
+            self._cond.notify()
+
+    def forget(self, session_id: str) -> None:
+        with self._cond:
+            self._activity.pop(session_id, None)
+            self._sessions.pop(session_id, None)
+            self._due = [(due, queued) for due, queued in self._due if queued != session_id]
+            heapq.heapify(self._due)
+            self._scheduled.discard(session_id)
+
+    def run_pending(self) -> int:
+        """Runs every tick due now (at most ``workers`` at a time) and waits for them; for callers without ``start``."""
+        ran = 0
+        while True:
+            with self._cond:
+                futures = self._dispatch(self._clock())
+            if not futures:
+                return ran
+            for future in futures:
+                future.result()
+            ran += len(futures)
+
+    def metrics(self, session_id: str | None = None) -> dict:
+        with self._cond:
+            started, busy = self._window
+            elapsed = self._clock() - started
+            if elapsed < 1.0 and self._last_utilization is not None:
+                utilization = self._last_utilization
+            else:
+                utilization = busy / (self.workers * elapsed) if elapsed > 0 else 0.0
+            return {
+                **self.stats,
+                "tick_rate": round(1.0 / self.interval, 3),
+                "workers": self.workers,
+                "mode": "process" if self.processes is not None else "thread",
+                "active_sessions": len(self._scheduled),
+                "in_flight": self._in_flight,
+                "utilization": round(min(1.0, utilization), 3),
+                "last_error": self.last_error,
+                "session": dict(self._sessions[session_id]) if session_id in self._sessions else None,
+            }
+
+    def _loop(self) -> None:
+        with self._cond:
+            while not self._stopped:
+                now = self._clock()
+                self._dispatch(now)
+                if self._due and self._in_flight < self.workers:
+                    self._cond.wait(max(0.0, self._due[0][0] - now))
+                else:
+                    self._cond.wait()
+
+    def _dispatch(self, now: float) -> List[Future]:
+        """Submits due sessions, most overdue first, while a worker is free; the caller holds ``_cond``."""
+        futures = []
+        while self._due and self._due[0][0] <= now and self._in_flight < self.workers:
+            due, session_id = heapq.heappop(self._due)
+            if now - self._activity.get(session_id, now) > self.idle_after:
+                self._scheduled.discard(session_id)
+                self._sessions.pop(session_id, None)
+                self.stats["parked"] += 1
+                continue
+            behind = int((now - due) / self.interval)
+            if behind > self.max_catch_up:
+                skipped = behind - self.max_catch_up
+                due += skipped * self.interval
+                self.stats["skipped_ticks"] += skipped
+                self._session_stats(session_id)["skipped_ticks"] += skipped
+            self._in_flight += 1
+            futures.append(self._pool.submit(self._run, session_id, due))
+        return futures
+
+    def _run(self, session_id: str, due: float) -> None:
+        started = self._clock()
+        failed = False
+        try:
+            alive = self._run_tick(session_id)
+        except Exception as exc:
+            # A failing tick keeps its schedule; the error is counted and reported in ``metrics``.
+            alive, failed = True, True
+            self.last_error = f"{session_id}: {exc!r}"
+        finished = self._clock()
+        with self._cond:
+            self._in_flight -= 1
+            self.stats["ticks"] += 1
+            self.stats["errors"] += failed
+            window_started, busy = self._window
+            busy += finished - started
+            if finished - window_started >= UTILIZATION_WINDOW:
+                self._last_utilization = busy / (self.workers * (finished - window_started))
+                self._window = (finished, 0.0)
+            else:
+                self._window = (window_started, busy)
+            if alive and not self._stopped and session_id in self._scheduled:
+                stats = self._session_stats(session_id)
+                stats["ticks"] += 1
+                stats["lag_ms"] = round(1000 * max(0.0, started - due), 3)
+                stats["lag_ms_max"] = max(stats["lag_ms_max"], stats["lag_ms"])
+                stats["tick_ms"] = round(1000 * (finished - started), 3)
+                heapq.heappush(self._due, (due + self.interval, session_id))
+            else:
+                self._scheduled.discard(session_id)
+                self._sessions.pop(session_id, None)
+            self._cond.notify()
+
+    def _session_stats(self, session_id: str) -> dict:
+        stats = self._sessions.get(session_id)
+        if stats is None:
+            stats = self._sessions[session_id] = {"ticks": 0, "skipped_ticks": 0, "lag_ms": 0.0, "lag_ms_max": 0.0, "tick_ms": 0.0}
+        return stats
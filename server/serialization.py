@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+from dataclasses import fields
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, List
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is not installed
+    orjson = None
+
+if TYPE_CHECKING:
+    from server.domain import ActionRequest, GameSession
+
+ENCODER = "orjson" if orjson is not None else "json"
+
+_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+
+def dumps(payload: Any) -> bytes:
+    """Compact UTF-8 JSON bytes, via orjson when installed and the stdlib encoder otherwise."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return _encoder.encode(payload).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@lru_cache(maxsize=65536)
+def _quote(value: str) -> str:
+    """JSON string literal for ``value``; ids repeat across every response, so they are encoded once."""
+    return _encoder.encode(value)
+
+
+def encode_state(session: GameSession, player_id: str | None = None) -> bytes:
+    """``session.state_payload(player_id)`` encoded straight to JSON bytes.
+
+    No per-unit dicts are built: each unit's JSON fragment is kept on the session
+    (``_wire_fragments``) together with the fields it was formatted from and is only re-formatted
+    when one of them changes, so encoding a tick where a few units moved is mostly a join.
+    Fragments are shared by every viewer's fog-of-war subset. The output parses to exactly
+    ``state_payload``.
+    """
+    unit_ids = None if player_id is None else session.visibility().visible_unit_ids(session, player_id)
+    units = session.units.values() if unit_ids is None else [session.units[uid] for uid in unit_ids]
+    fragments = session._wire_fragments
+    if fragments is None:
+        fragments = session._wire_fragments = {}
+    elif len(fragments) > len(session.units):
+        for unit_id in [uid for uid in fragments if uid not in session.units]:
+            del fragments[unit_id]
+    encode = _encoder.encode
+    quote = _quote
+
+    players = ",".join(
+        f'{quote(pid)}:{{"is_bot":{"true" if p.is_bot else "false"},'
+        f'"resources":{{"metal":{p.resources.metal},"energy":{p.resources.energy},"food":{p.resources.food}}},'
+        f'"groups":{encode(p.groups)}}}'
+        if player_id is None or pid == player_id
+        else f'{quote(pid)}:{{"is_bot":{"true" if p.is_bot else "false"}}}'
+        for pid, p in session.players.items()
+    )
+    parts: List[str] = []
+    append = parts.append
+    for u in units:
+        source = (u.x, u.y, u.hp, u.owner_player_id, u.unit_type, u.domain)
+        cached = fragments.get(u.unit_id)
+        if cached is None or cached[0] != source:
+            cached = fragments[u.unit_id] = (
+                source,
+                f'{quote(u.unit_id)}:{{"owner_player_id":{quote(u.owner_player_id)},"unit_type":{quote(u.unit_type)},'
+                f'"domain":{quote(u.domain)},"x":{u.x},"y":{u.y},"hp":{u.hp}}}',
+            )
+        append(cached[1])
+    return (
+        f'{{"session_id":{quote(session.session_id)},"map":{quote(session.game_map.name)},"tick":{session.tick},'
+        f'"players":{{{players}}},"units":{{{",".join(parts)}}},"unit_counts":{encode(session.unit_counts(unit_ids))}}}'
+    ).encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def _action_layout(cls: type) -> tuple:
+    """Field names of an action dataclass and the fixed bytes ``json.dumps(asdict(...))`` spends on keys."""
+    names = tuple(field.name for field in fields(cls))
+    # '{' + '}' + '"name": ' per field + ', ' between fields
+    overhead = 2 + sum(len(name) + 4 for name in names) + 2 * (len(names) - 1)
+    return names, overhead
+
+
+def _literal_len(value: Any) -> int:
+    if type(value) is str:
+        if value.isascii() and value.isprintable() and '"' not in value and "\\" not in value:
+            return len(value) + 2
+        return len(json.dumps(value))
+    if type(value) is int:
+        return len(str(value))
+    if type(value) is list or type(value) is tuple:
+        if not value:
+            return 2
+        return 2 + sum(_literal_len(item) for item in value) + 2 * (len(value) - 1)
+    return len(json.dumps(value))
+
+
+def action_wire_size(action: ActionRequest) -> int:
+    """``len(json.dumps(asdict(action)))`` computed from field lengths, without building or encoding anything."""
+    names, overhead = _action_layout(type(action))
+    return overhead + sum(_literal_len(getattr(action, name)) for name in names)
@@ -1,187 +1,592 @@
 from __future__ import annotations
 
-import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from typing import Dict, List
 
+from server.admission import AdmissionController
+from server.bots import BotPlanner, plan_snapshot, settle_moves
 from server.domain import ActionRequest, GameSession, PlayerState, Unit
-from server.maps import get_map
-from server.persistence import Repository
-from server.snapshot import save_snapshot
+from server.history import SnapshotHistory
+from server.interest import InterestManager, Viewport
+from server.maps import MAX_GENERATED_SIDE, describe_map, get_map, get_template, map_response
+from server.persistence import BREAKDOWNS, Repository
+from server.response_cache import CachedResponse, ResponseCache
+from server.scheduler import TickScheduler
+from server.serialization import dumps, encode_state
+from server.sessions import SessionFactory, SessionManager, SessionStore, session_summary, synthetic_session, valid_session_id
+from server.snapshot import save_snapshot, session_from_dict, session_to_dict
 
 
 class GameService:
-    def __init__(self, repository: Repository, sessions: Dict[str, GameSession] | None = None, seed: int = 7) -> None:
+    def __init__(
+        self,
+        repository: Repository,
+        sessions: Dict[str, GameSession] | None = None,
+        seed: int = 7,
+        unit_state_interval: int = 0,
+        bot_budget_ms: float | None = None,
+        bot_workers: int = 0,
+        session_store: SessionStore | None = None,
+        session_idle_ttl: float | None = None,
+        max_resident_sessions: int | None = None,
+        max_resident_units: int | None = None,
+        admission: AdmissionController | None = None,
+        history: SnapshotHistory | None = None,
+        scheduler: TickScheduler | None = None,
+        spectators: bool = True,
+    ) -> None:
         self.repository = repository
-        self.sessions = sessions or default_sessions()
-        self._rng = random.Random(seed)
+        self.sessions = SessionManager(
+            sessions,
+            factories=None if sessions else default_session_factories(),
+            store=session_store,
+            idle_ttl=session_idle_ttl,
+            max_resident=max_resident_sessions,
+            max_resident_units=max_resident_units,
+        )
+        self.unit_state_interval = unit_state_interval
+        self.bot_planner = BotPlanner(seed)
+        self.bot_budget_ms = bot_budget_ms
+        self._bot_pool = ThreadPoolExecutor(max_workers=bot_workers, thread_name_prefix="bot-planner") if bot_workers > 0 else None
+        self.bot_stats: Dict[str, dict] = {}
+        self.action_stats: Dict[str, int] = {"prevalidated_rejections": 0}
+        self._unit_state_buckets: Dict[str, int] = {}
+        self._views: Dict[str, InterestManager] = {}
+        self._next_session_index = 0
+        self.responses = ResponseCache()
+        self._revisions: Dict[str, int] = {}
+        self._writes = 0
+        self.admission = admission
+        self.history = history
+        self.scheduler = scheduler
+        # Without spectators, state and views are only served fogged for a player of the session.
+        self.spectators = spectators
+        if scheduler is not None:
+            scheduler.bind(self._scheduled_tick)
 
     def submit_action(self, action: ActionRequest) -> dict:
-        session = self.sessions.get(action.session_id)
-        if session is None:
-            reason = "session does not exist"
-            self.repository.persist_action(action, accepted=False, reason=reason)
+        if self.admission is not None:
+            known = action.session_id if action.session_id in self.sessions else None
+            retry_after = self.admission.admit(known, action.player_id)
+            if retry_after:
+                return _throttled("rate limited", retry_after)
+        self._wake(action.session_id)
+
+        resident = self.sessions.peek(action.session_id)
+        rejection = resident.prevalidate(action) if resident is not None else None
+        if rejection is not None:
+            self._persist(action, False, rejection.reason)
+            self.action_stats["prevalidated_rejections"] += 1
             return {
                 "accepted": False,
-                "reason": reason,
+                "reason": rejection.reason,
                 "state": None,
                 "analytics": self.repository.analytics_snapshot(action.session_id),
             }
 
-        validation = session.apply_action(action)
-        self.repository.persist_action(action, validation.accepted, validation.reason)
-        return {
-            "accepted": validation.accepted,
-            "reason": validation.reason,
-            "state": session.state_payload() if validation.accepted else None,
-            "analytics": self.repository.analytics_snapshot(action.session_id),
-        }
+        with self._queue_slot(action.session_id) as admitted:
+            if not admitted:
+                return _throttled("session queue full", 1.0)
+            return self._apply_submitted(action)
+
+    def _apply_submitted(self, action: ActionRequest) -> dict:
+        with self.sessions.checkout(action.session_id) as session:
+            if session is None:
+                reason = "session does not exist"
+                self._persist(action, accepted=False, reason=reason)
+                return {
+                    "accepted": False,
+                    "reason": reason,
+                    "state": None,
+                    "analytics": self.repository.analytics_snapshot(action.session_id),
+                }
+
+            validation = session.apply_action(action)
+            self._persist(action, validation.accepted, validation.reason)
+            if validation.accepted:
+                self.sessions.touch(session)
+                self._record_unit_state(session)
+                self._record_history(session, action.tick)
+            return {
+                "accepted": validation.accepted,
+                "reason": validation.reason,
+                "state": session.state_payload(action.player_id) if validation.accepted else None,
+                "analytics": self.repository.analytics_snapshot(action.session_id),
+            }
 
     def tick_bots(self, session_id: str, tick: int) -> List[dict]:
-        session = self.sessions.get(session_id)
-        if session is None:
-            return []
+        with self.sessions.checkout(session_id) as session:
+            if session is None:
+                return []
+            started = time.perf_counter()
+            bots = [player.player_id for player in session.players.values() if player.is_bot]
+            return self._apply_bot_plans(session, tick, bots, self._plan_bots(session, tick, bots, started), started)
+
+    def _plan_bots(self, session: GameSession, tick: int, bots: List[str], started: float) -> list:
+        deadline = started + self.bot_budget_ms / 1000 if self.bot_budget_ms else None
+        return self.bot_planner.plan_bots(session, bots, tick, deadline, self._bot_pool)
+
+    def _apply_bot_plans(self, session: GameSession, tick: int, bots: List[str], plans: list, started: float) -> List[dict]:
+        planned_at = time.perf_counter()
+        plans = settle_moves(bots, plans)
+        orders_by_player = {player_id: orders for player_id, (orders, _) in zip(bots, plans) if orders}
+        outcomes_by_player = session.apply_tick_orders(tick, orders_by_player)
 
         bot_results = []
-        for player in session.players.values():
-            if not player.is_bot:
+        any_accepted = False
+        for player_id, (orders, deferred) in zip(bots, plans):
+            if not orders:
                 continue
-            action = self._choose_bot_action(session, player.player_id, tick)
-            if action is None:
-                continue
-            bot_results.append(self.submit_action(action))
+            outcomes = outcomes_by_player[player_id]
+            for order, outcome in zip(orders, outcomes):
+                self._persist(order, outcome.accepted, outcome.reason)
+            accepted = sum(1 for outcome in outcomes if outcome.accepted)
+            any_accepted = any_accepted or accepted > 0
+            bot_results.append(
+                {
+                    "player_id": player_id,
+                    "tick": tick,
+                    "orders": len(orders),
+                    "accepted": accepted,
+                    "rejected": len(orders) - accepted,
+                    "deferred_units": deferred,
+                }
+            )
+        if any_accepted:
+            self.sessions.touch(session)
+            self._record_unit_state(session)
+        self._record_history(session, tick)
+
+        self.bot_stats[session.session_id] = {
+            "tick": tick,
+            "bots": len(bots),
+            "orders": sum(len(orders) for orders, _ in plans),
+            "deferred_units": sum(deferred for _, deferred in plans),
+            "plan_ms": round(1000 * (planned_at - started), 3),
+            "apply_ms": round(1000 * (time.perf_counter() - planned_at), 3),
+        }
+        self._bump_revision(session.session_id)
         return bot_results
 
-    def get_state(self, session_id: str) -> dict:
-        session = self.sessions.get(session_id)
-        if session is None:
+    def _scheduled_tick(self, session_id: str) -> bool:
+        """One ``TickScheduler`` tick: the session's bots plan and act, then the session advances a tick.
+
+        Returns ``False`` once the session is closed or hibernated.
+        """
+        if self.sessions.peek(session_id) is None:
+            return False
+        processes = self.scheduler.processes
+        with self.sessions.checkout(session_id) as session:
+            if session is None:
+                return False
+            tick = session.tick + 1
+            started = time.perf_counter()
+            bots = [player.player_id for player in session.players.values() if player.is_bot]
+            if processes is None or not bots:
+                if bots:
+                    self._apply_bot_plans(session, tick, bots, self._plan_bots(session, tick, bots, started), started)
+                self._advance(session, tick)
+                return True
+            job = (session_to_dict(session), self.bot_planner.seed, bots, tick, self.bot_planner.cursors(session_id), self.bot_budget_ms)
+        # Planning runs on a copy without the session lock; orders are validated when applied.
+        plans, cursors = processes.submit(plan_snapshot, *job).result()
+        with self.sessions.checkout(session_id) as session:
+            if session is None:
+                return False
+            self.bot_planner.set_cursors(session_id, cursors)
+            self._apply_bot_plans(session, tick, bots, plans, started)
+            self._advance(session, tick)
+        return True
+
+    def _advance(self, session: GameSession, tick: int) -> None:
+        """Moves the session on to ``tick`` when no order of that tick already did."""
+        if not session.advance_to(tick):
+            return
+        self.sessions.touch(session)
+        self._record_unit_state(session)
+        self._record_history(session, tick)
+        self._bump_revision(session.session_id)
+
+    def get_state(self, session_id: str, player_id: str | None = None) -> dict:
+        with self.sessions.checkout(session_id) as session:
+            if session is None:
+                return {"error": "session not found"}
+            if player_id is None and not self.spectators:
+                return {"error": "player_id is required"}
+            if player_id is not None and player_id not in session.players:
+                return {"error": "player not found"}
+            return self._state_payload(session, player_id)
+
+    def state_response(self, session_id: str, player_id: str | None = None) -> CachedResponse:
+        """``get_state`` as cached JSON bytes, rebuilt only when the session or its analytics change."""
+        with self.sessions.checkout(session_id) as session:
+            if session is None:
+                return CachedResponse.from_payload(200, {"error": "session not found"})
+            if player_id is None and not self.spectators:
+                return CachedResponse.from_payload(200, {"error": "player_id is required"})
+            if player_id is not None and player_id not in session.players:
+                return CachedResponse.from_payload(200, {"error": "player not found"})
+            version = (session.version, self._revisions.get(session_id, 0))
+            return self.responses.get("state", session_id, player_id, version, lambda: self._state_body(session, player_id))
+
+    def subscribe_view(
+        self,
+        session_id: str,
+        subscriber_id: str,
+        x: int,
+        y: int,
+        width: int = 0,
+        height: int = 0,
+        radius: int = 0,
+        player_id: str | None = None,
+    ) -> dict:
+        with self.sessions.checkout(session_id) as session:
+            if session is None:
+                return {"error": "session not found"}
+            if player_id is None and not self.spectators:
+                return {"error": "player_id is required"}
+            if player_id is not None and player_id not in session.players:
+                return {"error": "player not found"}
+            if radius <= 0 and (width <= 0 or height <= 0):
+                return {"error": "viewport needs width and height, or radius"}
+            views = self._views.setdefault(session_id, InterestManager())
+            views.subscribe(subscriber_id, Viewport(x, y, width, height, radius), player_id)
+            self._wake(session_id)
+            game_map = session.game_map
+            return {
+                **views.poll(session, subscriber_id),
+                "map": {
+                    "name": game_map.name,
+                    "width": game_map.width,
+                    "height": game_map.height,
+                    "hash": describe_map(game_map.template)["hash"],
+                },
+            }
+
+    def poll_view(self, session_id: str, subscriber_id: str) -> dict:
+        with self.sessions.checkout(session_id) as session:
+            views = self._views.get(session_id)
+            if views is not None:
+                views.expire()
+            if session is None or views is None or subscriber_id not in views.subscriptions:
+                return {"error": "subscription not found"}
+            self._wake(session_id)
+            return views.poll(session, subscriber_id)
+
+    def unsubscribe_view(self, session_id: str, subscriber_id: str) -> dict:
+        views = self._views.get(session_id)
+        removed = views is not None and views.unsubscribe(subscriber_id)
+        return {"session_id": session_id, "subscriber_id": subscriber_id, "removed": removed}
+
+    def get_metrics(self, session_id: str) -> dict:
+        with self.sessions.checkout(session_id) as session:
+            if session is None:
+                return {"error": "session not found"}
+            return self._metrics_payload(session)
+
+    def get_breakdown(self, session_id: str, by: str) -> dict:
+        """Per-player or per-action-type action counts, read on the repository's analytics path.
+
+        Deliberately takes no session lock: reporting queries may be slow and must never hold up
+        gameplay for the session they report on.
+        """
+        if by not in BREAKDOWNS:
+            return {"error": f"unsupported breakdown: {by}; expected one of {', '.join(BREAKDOWNS)}"}
+        if session_id not in self.sessions:
             return {"error": "session not found"}
+        return {"session_id": session_id, "by": by, "rows": self.repository.breakdown(session_id, by)}
+
+    def get_analytics(self, session_id: str, from_tick: int | None = None, to_tick: int | None = None) -> dict:
+        """Rollup-backed analytics for ticks ``from_tick..to_tick``, whole buckets at the edges."""
+        if from_tick is not None and to_tick is not None and to_tick < from_tick:
+            return {"error": "to_tick must not be before from_tick"}
+        if session_id not in self.sessions:
+            return {"error": "session not found"}
+        return {**self.repository.analytics(session_id, from_tick, to_tick), "from_tick": from_tick, "to_tick": to_tick}
+
+    def metrics_response(self, session_id: str) -> CachedResponse:
+        """``get_metrics`` as cached JSON bytes.
+
+        Besides the session's own version this is keyed on the process-wide write count, the
+        repository's operational metrics (pool health and buffered or rejected writes change with no
+        write from this process) and the session-manager counters, since those sections are shared.
+        """
+        with self.sessions.checkout(session_id) as session:
+            if session is None:
+                return CachedResponse.from_payload(200, {"error": "session not found"})
+            repository = self.repository.operational_metrics()
+            version = (
+                session.version,
+                self._revisions.get(session_id, 0),
+                self._writes,
+                dumps(repository),
+                tuple(self.sessions.metrics().values()),
+                tuple(self.admission.stats.values()) if self.admission is not None else None,
+                tuple(self.history.stats.values()) if self.history is not None else None,
+                tuple(self.scheduler.stats.values()) if self.scheduler is not None else None,
+            )
+            return self.responses.get("metrics", session_id, None, version, lambda: dumps(self._metrics_payload(session, repository)))
+
+    def create_snapshot(self, session_id: str, target_path: str | None = None) -> dict:
+        state = self.get_state(session_id)
+        if "error" in state:
+            return state
+        location = save_snapshot(state, session_id=session_id, target_path=target_path)
+        return {"snapshot_path": location, "session_id": session_id}
+
+    def map_response(self, name: str, width: int | None = None, height: int | None = None) -> CachedResponse:
+        """``describe_map`` as cached JSON bytes; ``width``/``height`` pick the size of generated maps."""
+        if any(side is not None and not 0 < side <= MAX_GENERATED_SIDE for side in (width, height)):
+            return CachedResponse.from_payload(400, {"error": f"map sides must be 1..{MAX_GENERATED_SIDE} tiles"})
+        try:
+            return map_response(get_template(name, width, height))
+        except ValueError as exc:
+            return CachedResponse.from_payload(404, {"error": str(exc)})
+
+    def get_snapshot(self, session_id: str, tick: int | None = None) -> dict:
+        """State of a session as of ``tick`` from the snapshot history, or the recorded tick range."""
+        if self.history is None:
+            return {"error": "snapshot history is disabled"}
+        recorded = self.history.ticks(session_id)
+        if recorded is None:
+            return {"error": "session not found"}
+        if tick is None:
+            return {"session_id": session_id, "first_tick": recorded[0], "last_tick": recorded[1], "history": self.history.metrics()}
+        payload = self.history.seek(session_id, tick)
+        if payload is None:
+            return {"error": f"no snapshot at or before tick {tick}; history starts at {recorded[0]}"}
+        return {"session_id": session_id, "tick": tick, "state": session_from_dict(payload).state_payload()}
+
+    def create_session(
+        self,
+        map_name: str,
+        players: List[str],
+        bots: List[str] | None = None,
+        session_id: str | None = None,
+        session_class: str | None = None,
+    ) -> dict:
+        bots = bots or []
+        if session_id is not None and not valid_session_id(session_id):
+            return {"error": "session_id must be 1-64 letters, digits, '-' or '_'"}
+        if session_class is not None and (self.admission is None or session_class not in self.admission.classes):
+            return {"error": f"unknown session class: {session_class}"}
+        if not players and not bots:
+            return {"error": "at least one player or bot is required"}
+        if len(set(players) | set(bots)) != len(players) + len(bots):
+            return {"error": "player ids must be unique"}
+        try:
+            game_map = get_map(map_name)
+        except ValueError as exc:
+            return {"error": str(exc)}
+        if session_id is None:
+            while session_id is None or session_id in self.sessions:
+                self._next_session_index += 1
+                session_id = f"s-{self._next_session_index}"
+        session = GameSession(
+            session_id=session_id,
+            tick=0,
+            game_map=game_map,
+            players={**{pid: _build_player(pid) for pid in players}, **{pid: _build_player(pid, is_bot=True) for pid in bots}},
+            units={},
+        )
+        if not self.sessions.add(session):
+            return {"error": "session already exists"}
+        if session_class is not None:
+            self.admission.assign(session_id, session_class)
+        self._wake(session_id)
+        return {"session": session_summary(session)}
+
+    def close_session(self, session_id: str) -> dict:
+        closed = self.sessions.close(session_id)
+        self.responses.invalidate(session_id)
+        self._revisions.pop(session_id, None)
+        if self.admission is not None:
+            self.admission.forget(session_id)
+        self._views.pop(session_id, None)
+        self.bot_stats.pop(session_id, None)
+        self._unit_state_buckets.pop(session_id, None)
+        if self.history is not None:
+            self.history.flush(session_id)
+        if self.scheduler is not None:
+            self.scheduler.forget(session_id)
+        return {"session_id": session_id, "closed": closed}
+
+    def list_sessions(
+        self,
+        limit: int = 100,
+        cursor: str | None = None,
+        map_name: str | None = None,
+        min_players: int | None = None,
+        max_players: int | None = None,
+        active_within: float | None = None,
+        status: str | None = None,
+    ) -> dict:
+        """One page of session summaries in ``session_id`` order, served from the incremental index."""
+        summaries, next_cursor = self.sessions.page(
+            limit=max(1, min(limit, 1000)),
+            cursor=cursor,
+            map_name=map_name,
+            min_players=min_players,
+            max_players=max_players,
+            active_since=time.time() - active_within if active_within is not None else None,
+            status=status,
+        )
+        return {"sessions": summaries, "total_sessions": len(self.sessions), "next_cursor": next_cursor}
+
+    def _state_payload(self, session: GameSession, player_id: str | None) -> dict:
         return {
-            "state": session.state_payload(),
-            "analytics": self.repository.analytics_snapshot(session_id),
+            "state": session.state_payload(player_id),
+            "analytics": self.repository.analytics_snapshot(session.session_id),
         }
 
-    def get_metrics(self, session_id: str) -> dict:
-        session = self.sessions.get(session_id)
-        if session is None:
-            return {"error": "session not found"}
+    def _state_body(self, session: GameSession, player_id: str | None) -> bytes:
+        analytics = dumps(self.repository.analytics_snapshot(session.session_id))
+        return b'{"state":' + encode_state(session, player_id) + b',"analytics":' + analytics + b"}"
 
+    def _metrics_payload(self, session: GameSession, repository: dict | None = None) -> dict:
         units_by_domain = {"land": 0, "air": 0, "water": 0}
         for unit in session.units.values():
             units_by_domain[unit.domain] = units_by_domain.get(unit.domain, 0) + 1
 
         return {
-            "session_id": session_id,
+            "session_id": session.session_id,
             "tick": session.tick,
             "unit_counts": session.unit_counts(),
             "units_by_domain": units_by_domain,
             "players": len(session.players),
             "bots": len([p for p in session.players.values() if p.is_bot]),
-            "analytics": self.repository.analytics_snapshot(session_id),
+            "analytics": self.repository.analytics_snapshot(session.session_id),
+            "repository": self.repository.operational_metrics() if repository is None else repository,
+            "bot_planner": self.bot_stats.get(session.session_id, {}),
+            "movement": _movement_metrics(session.movement_stats),
+            "actions": dict(self.action_stats),
+            "admission": self.admission.metrics() if self.admission is not None else {},
+            "history": self.history.metrics() if self.history is not None else {},
+            "scheduler": self.scheduler.metrics(session.session_id) if self.scheduler is not None else {},
+            "sessions": self.sessions.metrics(),
         }
 
-    def create_snapshot(self, session_id: str, target_path: str | None = None) -> dict:
-        state = self.get_state(session_id)
-        if "error" in state:
-            return state
-        location = save_snapshot(state, session_id=session_id, target_path=target_path)
-        return {"snapshot_path": location, "session_id": session_id}
+    def _queue_slot(self, session_id: str):
+        if self.admission is None:
+            return nullcontext(True)
+        return self.admission.queue_slot(session_id if session_id in self.sessions else None)
 
-    def list_sessions(self) -> dict:
-        summaries = []
-        for session in self.sessions.values():
-            summaries.append(
-                {
-                    "session_id": session.session_id,
-                    "map": session.game_map.name,
-                    "tick": session.tick,
-                    "players": len(session.players),
-                    "bots": len([p for p in session.players.values() if p.is_bot]),
-                    "units": len(session.units),
-                }
-            )
-        summaries.sort(key=lambda x: x["session_id"])
-        return {"sessions": summaries, "total_sessions": len(summaries)}
-
-    def _choose_bot_action(self, session: GameSession, player_id: str, tick: int) -> ActionRequest | None:
-        units = [u for u in session.units.values() if u.owner_player_id == player_id]
-        if not units:
-            return None
-        unit = self._rng.choice(units)
-        candidates = [
-            (unit.x + 1, unit.y),
-            (unit.x - 1, unit.y),
-            (unit.x, unit.y + 1),
-            (unit.x, unit.y - 1),
-        ]
-        self._rng.shuffle(candidates)
-        for tx, ty in candidates:
-            if session.game_map.in_bounds(tx, ty):
-                return ActionRequest(
-                    session_id=session.session_id,
-                    player_id=player_id,
-                    tick=tick,
-                    action_type="move",
-                    unit_id=unit.unit_id,
-                    target_x=tx,
-                    target_y=ty,
-                )
-        return None
+    def _persist(self, action: ActionRequest, accepted: bool, reason: str) -> None:
+        """Writes the action row and bumps the revision that keys cached analytics for its session."""
+        self.repository.persist_action(action, accepted, reason)
+        self._writes += 1
+        self._bump_revision(action.session_id)
+
+    def _bump_revision(self, session_id: str) -> None:
+        self._revisions[session_id] = self._revisions.get(session_id, 0) + 1
+
+    def _wake(self, session_id: str) -> None:
+        """Marks player or viewer activity so the tick scheduler keeps (or starts) ticking the session."""
+        if self.scheduler is not None and session_id in self.sessions:
+            self.scheduler.wake(session_id)
+
+    def _record_history(self, session: GameSession, tick: int) -> None:
+        if self.history is not None:
+            self.history.record(session, tick)
+
+    def _record_unit_state(self, session: GameSession) -> None:
+        if self.unit_state_interval <= 0:
+            return
+        bucket = session.tick // self.unit_state_interval
+        if self._unit_state_buckets.get(session.session_id) == bucket:
+            return
+        self._unit_state_buckets[session.session_id] = bucket
+        self.repository.record_unit_state(session)
+
+
+def _throttled(reason: str, retry_after: float) -> dict:
+    """Response for an action turned away by admission control; nothing is persisted or queried."""
+    return {"accepted": False, "reason": reason, "state": None, "analytics": None, "retry_after": round(retry_after, 3)}
 
 
 def _build_player(player_id: str, is_bot: bool = False) -> PlayerState:
     return PlayerState(player_id=player_id, is_bot=is_bot)
 
 
-def default_sessions() -> Dict[str, GameSession]:
-    islands = get_map("islands")
-    desert = get_map("desert")
-    archipelago = get_map("archipelago")
-
+def _movement_metrics(stats: Dict[str, float]) -> dict:
+    orders = stats["orders"]
     return {
-        "demo": GameSession(
-            session_id="demo",
-            tick=0,
-            game_map=islands,
-            players={
-                "p-1": _build_player("p-1"),
-                "p-2": _build_player("p-2"),
-                "bot-1": _build_player("bot-1", is_bot=True),
-            },
-            units={
-                "u-1": Unit("u-1", "p-1", "land_infantry", "land", 4, 4, 55),
-                "u-2": Unit("u-2", "p-2", "land_tank", "land", 13, 13, 180),
-                "u-3": Unit("u-3", "bot-1", "air_scout", "air", 9, 9, 65),
-                "u-4": Unit("u-4", "p-1", "water_destroyer", "water", 0, 0, 210),
-            },
-        ),
-        "desert-war": GameSession(
-            session_id="desert-war",
-            tick=0,
-            game_map=desert,
-            players={
-                "p-a": _build_player("p-a"),
-                "p-b": _build_player("p-b"),
-                "bot-desert": _build_player("bot-desert", is_bot=True),
-            },
-            units={
-                "u-10": Unit("u-10", "p-a", "land_artillery", "land", 2, 2, 130),
-                "u-11": Unit("u-11", "p-b", "land_sniper", "land", 17, 17, 70),
-                "u-12": Unit("u-12", "bot-desert", "air_fighter", "air", 8, 8, 100),
-            },
-        ),
-        "blue-front": GameSession(
-            session_id="blue-front",
-            tick=0,
-            game_map=archipelago,
-            players={
-                "admiral": _build_player("admiral"),
-                "raider": _build_player("raider"),
-                "bot-fleet": _build_player("bot-fleet", is_bot=True),
-            },
-            units={
-                "u-20": Unit("u-20", "admiral", "water_submarine", "water", 1, 1, 140),
-                "u-21": Unit("u-21", "raider", "water_battleship", "water", 23, 23, 320),
-                "u-22": Unit("u-22", "bot-fleet", "water_destroyer", "water", 12, 12, 210),
-            },
-        ),
+        **{key: value for key, value in stats.items() if key != "resolve_ms"},
+        "rejected_rate": round(stats["rejected"] / orders, 4) if orders else 0.0,
+        "resolve_ms": round(stats["resolve_ms"], 3),
+        "resolve_ms_per_tick": round(stats["resolve_ms"] / stats["ticks"], 3) if stats["ticks"] else 0.0,
     }
+
+
+def default_sessions() -> Dict[str, GameSession]:
+    return {session_id: factory() for session_id, factory in default_session_factories().items()}
+
+
+def default_session_factories() -> Dict[str, SessionFactory]:
+    """The built-in demo catalogue, registered lazily so each session is only built on first use."""
+    return {"demo": _demo_session, "desert-war": _desert_war_session, "blue-front": _blue_front_session}
+
+
+def stress_session(units: int = 10_000, players: int = 50) -> GameSession:
+    """All-bot ``stress`` session with ``units`` units on a plains map sized to about one unit per six tiles."""
+    size = max(64, int((units * 6) ** 0.5))
+    session = synthetic_session(players, max(1, units // players), size)
+    session.session_id = "stress"
+    return session
+
+
+def _demo_session() -> GameSession:
+    return GameSession(
+        session_id="demo",
+        tick=0,
+        game_map=get_map("islands"),
+        players={
+            "p-1": _build_player("p-1"),
+            "p-2": _build_player("p-2"),
+            "bot-1": _build_player("bot-1", is_bot=True),
+        },
+        units={
+            "u-1": Unit("u-1", "p-1", "land_infantry", "land", 4, 4, 55),
+            "u-2": Unit("u-2", "p-2", "land_tank", "land", 13, 13, 180),
+            "u-3": Unit("u-3", "bot-1", "air_scout", "air", 9, 9, 65),
+            "u-4": Unit("u-4", "p-1", "water_destroyer", "water", 0, 0, 210),
+        },
+    )
+
+
+def _desert_war_session() -> GameSession:
+    return GameSession(
+        session_id="desert-war",
+        tick=0,
+        game_map=get_map("desert"),
+        players={
+            "p-a": _build_player("p-a"),
+            "p-b": _build_player("p-b"),
+            "bot-desert": _build_player("bot-desert", is_bot=True),
+        },
+        units={
+            "u-10": Unit("u-10", "p-a", "land_artillery", "land", 2, 2, 130),
+            "u-11": Unit("u-11", "p-b", "land_sniper", "land", 17, 17, 70),
+            "u-12": Unit("u-12", "bot-desert", "air_fighter", "air", 8, 8, 100),
+        },
+    )
+
+
+def _blue_front_session() -> GameSession:
+    return GameSession(
+        session_id="blue-front",
+        tick=0,
+        game_map=get_map("archipelago"),
+        players={
+            "admiral": _build_player("admiral"),
+            "raider": _build_player("raider"),
+            "bot-fleet": _build_player("bot-fleet", is_bot=True),
+        },
+        units={
+            "u-20": Unit("u-20", "admiral", "water_submarine", "water", 1, 1, 140),
+            "u-21": Unit("u-21", "raider", "water_battleship", "water", 23, 23, 320),
+            "u-22": Unit("u-22", "bot-fleet", "water_destroyer", "water", 12, 12, 210),
+        },
+    )
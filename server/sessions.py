@@ -0,0 +1,458 @@
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from bisect import bisect_right, insort
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Set, Tuple
+
+from server.domain import GameSession, PlayerState, Unit
+from server.maps import plains_map
+from server.models import UNIT_MODELS
+from server.pathfinding import terrain_allowed
+from server.serialization import dumps, loads
+from server.snapshot import save_snapshot, session_from_dict, session_to_dict
+
+SessionFactory = Callable[[], GameSession]
+
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def valid_session_id(session_id: object) -> bool:
+    """Whether ``session_id`` is safe to use as an index key and in file names."""
+    return isinstance(session_id, str) and SESSION_ID_PATTERN.fullmatch(session_id) is not None
+
+
+def session_summary(session: GameSession) -> dict:
+    return {
+        "session_id": session.session_id,
+        "map": session.game_map.name,
+        "tick": session.tick,
+        "players": len(session.players),
+        "bots": len([p for p in session.players.values() if p.is_bot]),
+        "units": len(session.units),
+    }
+
+
+def synthetic_session(players: int = 100, units_per_player: int = 20, size: int = 128, seed: int = 11) -> GameSession:
+    """Large all-bot session on a generated plains map with land/air units on free, passable tiles.
+
+    Backs the ``stress`` session and the benchmarks.
+    """
+    rng = random.Random(seed)
+    game_map = plains_map(size, size)
+    unit_types = sorted(unit_type for unit_type, model in UNIT_MODELS.items() if model.domain != "water")
+    session = GameSession(
+        session_id=f"synthetic-{players}x{units_per_player}",
+        tick=0,
+        game_map=game_map,
+        players={f"p-{i}": PlayerState(f"p-{i}", is_bot=True) for i in range(players)},
+        units={},
+    )
+    occupied = set()
+    for p in range(players):
+        for _ in range(units_per_player):
+            unit_type = rng.choice(unit_types)
+            domain = UNIT_MODELS[unit_type].domain
+            while True:
+                x, y = rng.randrange(size), rng.randrange(size)
+                if (x, y) not in occupied and terrain_allowed(domain, game_map.tile(x, y)):
+                    break
+            occupied.add((x, y))
+            unit_id = f"u-{session.next_unit_index}"
+            session.next_unit_index += 1
+            session.units[unit_id] = Unit(unit_id, f"p-{p}", unit_type, domain, x, y, UNIT_MODELS[unit_type].hp)
+    return session
+
+
+class SessionIndex:
+    """Session summaries kept up to date as sessions change, so listing never walks every session.
+
+    Entries are held in ``session_id`` order (plus one ordered id list per map), so a page is a
+    binary search for the cursor followed by a scan of at most the matching window. ``update`` is
+    called on state changes and refreshes ``updated_at``; ``set_status`` only flips
+    ``resident``/``hibernated``.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self._entries: Dict[str, dict] = {}
+        self._order: List[str] = []
+        self._by_map: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, session_id: object) -> bool:
+        return session_id in self._entries
+
+    def update(self, session: GameSession, status: str = "resident") -> None:
+        entry = session_summary(session)
+        entry["status"] = status
+        entry["updated_at"] = round(self._clock(), 3)
+        previous = self._entries.get(session.session_id)
+        if previous is None:
+            insort(self._order, session.session_id)
+            insort(self._by_map.setdefault(entry["map"], []), session.session_id)
+        self._entries[session.session_id] = entry
+
+    def set_status(self, session_id: str, status: str) -> None:
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            entry["status"] = status
+
+    def get(self, session_id: str) -> dict | None:
+        entry = self._entries.get(session_id)
+        return None if entry is None else dict(entry)
+
+    def remove(self, session_id: str) -> None:
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return
+        _remove_sorted(self._order, session_id)
+        _remove_sorted(self._by_map[entry["map"]], session_id)
+
+    def page(
+        self,
+        limit: int = 100,
+        cursor: str | None = None,
+        map_name: str | None = None,
+        min_players: int | None = None,
+        max_players: int | None = None,
+        active_since: float | None = None,
+        status: str | None = None,
+    ) -> Tuple[List[dict], str | None]:
+        """Up to ``limit`` matching summaries after ``cursor`` and the cursor for the next page."""
+        keys = self._by_map.get(map_name, []) if map_name is not None else self._order
+        entries = self._entries
+        found: List[dict] = []
+        position = bisect_right(keys, cursor) if cursor else 0
+        while position < len(keys) and len(found) < limit:
+            entry = entries[keys[position]]
+            position += 1
+            if min_players is not None and entry["players"] < min_players:
+                continue
+            if max_players is not None and entry["players"] > max_players:
+                continue
+            if active_since is not None and entry["updated_at"] < active_since:
+                continue
+            if status is not None and entry["status"] != status:
+                continue
+            found.append(dict(entry))
+        next_cursor = found[-1]["session_id"] if found and position < len(keys) else None
+        return found, next_cursor
+
+
+def _remove_sorted(keys: List[str], key: str) -> None:
+    position = bisect_right(keys, key) - 1
+    if position >= 0 and keys[position] == key:
+        del keys[position]
+
+
+class SessionStore:
+    """Where hibernated sessions live while they are not resident in memory."""
+
+    def save(self, session_id: str, payload: dict) -> None:
+        raise NotImplementedError
+
+    def load(self, session_id: str) -> dict | None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """Keeps hibernated sessions as zlib-compressed JSON, typically a few percent of the live objects."""
+
+    def __init__(self) -> None:
+        self._blobs: Dict[str, bytes] = {}
+
+    def save(self, session_id: str, payload: dict) -> None:
+        self._blobs[session_id] = zlib.compress(dumps(payload))
+
+    def load(self, session_id: str) -> dict | None:
+        blob = self._blobs.get(session_id)
+        return None if blob is None else loads(zlib.decompress(blob))
+
+    def delete(self, session_id: str) -> None:
+        self._blobs.pop(session_id, None)
+
+    def stored_bytes(self) -> int:
+        return sum(len(blob) for blob in self._blobs.values())
+
+
+class DirectorySessionStore(SessionStore):
+    """Writes hibernated sessions as snapshot JSON files, one per session, under ``directory``."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+
+    def _path(self, session_id: str) -> Path:
+        if not valid_session_id(session_id):
+            raise ValueError(f"invalid session id: {session_id!r}")
+        return self.directory / f"{session_id}.session.json"
+
+    def save(self, session_id: str, payload: dict) -> None:
+        save_snapshot(payload, session_id, target_path=str(self._path(session_id)))
+
+    def load(self, session_id: str) -> dict | None:
+        path = self._path(session_id)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def delete(self, session_id: str) -> None:
+        self._path(session_id).unlink(missing_ok=True)
+
+
+class SessionManager:
+    """Owns every session the service knows about and decides which of them stay in memory.
+
+    Sessions are either resident (live ``GameSession`` objects, kept in LRU order), hibernated
+    (serialized to a ``SessionStore``) or registered via a factory and not built yet. ``get`` and
+    ``checkout`` restore or build transparently. Residents idle longer than ``idle_ttl`` seconds
+    are hibernated, and the least recently used ones are hibernated whenever more than
+    ``max_resident`` sessions or ``max_resident_units`` units (a proxy for memory) are resident.
+    The unit total is kept as a running count, refreshed for a session when it is accessed or
+    touched, so enforcing the limits costs the same however many sessions are resident; idle
+    sessions are also swept by ``evict_idle``, which ``start_sweeper`` runs periodically.
+    Each session has its own lock; ``checkout`` holds it, and eviction skips sessions in use.
+    """
+
+    def __init__(
+        self,
+        sessions: Dict[str, GameSession] | None = None,
+        factories: Dict[str, SessionFactory] | None = None,
+        store: SessionStore | None = None,
+        idle_ttl: float | None = None,
+        max_resident: int | None = None,
+        max_resident_units: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.store = store or InMemorySessionStore()
+        self.idle_ttl = idle_ttl
+        self.max_resident = max_resident
+        self.max_resident_units = max_resident_units
+        self._clock = clock
+        self._resident: "OrderedDict[str, GameSession]" = OrderedDict()
+        self._unit_counts: Dict[str, int] = {}
+        self._resident_units = 0
+        self._sweeper: threading.Thread | None = None
+        self._last_access: Dict[str, float] = {}
+        self._hibernated: Set[str] = set()
+        self.index = SessionIndex()
+        self._factories: Dict[str, SessionFactory] = dict(factories or {})
+        self._locks: Dict[str, threading.RLock] = {}
+        self._in_use: Dict[str, int] = {}
+        self._guard = threading.RLock()
+        self.stats = {"created": 0, "restored": 0, "hibernations": 0, "evicted_idle": 0, "evicted_pressure": 0, "closed": 0}
+        now = clock()
+        for session_id, session in (sessions or {}).items():
+            self._resident[session_id] = session
+            self._count_units(session)
+            self._last_access[session_id] = now
+            self.index.update(session)
+
+    def __contains__(self, session_id: object) -> bool:
+        return session_id in self._resident or session_id in self._hibernated or session_id in self._factories
+
+    def __len__(self) -> int:
+        return len(self._resident) + len(self._hibernated) + len(self._factories)
+
+    def __getitem__(self, session_id: str) -> GameSession:
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+
+    def session_ids(self) -> List[str]:
+        with self._guard:
+            return [*self._resident, *self._hibernated, *self._factories]
+
+    def touch(self, session: GameSession) -> None:
+        """Refreshes the session's listing entry after a state change."""
+        with self._guard:
+            if session.session_id in self._resident:
+                self._count_units(session)
+                self.index.update(session)
+
+    def page(self, **filters) -> Tuple[List[dict], str | None]:
+        """``SessionIndex.page`` over every known session; factory sessions are built on first listing."""
+        for session_id in list(self._factories):
+            self.get(session_id)
+        with self._guard:
+            return self.index.page(**filters)
+
+    def is_resident(self, session_id: str) -> bool:
+        return session_id in self._resident
+
+    def peek(self, session_id: str) -> GameSession | None:
+        """The resident session, without taking its lock, restoring it or refreshing its LRU position."""
+        return self._resident.get(session_id)
+
+    def lock(self, session_id: str) -> threading.RLock:
+        with self._guard:
+            lock = self._locks.get(session_id)
+            if lock is None:
+                lock = self._locks[session_id] = threading.RLock()
+            return lock
+
+    def get(self, session_id: str) -> GameSession | None:
+        with self._guard:
+            session = self._resident.get(session_id)
+            if session is None:
+                session = self._load(session_id)
+                if session is None:
+                    return None
+                self._resident[session_id] = session
+            self._count_units(session)
+            self._resident.move_to_end(session_id)
+            self._last_access[session_id] = self._clock()
+            self._enforce_limits(keep=session_id)
+            return session
+
+    @contextmanager
+    def checkout(self, session_id: str) -> Iterator[GameSession | None]:
+        """Yields the session (``None`` if unknown) while holding its lock."""
+        lock = self.lock(session_id)
+        with lock:
+            self._in_use[session_id] = self._in_use.get(session_id, 0) + 1
+            try:
+                yield self.get(session_id)
+            finally:
+                self._in_use[session_id] -= 1
+                if not self._in_use[session_id]:
+                    del self._in_use[session_id]
+
+    def add(self, session: GameSession) -> bool:
+        with self._guard:
+            if session.session_id in self:
+                return False
+            self._resident[session.session_id] = session
+            self._count_units(session)
+            self._last_access[session.session_id] = self._clock()
+            self.index.update(session)
+            self.stats["created"] += 1
+            self._enforce_limits(keep=session.session_id)
+            return True
+
+    def close(self, session_id: str) -> bool:
+        with self.lock(session_id), self._guard:
+            known = session_id in self
+            self._resident.pop(session_id, None)
+            self._resident_units -= self._unit_counts.pop(session_id, 0)
+            self._last_access.pop(session_id, None)
+            self._factories.pop(session_id, None)
+            if session_id in self._hibernated:
+                self._hibernated.discard(session_id)
+                self.store.delete(session_id)
+            self._locks.pop(session_id, None)
+            self.index.remove(session_id)
+            if known:
+                self.stats["closed"] += 1
+            return known
+
+    def hibernate(self, session_id: str) -> bool:
+        """Serializes a resident session to the store and drops it from memory."""
+        lock = self.lock(session_id)
+        if session_id in self._in_use or not lock.acquire(blocking=False):
+            return False
+        try:
+            with self._guard:
+                session = self._resident.pop(session_id, None)
+                if session is None:
+                    return False
+                self._resident_units -= self._unit_counts.pop(session_id, 0)
+                self._last_access.pop(session_id, None)
+                self.store.save(session_id, session_to_dict(session))
+                self._hibernated.add(session_id)
+                self.index.set_status(session_id, "hibernated")
+                self.stats["hibernations"] += 1
+                return True
+        finally:
+            lock.release()
+
+    def evict_idle(self, now: float | None = None) -> List[str]:
+        if self.idle_ttl is None:
+            return []
+        now = self._clock() if now is None else now
+        with self._guard:
+            idle = [sid for sid in self._resident if now - self._last_access.get(sid, now) >= self.idle_ttl]
+        evicted = [sid for sid in idle if self.hibernate(sid)]
+        self.stats["evicted_idle"] += len(evicted)
+        return evicted
+
+    def start_sweeper(self, interval: float) -> None:
+        """Runs ``evict_idle`` every ``interval`` seconds on a daemon thread."""
+        def sweep() -> None:
+            while True:
+                time.sleep(interval)
+                self.evict_idle()
+
+        with self._guard:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=sweep, name="session-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def metrics(self) -> dict:
+        with self._guard:
+            return {
+                "resident": len(self._resident),
+                "hibernated": len(self._hibernated),
+                "pending_factories": len(self._factories),
+                "resident_units": self._resident_units,
+                **self.stats,
+            }
+
+    def _load(self, session_id: str) -> GameSession | None:
+        if session_id in self._hibernated:
+            payload = self.store.load(session_id)
+            if payload is None:
+                return None
+            self._hibernated.discard(session_id)
+            self.store.delete(session_id)
+            self.stats["restored"] += 1
+            self.index.set_status(session_id, "resident")
+            return session_from_dict(payload)
+        factory = self._factories.pop(session_id, None)
+        if factory is None:
+            return None
+        self.stats["created"] += 1
+        session = factory()
+        self.index.update(session)
+        return session
+
+    def _enforce_limits(self, keep: str) -> None:
+        if self.idle_ttl is not None:
+            now = self._clock()
+            while self._resident:
+                session_id = next(iter(self._resident))
+                if session_id == keep or now - self._last_access.get(session_id, now) < self.idle_ttl:
+                    break
+                if not self.hibernate(session_id):
+                    break  # in use; the next sweep gets it
+                self.stats["evicted_idle"] += 1
+        while self._over_budget():
+            victim = next((sid for sid in list(self._resident) if sid != keep and self.hibernate(sid)), None)
+            if victim is None:
+                return
+            self.stats["evicted_pressure"] += 1
+
+    def _over_budget(self) -> bool:
+        if self.max_resident is not None and len(self._resident) > self.max_resident:
+            return True
+        if self.max_resident_units is not None:
+            return self._resident_units > self.max_resident_units
+        return False
+
+    def _count_units(self, session: GameSession) -> None:
+        count = len(session.units)
+        self._resident_units += count - self._unit_counts.get(session.session_id, 0)
+        self._unit_counts[session.session_id] = count
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 import json
+from dataclasses import asdict
 from datetime import datetime
 from pathlib import Path
 
+from server.domain import GameSession, PlayerState, Resources, Unit
+from server.maps import get_template
+from server.models import MapModel
+
 
 def save_snapshot(payload: dict, session_id: str, target_path: str | None = None) -> str:
     Path("snapshots").mkdir(exist_ok=True)
@@ -15,3 +20,50 @@ def save_snapshot(payload: dict, session_id: str, target_path: str | None = None
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
     return str(path)
+
+
+def session_to_dict(session: GameSession) -> dict:
+    """Complete, JSON-safe image of a session, including standing move orders and mined resources.
+
+    Units are stored as ``Unit.to_tuple`` rows (type and domain as codes) rather than one object each.
+    """
+    game_map = session.game_map
+    return {
+        "session_id": session.session_id,
+        "tick": session.tick,
+        "version": session.version,
+        "next_unit_index": session.next_unit_index,
+        "map": {
+            "name": game_map.name,
+            "width": game_map.width,
+            "height": game_map.height,
+            "resource_amounts": [[x, y, amount] for (x, y), amount in game_map.resource_amounts.items()],
+        },
+        "players": {
+            pid: {"is_bot": p.is_bot, "resources": asdict(p.resources), "groups": p.groups} for pid, p in session.players.items()
+        },
+        "units": [unit.to_tuple() for unit in session.units.values()],
+        "latest_tick_by_player": dict(session.latest_tick_by_player),
+        "movement_stats": dict(session.movement_stats),
+    }
+
+
+def session_from_dict(payload: dict) -> GameSession:
+    map_info = payload["map"]
+    game_map = MapModel(get_template(map_info["name"], map_info["width"], map_info["height"]))
+    game_map.resource_amounts = {(x, y): amount for x, y, amount in map_info["resource_amounts"]}
+    session = GameSession(
+        session_id=payload["session_id"],
+        tick=payload["tick"],
+        game_map=game_map,
+        players={
+            pid: PlayerState(pid, is_bot=p["is_bot"], resources=Resources(**p["resources"]), groups={k: list(v) for k, v in p["groups"].items()})
+            for pid, p in payload["players"].items()
+        },
+        units={unit.unit_id: unit for unit in map(Unit.from_tuple, payload["units"])},
+        latest_tick_by_player=dict(payload["latest_tick_by_player"]),
+        next_unit_index=payload["next_unit_index"],
+        version=payload["version"],
+    )
+    session.movement_stats.update(payload.get("movement_stats", {}))
+    return session
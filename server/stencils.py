@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from math import dist
+from typing import Dict, Tuple
+
+from server.models import UNIT_MODELS
+from server.pathfinding import raytrace_line
+
+Coord = Tuple[int, int]
+RayStencil = Tuple[Tuple[Coord, ...], int]
+
+MAX_ATTACK_RANGE = max(model.attack_range for model in UNIT_MODELS.values())
+
+
+@lru_cache(maxsize=None)
+def disc_offsets(radius: int) -> Tuple[Coord, ...]:
+    """Relative tiles within Euclidean ``radius`` of the origin, row-major."""
+    r2 = radius * radius
+    return tuple((dx, dy) for dy in range(-radius, radius + 1) for dx in range(-radius, radius + 1) if dx * dx + dy * dy <= r2)
+
+
+def _build_ray_table(max_range: int) -> Dict[Coord, RayStencil]:
+    """Bresenham offsets from the origin to every ``(dx, dy)`` within ``max_range``.
+
+    Each entry also carries the bullet-drop step count (``int(distance // 3)``) so shots never
+    need float math at resolution time. Bresenham lines are translation invariant, so one table
+    serves every shooter position.
+    """
+    table: Dict[Coord, RayStencil] = {}
+    r2 = max_range * max_range
+    for dy in range(-max_range, max_range + 1):
+        for dx in range(-max_range, max_range + 1):
+            if dx * dx + dy * dy <= r2:
+                table[(dx, dy)] = (tuple(raytrace_line((0, 0), (dx, dy))), int(dist((0, 0), (dx, dy)) // 3))
+    return table
+
+
+RAY_TABLE: Dict[Coord, RayStencil] = _build_ray_table(MAX_ATTACK_RANGE)
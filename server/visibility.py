@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Set, Tuple
+
+from server.models import UNIT_MODELS
+from server.stencils import disc_offsets
+
+if TYPE_CHECKING:
+    from server.domain import GameSession
+
+Source = Tuple[str, int, int, int]
+
+
+class VisibilityIndex:
+    """Per-player fog-of-war coverage for one session.
+
+    Each player owns a ``width * height`` grid of coverage counts (how many of their units see a
+    tile). ``refresh`` compares every unit with the sight source it last contributed and only
+    re-stamps discs for units that moved, spawned, died or changed type/owner, so a tick where a
+    handful of units moved costs a handful of disc updates regardless of player count.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.grids: Dict[str, array] = {}
+        self._sources: Dict[str, Source] = {}
+
+    def refresh(self, session: GameSession) -> int:
+        updated = 0
+        sources = self._sources
+        for unit in session.units.values():
+            source = (unit.owner_player_id, unit.x, unit.y, UNIT_MODELS[unit.unit_type].sight_range)
+            previous = sources.get(unit.unit_id)
+            if previous == source:
+                continue
+            if previous is not None:
+                self._stamp(previous, -1)
+            self._stamp(source, 1)
+            sources[unit.unit_id] = source
+            updated += 1
+
+        if len(sources) > len(session.units):
+            for unit_id in [uid for uid in sources if uid not in session.units]:
+                self._stamp(sources.pop(unit_id), -1)
+                updated += 1
+        return updated
+
+    def rebuild(self, session: GameSession) -> None:
+        self.grids = {}
+        self._sources = {}
+        self.refresh(session)
+
+    def is_visible(self, player_id: str, x: int, y: int) -> bool:
+        grid = self.grids.get(player_id)
+        return grid is not None and 0 <= x < self.width and 0 <= y < self.height and grid[y * self.width + x] > 0
+
+    def visible_unit_ids(self, session: GameSession, player_id: str) -> List[str]:
+        grid = self.grids.get(player_id)
+        width = self.width
+        visible = []
+        for unit_id, unit in session.units.items():
+            if unit.owner_player_id == player_id or (grid is not None and grid[unit.y * width + unit.x] > 0):
+                visible.append(unit_id)
+        return visible
+
+    def visible_tiles(self, player_id: str) -> Set[Tuple[int, int]]:
+        grid = self.grids.get(player_id)
+        if grid is None:
+            return set()
+        return {(i % self.width, i // self.width) for i, count in enumerate(grid) if count > 0}
+
+    def _stamp(self, source: Source, delta: int) -> None:
+        owner, x, y, radius = source
+        grid = self.grids.get(owner)
+        if grid is None:
+            grid = array("H", bytes(2 * self.width * self.height))
+            self.grids[owner] = grid
+        width, height = self.width, self.height
+        for dx, dy in disc_offsets(radius):
+            tx, ty = x + dx, y + dy
+            if 0 <= tx < width and 0 <= ty < height:
+                grid[ty * width + tx] += delta
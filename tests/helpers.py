@@ -0,0 +1,27 @@
+"""Fixtures shared by several test modules."""
+
+from server.domain import GameSession, PlayerState, Unit
+from server.maps import get_map
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def army_session(enemy_row: int = 17) -> GameSession:
+    """Two all-bot armies of six infantry on the desert map, ``bot-a`` on row 2 and ``bot-b`` on ``enemy_row``."""
+    units = {}
+    for i in range(6):
+        units[f"a-{i}"] = Unit(f"a-{i}", "bot-a", "land_infantry", "land", 2 + i, 2, 55)
+        units[f"b-{i}"] = Unit(f"b-{i}", "bot-b", "land_infantry", "land", 2 + i, enemy_row, 55)
+    return GameSession(
+        session_id="bots",
+        tick=0,
+        game_map=get_map("desert"),
+        players={"bot-a": PlayerState("bot-a", is_bot=True), "bot-b": PlayerState("bot-b", is_bot=True)},
+        units=units,
+    )
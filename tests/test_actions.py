@@ -0,0 +1,73 @@
+import threading
+import unittest
+
+from server.actions import ACTIONS, register_action
+from server.domain import ActionRequest, ValidationResult
+from server.persistence import InMemoryRepository
+from server.service import GameService, _demo_session
+
+
+class ActionRegistryTests(unittest.TestCase):
+    def tearDown(self) -> None:
+        ACTIONS.pop("heal", None)
+
+    def test_new_action_types_register_without_touching_dispatch(self):
+        def heal(session, action):
+            session.units[action.unit_id].hp += 5
+            return ValidationResult(True, "accepted")
+
+        register_action("heal", heal, owned_unit=("no such unit", "not your unit"))
+        session = _demo_session()
+        hp = session.units["u-1"].hp
+
+        self.assertEqual("not your unit", session.apply_action(ActionRequest("demo", "p-1", 1, "heal", unit_id="u-2")).reason)
+        self.assertTrue(session.apply_action(ActionRequest("demo", "p-1", 2, "heal", unit_id="u-1")).accepted)
+        self.assertEqual(hp + 5, session.units["u-1"].hp)
+        batch = session.apply_batch("p-1", 3, [ActionRequest("demo", "p-1", 3, "heal", unit_id="u-404")])
+        self.assertEqual("no such unit", batch[0].reason)
+
+    def test_prevalidation_reasons(self):
+        session = _demo_session()
+        session.apply_action(ActionRequest("demo", "p-1", 4, "stop", unit_id="u-1"))
+        cases = {
+            "player does not exist": ActionRequest("demo", "nobody", 9, "stop", unit_id="u-1"),
+            "tick must increase per player": ActionRequest("demo", "p-1", 4, "stop", unit_id="u-1"),
+            "unsupported action_type: teleport": ActionRequest("demo", "p-1", 9, "teleport"),
+            "unit does not belong to player": ActionRequest("demo", "p-1", 9, "move", unit_id="u-2", target_x=1, target_y=1),
+            "target out of bounds": ActionRequest("demo", "p-1", 9, "move", unit_id="u-1", target_x=99, target_y=1),
+            "unknown unit_type": ActionRequest("demo", "p-1", 9, "spawn_unit", unit_type="mech", target_x=4, target_y=5),
+            "group_id required": ActionRequest("demo", "p-1", 9, "create_group"),
+            "invalid unit in assignment": ActionRequest("demo", "p-1", 9, "assign_group", group_id="g", unit_ids=("u-1", "u-2")),
+        }
+        for reason, action in cases.items():
+            self.assertEqual(ValidationResult(False, reason), session.prevalidate(action))
+            self.assertEqual(ValidationResult(False, reason), session.apply_action(action))
+        self.assertIsNone(session.prevalidate(ActionRequest("demo", "p-1", 9, "move", unit_id="u-1", target_x=5, target_y=5)))
+
+    def test_service_rejects_invalid_actions_without_waiting_for_the_session_lock(self):
+        service = GameService(repository=InMemoryRepository())
+        service.get_state("demo")
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            with service.sessions.checkout("demo"):
+                held.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        held.wait(5)
+        try:
+            result = service.submit_action(ActionRequest("demo", "p-1", 1, "fire", unit_id="u-2", target_x=5, target_y=5))
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual("shooter does not belong to player", result["reason"])
+        self.assertEqual(1, result["analytics"]["rejected_actions"])
+        self.assertEqual(1, service.get_metrics("demo")["actions"]["prevalidated_rejections"])
+
+
+if __name__ == "__main__":
+    unittest.main()
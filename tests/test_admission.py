@@ -0,0 +1,98 @@
+import threading
+import unittest
+
+from server.admission import AdmissionController, AdmissionPolicy
+from server.domain import ActionRequest
+from server.persistence import InMemoryRepository
+from server.service import GameService
+
+from helpers import FakeClock
+
+
+def _controller(clock, **limits):
+    classes = {
+        "standard": AdmissionPolicy(**{"player_rate": 2.0, "player_burst": 2.0, "session_rate": 3.0, "session_burst": 3.0, **limits}),
+        "heavy": AdmissionPolicy(player_rate=1.0, player_burst=1.0, session_rate=None, max_queue=1),
+    }
+    return AdmissionController(classes, clock=clock)
+
+
+class AdmissionControllerTests(unittest.TestCase):
+    def test_player_and_session_buckets_refill_over_time(self):
+        clock = FakeClock()
+        admission = _controller(clock)
+
+        self.assertEqual([0.0, 0.0], [admission.admit("demo", "p-1") for _ in range(2)])
+        self.assertAlmostEqual(0.5, admission.admit("demo", "p-1"))
+        self.assertEqual(0.0, admission.admit("demo", "p-2"))
+        self.assertAlmostEqual(1 / 3, admission.admit("demo", "p-3"))
+        self.assertEqual(0.0, admission.admit("other", "p-1"))
+
+        clock.now = 0.5
+        self.assertEqual(0.0, admission.admit("demo", "p-1"))
+        self.assertEqual({"admitted": 5, "throttled_player": 1, "throttled_session": 1, "shed": 0}, admission.stats)
+
+    def test_session_classes_and_queue_shedding(self):
+        admission = _controller(FakeClock())
+        admission.assign("arena", "heavy")
+
+        self.assertEqual(0.0, admission.admit("arena", "p-1"))
+        self.assertEqual(1.0, admission.admit("arena", "p-1"))
+        with admission.queue_slot("arena") as first, admission.queue_slot("arena") as second:
+            self.assertEqual((True, False), (first, second))
+        with admission.queue_slot("arena") as again:
+            self.assertTrue(again)
+        with self.assertRaises(ValueError):
+            admission.assign("arena", "gold")
+
+    def test_prunes_refilled_buckets(self):
+        clock = FakeClock()
+        admission = AdmissionController(clock=clock, max_buckets=10)
+        for i in range(20):
+            admission.admit("demo", f"p-{i}")
+        clock.now = 60
+        admission.admit("demo", "late")
+
+        self.assertEqual(2, admission.metrics()["buckets"])
+
+
+class ServiceAdmissionTests(unittest.TestCase):
+    def test_throttled_actions_are_not_persisted(self):
+        repository = InMemoryRepository()
+        service = GameService(repository=repository, admission=_controller(FakeClock()))
+
+        results = [service.submit_action(ActionRequest("demo", "p-1", tick, "stop", unit_id="u-1")) for tick in (1, 2, 3)]
+
+        self.assertEqual([True, True, False], [result["accepted"] for result in results])
+        self.assertEqual("rate limited", results[2]["reason"])
+        self.assertEqual(0.5, results[2]["retry_after"])
+        self.assertEqual(2, repository.analytics_snapshot("demo")["total_actions"])
+        self.assertEqual(1, service.get_metrics("demo")["admission"]["throttled_player"])
+
+    def test_full_session_queue_sheds_load(self):
+        service = GameService(repository=InMemoryRepository(), admission=_controller(FakeClock()))
+        self.assertIn("error", service.create_session("plains", ["p-1"], session_id="arena", session_class="gold"))
+        service.create_session("plains", ["p-1", "p-2"], session_id="arena", session_class="heavy")
+        held = threading.Event()
+        release = threading.Event()
+
+        def slow_request():
+            with service.admission.queue_slot("arena"):
+                held.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=slow_request)
+        thread.start()
+        held.wait(5)
+        try:
+            result = service.submit_action(ActionRequest("arena", "p-2", 1, "create_group", group_id="g"))
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual("session queue full", result["reason"])
+        self.assertTrue(service.submit_action(ActionRequest("arena", "p-1", 1, "create_group", group_id="g"))["accepted"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import sys
+import unittest
+
+from server.bots import plan_snapshot
+from server.domain import ActionRequest, GameSession, PlayerState, Unit
+from server.maps import get_map
+from server.persistence import InMemoryRepository
+from server.service import GameService
+from server.snapshot import session_to_dict
+
+from helpers import army_session
+
+
+def _contested_session():
+    units = {}
+    for i in range(8):
+        units[f"a-{i}"] = Unit(f"a-{i}", "bot-a", "air_scout", "air", 10 + 3 * i, 20, 65)
+        units[f"b-{i}"] = Unit(f"b-{i}", "bot-b", "land_infantry", "land", 12 + 3 * i, 20, 55)
+    players = {"bot-a": PlayerState("bot-a", is_bot=True), "bot-b": PlayerState("bot-b", is_bot=True)}
+    return GameSession("contest", 0, get_map("plains"), players, units)
+
+
+class BotPlannerTests(unittest.TestCase):
+    def test_bot_tick_orders_every_bot_unit(self):
+        repo = InMemoryRepository()
+        service = GameService(repository=repo, sessions={"bots": army_session()})
+
+        results = service.tick_bots("bots", tick=1)
+
+        self.assertEqual(["bot-a", "bot-b"], [r["player_id"] for r in results])
+        self.assertEqual([6, 6], [r["orders"] for r in results])
+        self.assertEqual(12, repo.analytics_snapshot("bots")["total_actions"])
+        self.assertEqual(12, service.get_metrics("bots")["bot_planner"]["orders"])
+
+    def test_exhausted_budget_defers_remaining_units_to_next_tick(self):
+        service = GameService(repository=InMemoryRepository(), sessions={"bots": army_session()}, bot_budget_ms=1e-9)
+
+        first = service.tick_bots("bots", tick=1)
+        second = service.tick_bots("bots", tick=2)
+
+        self.assertEqual([1, 1], [r["orders"] for r in first])
+        self.assertEqual([5, 5], [r["deferred_units"] for r in first])
+        self.assertEqual([1, 1], [r["orders"] for r in second])
+
+    def test_worker_pool_plans_match_sequential_plans(self):
+        sequential = GameService(repository=InMemoryRepository(), sessions={"bots": army_session()})
+        pooled = GameService(repository=InMemoryRepository(), sessions={"bots": army_session()}, bot_workers=2)
+
+        for tick in range(1, 6):
+            sequential.tick_bots("bots", tick)
+            pooled.tick_bots("bots", tick)
+
+        self.assertEqual(sequential.get_state("bots")["state"]["units"], pooled.get_state("bots")["state"]["units"])
+
+    def test_contending_bots_plan_the_same_with_workers(self):
+        def play(bot_workers):
+            service = GameService(repository=InMemoryRepository(), sessions={"contest": _contested_session()}, bot_workers=bot_workers)
+            results = [service.tick_bots("contest", tick) for tick in range(1, 4)]
+            return service.get_state("contest")["state"]["units"], results
+
+        expected, results = play(0)
+        self.assertLess(results[1][1]["orders"], 8)
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for _ in range(8):
+                self.assertEqual(expected, play(2)[0])
+        finally:
+            sys.setswitchinterval(interval)
+
+    def test_snapshot_planning_takes_a_relative_budget(self):
+        payload = session_to_dict(army_session())
+
+        unlimited, _ = plan_snapshot(payload, 7, ["bot-a", "bot-b"], 1, {}, 60_000)
+        exhausted, cursors = plan_snapshot(payload, 7, ["bot-a", "bot-b"], 1, {}, 1e-9)
+
+        self.assertEqual([(6, 0), (6, 0)], [(len(orders), deferred) for orders, deferred in unlimited])
+        self.assertEqual([(1, 5), (1, 5)], [(len(orders), deferred) for orders, deferred in exhausted])
+        self.assertEqual({"bot-a": 1, "bot-b": 1}, cursors)
+
+    def test_owner_index_tracks_spawns_and_deaths(self):
+        session = army_session()
+        self.assertEqual(6, len(session.units_of("bot-a")))
+
+        session.apply_action(ActionRequest("bots", "bot-a", 1, "spawn_unit", unit_type="land_infantry", target_x=2, target_y=5))
+        session._apply_damage("b-0", 1000)
+
+        self.assertEqual(7, len(session.units_of("bot-a")))
+        self.assertEqual(5, len(session.units_of("bot-b")))
+
+    def test_apply_batch_rejects_stale_tick_and_mixed_players(self):
+        session = army_session()
+        ok = ActionRequest("bots", "bot-a", 1, "move", unit_id="a-0", target_x=2, target_y=3)
+        other = ActionRequest("bots", "bot-b", 1, "move", unit_id="b-0", target_x=2, target_y=16)
+
+        results = session.apply_batch("bot-a", 1, [ok, other])
+        stale = session.apply_batch("bot-a", 1, [ok])
+
+        self.assertEqual([True, False], [r.accepted for r in results])
+        self.assertFalse(stale[0].accepted)
+        self.assertEqual(1, session.version)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+from server.domain import ActionRequest, GameSession, PlayerState, Unit
+from server.maps import get_map
+
+
+def _duel_session():
+    return GameSession(
+        session_id="duel",
+        tick=0,
+        game_map=get_map("desert"),
+        players={"p-1": PlayerState("p-1"), "p-2": PlayerState("p-2")},
+        units={
+            "a-1": Unit("a-1", "p-1", "land_sniper", "land", 2, 5, 70),
+            "a-2": Unit("a-2", "p-1", "land_sniper", "land", 2, 6, 70),
+            "b-1": Unit("b-1", "p-2", "land_sniper", "land", 8, 5, 50),
+            "b-2": Unit("b-2", "p-2", "land_artillery", "land", 8, 6, 130),
+        },
+    )
+
+
+class CombatResolutionTests(unittest.TestCase):
+    def test_volley_outcome_is_independent_of_submission_order(self):
+        shots = [
+            ActionRequest("duel", "p-1", 1, "fire", unit_id="a-1", target_x=8, target_y=5),
+            ActionRequest("duel", "p-1", 1, "fire", unit_id="a-2", target_x=8, target_y=6),
+        ]
+        forward = _duel_session()
+        backward = _duel_session()
+
+        forward.apply_batch("p-1", 1, shots)
+        backward.apply_batch("p-1", 1, list(reversed(shots)))
+
+        self.assertEqual(forward.state_payload()["units"], backward.state_payload()["units"])
+        self.assertNotIn("b-1", forward.units)
+        self.assertEqual(130 - 55, forward.units["b-2"].hp)
+
+    def test_damage_is_applied_simultaneously_across_players(self):
+        session = _duel_session()
+        session.units["a-1"].hp = 40
+
+        results = session.apply_tick_orders(
+            1,
+            {
+                "p-1": [ActionRequest("duel", "p-1", 1, "fire", unit_id="a-1", target_x=8, target_y=5)],
+                "p-2": [ActionRequest("duel", "p-2", 1, "fire", unit_id="b-1", target_x=2, target_y=5)],
+            },
+        )
+
+        self.assertIn("b-1", results["p-1"][0].reason)
+        self.assertIn("a-1", results["p-2"][0].reason)
+        self.assertNotIn("a-1", session.units)
+        self.assertNotIn("b-1", session.units)
+        self.assertEqual({"p-1": 1, "p-2": 1}, session.latest_tick_by_player)
+        self.assertEqual(1, session.version)
+
+    def test_splash_and_direct_damage_accumulate_per_target(self):
+        session = _duel_session()
+        session.units["a-1"].unit_type = "land_artillery"
+        session.units["a-2"].unit_type = "land_artillery"
+        session.units["b-1"].hp = 500
+        session.units["b-1"].x, session.units["b-1"].y = 4, 5
+        session.units["b-2"].x, session.units["b-2"].y = 4, 6
+
+        session.apply_batch(
+            "p-1",
+            1,
+            [
+                ActionRequest("duel", "p-1", 1, "fire", unit_id="a-1", target_x=4, target_y=5),
+                ActionRequest("duel", "p-1", 1, "fire", unit_id="a-2", target_x=4, target_y=6),
+            ],
+        )
+
+        self.assertEqual(500 - 70 - 35, session.units["b-1"].hp)
+        self.assertEqual(130 - 70 - 35, session.units["b-2"].hp)
+
+    def test_invalid_shots_are_rejected_without_touching_the_board(self):
+        session = _duel_session()
+
+        results = session.apply_batch(
+            "p-1",
+            1,
+            [
+                ActionRequest("duel", "p-1", 1, "fire", unit_id="b-1", target_x=2, target_y=5),
+                ActionRequest("duel", "p-1", 1, "fire", unit_id="a-1", target_x=19, target_y=19),
+            ],
+        )
+
+        self.assertEqual(["shooter does not belong to player", "target out of range"], [r.reason for r in results])
+        self.assertEqual(0, session.version)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,10 @@
+import json
+import sys
 import unittest
 
 from server.domain import ActionRequest, GameSession, PlayerState, Unit
 from server.maps import get_map
+from server.models import ACTION_TYPES, UNIT_MODELS, UNIT_TYPE_CODES, ActionType, Domain
 
 
 class GameSessionValidationTests(unittest.TestCase):
@@ -163,5 +166,30 @@ class GameSessionValidationTests(unittest.TestCase):
         self.assertEqual(70, self.session.units["u-4"].hp)
 
 
+class CompactRepresentationTests(unittest.TestCase):
+    def test_from_payload_interns_ids_and_canonicalizes_names(self) -> None:
+        body = json.loads('{"session_id": "demo", "player_id": "p-1", "tick": 3, "action_type": "assign_group", "group_id": "g", "unit_ids": ["u-1"]}')
+        action = ActionRequest.from_payload(body)
+
+        self.assertIs(sys.intern("p-1"), action.player_id)
+        self.assertIs(ACTION_TYPES[ActionType.ASSIGN_GROUP], action.action_type)
+        self.assertEqual(("u-1",), action.unit_ids)
+        self.assertFalse(hasattr(action, "__dict__"))
+        with self.assertRaises(TypeError):
+            ActionRequest.from_payload({"session_id": "demo", "bogus": 1})
+        for tick in (-1, 10**12, "3"):
+            with self.assertRaises(ValueError):
+                ActionRequest.from_payload({**body, "tick": tick})
+
+    def test_unit_tuple_round_trip_uses_codes(self) -> None:
+        unit = Unit("u-9", "p-1", "water_destroyer", "water", 3, 4, 200, [(4, 4), (5, 4)], 7)
+        row = unit.to_tuple()
+
+        self.assertEqual(("u-9", "p-1", UNIT_TYPE_CODES["water_destroyer"], Domain.WATER, 3, 4, 200, [4, 4, 5, 4], 7), row)
+        restored = Unit.from_tuple(json.loads(json.dumps(row)))
+        self.assertEqual(unit, restored)
+        self.assertIs(UNIT_MODELS["water_destroyer"].unit_type, restored.unit_type)
+
+
 if __name__ == "__main__":
     unittest.main()
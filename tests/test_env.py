@@ -0,0 +1,51 @@
+import importlib.util
+import unittest
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class VectorEnvTests(unittest.TestCase):
+    def test_reset_returns_batched_tensors(self):
+        from server.env import OBS_CHANNELS, VectorEnv
+
+        env = VectorEnv(3, units_per_side=4)
+        obs = env.reset()
+
+        self.assertEqual((3, len(OBS_CHANNELS), 20, 20), obs["grid"].shape)
+        self.assertEqual((3, 3), obs["resources"].shape)
+        self.assertEqual(4, int(obs["grid"][0, 5:8].sum()))
+        self.assertEqual(4, int(obs["grid"][0, 8:11].sum()))
+
+    def test_step_applies_actions_and_rewards(self):
+        import numpy as np
+
+        from server.env import ACTION_MOVE, VectorEnv
+
+        env = VectorEnv(2, units_per_side=4, max_ticks=3)
+        env.reset()
+        unit = env.sessions[0].units[env.unit_slots[0][0]]
+        actions = np.array([[ACTION_MOVE, 0, unit.x, unit.y + 1], [0, 0, 0, 0]])
+
+        obs, rewards, dones, infos = env.step(actions)
+
+        self.assertEqual((2,), rewards.shape)
+        self.assertIn("accepted", infos[0])
+        for _ in range(2):
+            obs, rewards, dones, infos = env.step(np.zeros((2, 4), dtype=np.int64))
+        self.assertTrue(dones.all())
+        self.assertIn("final_info", infos[0])
+        self.assertEqual(0, env.sessions[0].tick)
+
+    def test_resets_share_template_terrain(self):
+        from server.env import VectorEnv
+
+        env = VectorEnv(2, units_per_side=2)
+        env.reset()
+
+        self.assertIs(env.sessions[0].game_map.terrain, env.sessions[1].game_map.terrain)
+        self.assertIsNot(env.sessions[0].game_map.resources, env.sessions[1].game_map.resources)
+
+
+if __name__ == "__main__":
+    unittest.main()
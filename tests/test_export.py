@@ -0,0 +1,69 @@
+import importlib.util
+import tempfile
+import unittest
+
+from server.domain import ActionRequest
+from server.persistence import ACTION_LOG_COLUMNS, ArrowExportRepository, ArrowFileSink, InMemoryRepository, table_ddl
+from server.service import GameService
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+class RecordingSink:
+    def __init__(self):
+        self.batches = []
+
+    def write(self, table_name, batch):
+        self.batches.append((table_name, batch))
+        return table_name
+
+
+class ActionLogSchemaTests(unittest.TestCase):
+    def test_ddl_lists_every_action_log_column(self):
+        ddl = table_ddl("action_log", ACTION_LOG_COLUMNS)
+
+        for name, sql_type in ACTION_LOG_COLUMNS:
+            self.assertIn(f"{name} {sql_type}", ddl)
+
+
+@unittest.skipUnless(HAS_PYARROW, "pyarrow not installed")
+class ArrowExportTests(unittest.TestCase):
+    def test_export_matches_action_log_layout(self):
+        repo = InMemoryRepository()
+        service = GameService(repository=repo)
+        service.submit_action(ActionRequest("demo", "p-1", 1, "move", unit_id="u-1", target_x=5, target_y=4))
+
+        batch = repo.export_action_log("demo")
+
+        self.assertEqual([name for name, _ in ACTION_LOG_COLUMNS], batch.schema.names)
+        self.assertEqual(1, batch.num_rows)
+        self.assertTrue(batch.column(batch.schema.get_field_index("accepted"))[0].as_py())
+
+    def test_export_repository_flushes_batches_and_unit_state(self):
+        sink = RecordingSink()
+        repo = ArrowExportRepository(InMemoryRepository(), sink, batch_rows=2)
+        service = GameService(repository=repo, unit_state_interval=1)
+
+        for tick in range(1, 4):
+            service.submit_action(ActionRequest("demo", "p-1", tick, "create_group", group_id=f"g-{tick}"))
+        repo.flush()
+
+        tables = [name for name, _ in sink.batches]
+        self.assertEqual(3, sum(batch.num_rows for name, batch in sink.batches if name == "action_log"))
+        self.assertIn("unit_state", tables)
+        self.assertEqual(3, repo.analytics_snapshot("demo")["accepted_actions"])
+
+    def test_file_sink_round_trips_ipc(self):
+        import pyarrow.feather as feather
+
+        repo = InMemoryRepository()
+        repo.persist_action(ActionRequest("demo", "p-1", 1, "fire", unit_id="u-1"), accepted=False, reason="target out of range")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = ArrowFileSink(tmp).write("action_log", repo.export_action_log())
+            table = feather.read_table(path)
+
+        self.assertEqual(["target out of range"], table.column("reason").to_pylist())
+
+
+if __name__ == "__main__":
+    unittest.main()
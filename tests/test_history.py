@@ -0,0 +1,85 @@
+import json
+import tempfile
+import unittest
+
+from server.domain import ActionRequest
+from server.history import SnapshotHistory
+from server.persistence import InMemoryRepository
+from server.service import GameService, _demo_session
+from server.snapshot import session_to_dict
+
+
+def _normalized(payload):
+    payload = json.loads(json.dumps(payload))
+    return {**payload, "units": sorted(map(list, payload["units"])), "map": {**payload["map"], "resource_amounts": sorted(payload["map"]["resource_amounts"])}}
+
+
+class SnapshotHistoryTests(unittest.TestCase):
+    def _play(self, history, ticks=12):
+        session = _demo_session()
+        expected = {}
+        for tick in range(1, ticks + 1):
+            session.apply_action(ActionRequest("demo", "p-1", tick, "move", unit_id="u-1", target_x=1 + tick % 6, target_y=2))
+            if tick % 4 == 0:
+                session.apply_action(ActionRequest("demo", "p-1", tick, "create_group", group_id=f"g-{tick}", unit_ids=("u-1",)))
+            if tick == 7:
+                del session.units["u-2"]
+            history.record(session, tick)
+            expected[tick] = _normalized(session_to_dict(session))
+        return expected
+
+    def test_seek_reproduces_every_tick_across_keyframes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = SnapshotHistory(tmp, keyframe_interval=5)
+            expected = self._play(history)
+
+            for tick in (12, 1, 7, 5, 6, 11, 3):
+                self.assertEqual(expected[tick], _normalized(history.seek("demo", tick)))
+            self.assertEqual(expected[12], _normalized(history.seek("demo", 99)))
+            self.assertIsNone(history.seek("demo", 0))
+
+            metrics = history.metrics()
+            self.assertEqual((12, 3), (metrics["frames"], metrics["keyframes"]))
+            self.assertGreater(metrics["stored_bytes"], 0)
+            self.assertEqual((1, 12), history.ticks("demo"))
+
+    def test_session_ids_that_are_not_file_names_are_refused(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            history = SnapshotHistory(tmp, keyframe_interval=1)
+            session = _demo_session()
+            session.session_id = "../../evil"
+
+            with self.assertRaises(ValueError):
+                history.record(session)
+            self.assertIsNone(history.ticks("../../evil"))
+
+    def test_changes_within_one_tick_collapse_into_its_frame(self):
+        history = SnapshotHistory()
+        session = _demo_session()
+        history.record(session)
+        for tick in (1, 1, 0):
+            session.units["u-1"].hp -= 1
+            history.record(session, tick)
+
+        self.assertEqual(2, history.metrics()["frames"])
+        self.assertEqual(_normalized(session_to_dict(session)), _normalized(history.seek("demo", 1)))
+        self.assertEqual(session.units["u-1"].hp + 3, history.seek("demo", 0)["units"][0][6])
+
+    def test_service_serves_history_after_close(self):
+        service = GameService(repository=InMemoryRepository(), history=SnapshotHistory(keyframe_interval=3))
+        for tick in range(1, 8):
+            service.tick_bots("demo", tick)
+        service.close_session("demo")
+
+        summary = service.get_snapshot("demo")
+        state = service.get_snapshot("demo", tick=4)["state"]
+
+        self.assertEqual(7, summary["last_tick"])
+        self.assertEqual(4, state["tick"])
+        self.assertIn("units", state)
+        self.assertIn("error", service.get_snapshot("missing", tick=1))
+        self.assertEqual({"error": "snapshot history is disabled"}, GameService(repository=InMemoryRepository()).get_snapshot("demo"))
+
+
+if __name__ == "__main__":
+    unittest.main()
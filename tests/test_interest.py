@@ -0,0 +1,81 @@
+import unittest
+
+from server.domain import ActionRequest
+from server.interest import InterestManager, Viewport
+from server.maps import describe_map, get_template
+from server.persistence import InMemoryRepository
+from server.service import GameService
+
+
+class InterestManagementTests(unittest.TestCase):
+    def setUp(self):
+        self.service = GameService(repository=InMemoryRepository())
+
+    def test_subscribe_returns_only_units_inside_viewport(self):
+        delta = self.service.subscribe_view("demo", "cam-1", x=0, y=0, width=6, height=6)
+
+        self.assertEqual({"u-1", "u-4"}, set(delta["enter"]))
+        self.assertEqual([], delta["leave"])
+        self.assertEqual({"name": "islands", "width": 20, "height": 20, "hash": describe_map(get_template("islands"))["hash"]}, delta["map"])
+
+    def test_poll_reports_update_leave_and_enter(self):
+        self.service.subscribe_view("demo", "cam-1", x=3, y=3, width=3, height=3)
+
+        self.assertEqual({}, self.service.poll_view("demo", "cam-1")["update"])
+
+        self.service.submit_action(ActionRequest("demo", "p-1", 1, "move", unit_id="u-1", target_x=5, target_y=4))
+        moved = self.service.poll_view("demo", "cam-1")
+        self.assertEqual({"u-1": {"x": 5, "y": 4, "hp": 55}}, moved["update"])
+
+        shifted = self.service.subscribe_view("demo", "cam-1", x=8, y=8, radius=2)
+        self.assertEqual(["u-1"], shifted["leave"])
+        self.assertEqual({"u-3"}, set(shifted["enter"]))
+
+    def test_player_subscription_respects_fog_of_war(self):
+        delta = self.service.subscribe_view("demo", "p-2-cam", x=0, y=0, width=20, height=20, player_id="p-2")
+
+        self.assertIn("u-2", delta["enter"])
+        self.assertNotIn("u-1", delta["enter"])
+
+    def test_unknown_subscription_and_bad_viewport_are_errors(self):
+        self.assertIn("error", self.service.poll_view("demo", "missing"))
+        self.assertIn("error", self.service.subscribe_view("demo", "cam", x=0, y=0))
+        self.assertTrue(self.service.subscribe_view("demo", "cam", x=0, y=0, radius=3)["enter"] is not None)
+        self.assertTrue(self.service.unsubscribe_view("demo", "cam")["removed"])
+
+    def test_spatial_index_is_rebuilt_only_on_new_version(self):
+        session = self.service.sessions["demo"]
+        views = InterestManager(cell_size=4)
+        views.subscribe("a", Viewport(0, 0, 20, 20))
+        views.subscribe("b", Viewport(10, 10, 10, 10))
+
+        views.poll(session, "a")
+        buckets = views.index.buckets
+        views.poll(session, "b")
+        self.assertIs(buckets, views.index.buckets)
+
+        session.version += 1
+        views.poll(session, "a")
+        self.assertIsNot(buckets, views.index.buckets)
+
+    def test_idle_and_least_recently_used_subscriptions_are_dropped(self):
+        session = self.service.sessions["demo"]
+        now = [0.0]
+        views = InterestManager(idle_ttl=10.0, max_subscribers=2, clock=lambda: now[0])
+        views.subscribe("a", Viewport(0, 0, 5, 5))
+        views.subscribe("b", Viewport(0, 0, 5, 5))
+        now[0] = 6.0
+        views.poll(session, "a")
+        views.subscribe("c", Viewport(0, 0, 5, 5))
+        self.assertEqual(["a", "c"], list(views.subscriptions))
+
+        now[0] = 12.0
+        views.poll(session, "c")
+        now[0] = 17.0
+        self.assertEqual(1, views.expire())
+        self.assertEqual(["c"], list(views.subscriptions))
+        self.assertEqual(2, views.expired)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import base64
+import random
+import unittest
+
+from server.maps import GENERATED_TEMPLATE_CACHE, TERRAIN_TYPES, decode_terrain, describe_map, encode_terrain, get_map, get_template, map_response, plains_template
+from server.models import _TEMPLATE_CACHES, MapTemplate
+from server.pathfinding import astar_path, terrain_allowed
+
+
+class MapTemplateCacheTests(unittest.TestCase):
+    def test_sessions_share_terrain_but_not_resource_amounts(self):
+        first, second = get_map("desert"), get_map("desert")
+
+        self.assertIs(first.template, second.template)
+        self.assertIs(first.terrain, second.terrain)
+
+        self.assertEqual(25, first.take_resource((2, 2), 25))
+        self.assertEqual(675, first.resource_at((2, 2)).amount)
+        self.assertEqual(700, second.resource_at((2, 2)).amount)
+        self.assertEqual({(2, 2): 675}, first.resource_amounts)
+        self.assertEqual({}, second.resource_amounts)
+        self.assertEqual(700, get_template("desert").resources[(2, 2)].amount)
+
+    def test_take_resource_is_clamped_to_remaining_amount(self):
+        game_map = get_map("desert")
+        game_map.take_resource((8, 9), 290)
+
+        self.assertEqual(10, game_map.take_resource((8, 9), 25))
+        self.assertEqual(0, game_map.resources[(8, 9)].amount)
+        self.assertEqual(0, game_map.take_resource((0, 0), 25))
+
+    def test_description_encodes_terrain_and_is_cached_by_hash(self):
+        template = get_template("islands")
+        description = describe_map(template)
+
+        self.assertIs(description, describe_map(template))
+        rows = decode_terrain(description["terrain_encoding"], base64.b64decode(description["terrain"]), template.width, template.height)
+        self.assertEqual([list(row) for row in template.terrain], rows)
+        self.assertEqual([[x, y, node.resource_type, node.amount] for (x, y), node in sorted(template.resources.items())], description["resource_nodes"])
+        self.assertNotEqual(description["hash"], describe_map(get_template("desert"))["hash"])
+        self.assertEqual('"' + description["hash"] + '"', map_response(template).etag)
+
+    def test_terrain_encoding_picks_run_lengths_or_bits(self):
+        rng = random.Random(1)
+        noise = MapTemplate("noise", 37, 23, tuple(tuple(rng.choice(TERRAIN_TYPES) for _ in range(37)) for _ in range(23)))
+        for template, expected in ((get_template("plains", 200, 200), "rle"), (noise, "bits")):
+            encoding, blob = encode_terrain(template)
+            self.assertEqual(expected, encoding)
+            self.assertEqual([list(row) for row in template.terrain], decode_terrain(encoding, blob, template.width, template.height))
+        self.assertLess(len(encode_terrain(get_template("plains", 200, 200))[1]), 1000)
+        with self.assertRaises(ValueError):
+            decode_terrain("rle", blob, 10, 10)
+
+    def test_passability_matches_terrain_rules(self):
+        template = get_template("islands")
+        for domain in ("land", "water", "air"):
+            mask = template.passable(domain)
+            for y in range(template.height):
+                for x in range(template.width):
+                    self.assertEqual(terrain_allowed(domain, template.tile(x, y)), bool(mask[y * template.width + x]))
+
+    def test_components_separate_islands_and_short_circuit_pathfinding(self):
+        template = get_template("archipelago")
+
+        self.assertEqual(template.component("land", 2, 2), template.component("land", 5, 5))
+        self.assertNotEqual(template.component("land", 3, 3), template.component("land", 12, 5))
+        self.assertEqual(-1, template.component("land", 0, 0))
+        self.assertIsNone(astar_path(get_map("archipelago"), (3, 3), (12, 5), "land", max_expansions=0))
+
+    def test_only_recent_generated_sizes_stay_cached(self):
+        first = get_template("plains", 40, 40)
+        key = id(first)
+        map_response(first)
+        for side in range(41, 41 + GENERATED_TEMPLATE_CACHE):
+            get_template("plains", side, side)
+
+        self.assertIsNot(first, get_template("plains", 40, 40))
+        del first
+        self.assertNotIn(key, _TEMPLATE_CACHES)
+
+    def test_default_plains_survives_other_sizes(self):
+        default = get_template("plains")
+        self.assertIs(default, plains_template(96, 96))
+        self.assertIs(default, plains_template())
+
+        for side in range(41, 42 + GENERATED_TEMPLATE_CACHE):
+            get_template("plains", side, side)
+
+        self.assertIs(default, get_template("plains", 96, 96))
+
+    def test_derived_data_is_kept_off_the_template_and_released_with_it(self):
+        template = MapTemplate("scratch", 2, 1, (("land", "water"),))
+        key = id(template)
+
+        self.assertEqual(0, template.component("land", 0, 0))
+        map_response(template)
+
+        self.assertEqual({"name", "width", "height", "terrain", "resources"}, set(vars(template)))
+        self.assertEqual({"passable", "components", "description", "response"}, set(_TEMPLATE_CACHES[key]))
+        del template
+        self.assertNotIn(key, _TEMPLATE_CACHES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+
+from server.domain import ActionRequest, GameSession, PlayerState, Unit
+from server.maps import get_map
+from server.movement import MAX_ELAPSED_TICKS
+
+
+def _march_session():
+    return GameSession(
+        session_id="march",
+        tick=0,
+        game_map=get_map("desert"),
+        players={"p-1": PlayerState("p-1"), "p-2": PlayerState("p-2")},
+        units={
+            "a-1": Unit("a-1", "p-1", "land_infantry", "land", 1, 1, 55),
+            "b-1": Unit("b-1", "p-2", "land_tank", "land", 6, 6, 180),
+        },
+    )
+
+
+def _move(tick, unit_id, x, y, player_id="p-1"):
+    return ActionRequest("march", player_id, tick, "move", unit_id=unit_id, target_x=x, target_y=y)
+
+
+class PersistentMoveTests(unittest.TestCase):
+    def test_long_move_is_stepped_over_later_ticks_without_new_searches(self):
+        session = _march_session()
+        unit = session.units["a-1"]
+
+        self.assertTrue(session.apply_action(_move(1, "a-1", 1, 16)).accepted)
+        self.assertEqual((1, 4), (unit.x, unit.y))
+
+        session.apply_action(ActionRequest("march", "p-1", 2, "create_group", group_id="g"))
+        self.assertEqual((1, 7), (unit.x, unit.y))
+
+        self.assertEqual(0, session.advance_movement(5))
+        self.assertEqual((1, 16), (unit.x, unit.y))
+        self.assertEqual([], unit.path)
+        self.assertEqual(1, session.movement_stats["path_searches"])
+        self.assertEqual(15, session.movement_stats["steps"])
+
+    def test_a_far_future_tick_moves_units_only_a_few_ticks(self):
+        session = GameSession("march", 0, get_map("plains"), {"p-1": PlayerState("p-1")}, {"a-1": Unit("a-1", "p-1", "land_infantry", "land", 1, 1, 55)})
+        unit = session.units["a-1"]
+        session.apply_action(_move(1, "a-1", 1, 90))
+
+        session.apply_action(ActionRequest("march", "p-1", 2**31 - 1, "create_group", group_id="g"))
+
+        self.assertEqual((1, 4 + 3 * MAX_ELAPSED_TICKS), (unit.x, unit.y))
+
+    def test_blocked_path_is_repaired_locally(self):
+        session = _march_session()
+        session.apply_action(_move(1, "a-1", 1, 16))
+        session.add_unit(Unit("wall", "p-2", "land_infantry", "land", 1, 10, 55))
+
+        session.advance_movement(10)
+
+        self.assertEqual((1, 16), (session.units["a-1"].x, session.units["a-1"].y))
+        self.assertEqual(1, session.movement_stats["repairs"])
+        self.assertEqual(1, session.movement_stats["path_searches"])
+
+    def test_order_is_cancelled_when_goal_becomes_occupied(self):
+        session = _march_session()
+        session.apply_action(_move(1, "a-1", 1, 16))
+        session.add_unit(Unit("squatter", "p-2", "land_infantry", "land", 1, 16, 55))
+
+        session.advance_movement(10)
+
+        self.assertEqual([], session.units["a-1"].path)
+        self.assertEqual(1, session.movement_stats["cancelled"])
+
+    def test_stop_and_death_clear_standing_orders(self):
+        session = _march_session()
+        session.apply_action(_move(1, "a-1", 1, 16))
+        session.apply_action(_move(1, "b-1", 6, 18, player_id="p-2"))
+
+        self.assertTrue(session.apply_action(ActionRequest("march", "p-1", 2, "stop", unit_id="a-1")).accepted)
+        session.remove_unit("b-1")
+
+        self.assertEqual(0, session.advance_movement(6))
+        self.assertEqual((1, 4), (session.units["a-1"].x, session.units["a-1"].y))
+
+
+class SimultaneousMoveTests(unittest.TestCase):
+    def _column_session(self):
+        session = _march_session()
+        for i in range(3):
+            session.add_unit(Unit(f"c-{i}", "p-1", "land_infantry", "land", 3, 2 + i, 55))
+        return session
+
+    def test_shared_goal_is_resolved_independently_of_submission_order(self):
+        orders = [_move(1, "a-1", 4, 4), _move(1, "c-0", 4, 4), _move(1, "c-2", 4, 4)]
+        finals = []
+        for submitted in (orders, list(reversed(orders))):
+            session = self._column_session()
+            results = session.apply_batch("p-1", 1, submitted)
+            self.assertTrue(all(result.accepted for result in results))
+            session.advance_movement(5)
+            finals.append({uid: (u.x, u.y) for uid, u in session.units.items()})
+
+        self.assertEqual(finals[0], finals[1])
+        self.assertEqual(3, len({finals[0][uid] for uid in ("a-1", "c-0", "c-2")}))
+        self.assertEqual((4, 4), finals[0]["c-2"])
+
+    def test_column_marches_without_collisions_when_followers_are_listed_first(self):
+        session = self._column_session()
+
+        results = session.apply_batch("p-1", 1, [_move(1, f"c-{i}", 3, 7 + i) for i in range(3)])
+
+        self.assertEqual(["accepted"] * 3, [result.reason for result in results])
+        self.assertEqual([(3, 5), (3, 6), (3, 7)], [(session.units[f"c-{i}"].x, session.units[f"c-{i}"].y) for i in range(3)])
+        self.assertEqual(0, session.movement_stats["repairs"])
+
+    def test_goal_vacated_in_the_same_tick_is_not_a_collision(self):
+        session = self._column_session()
+
+        results = session.apply_batch("p-1", 1, [_move(1, "c-1", 3, 2), _move(1, "c-0", 6, 2)])
+
+        self.assertTrue(all(result.accepted for result in results))
+        self.assertEqual((3, 2), (session.units["c-1"].x, session.units["c-1"].y))
+        self.assertEqual(0, session.movement_stats["rejected"])
+
+    def test_service_metrics_report_rejections_and_resolution_cost(self):
+        from server.persistence import InMemoryRepository
+        from server.service import GameService
+
+        session = self._column_session()
+        service = GameService(repository=InMemoryRepository(), sessions={"march": session})
+        session.apply_batch("p-1", 1, [_move(1, "c-0", 3, 3), _move(1, "a-1", 1, 3)])
+
+        movement = service.get_metrics("march")["movement"]
+        self.assertEqual(2, movement["orders"])
+        self.assertEqual(1, movement["rejected"])
+        self.assertEqual(0.5, movement["rejected_rate"])
+        self.assertIn("resolve_ms_per_tick", movement)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from server.domain import ActionRequest
+from server.offline_sim import run_headless, simulate_game
+from server.persistence import NullRepository
+
+
+class HeadlessSimulationTests(unittest.TestCase):
+    def test_same_seed_produces_same_summary(self):
+        first = simulate_game(seed=3, max_ticks=60)
+        second = simulate_game(seed=3, max_ticks=60)
+
+        self.assertEqual(first, second)
+        self.assertLessEqual(first.ticks, 60)
+        self.assertGreater(first.actions, 0)
+        self.assertEqual(set(first.units_lost), {"bot-0", "bot-1"})
+
+    def test_game_ends_when_one_bot_remains(self):
+        summary = simulate_game(seed=1, units_per_bot=4, max_ticks=400)
+
+        if summary.winner is not None:
+            self.assertEqual(0, min(summary.units_remaining.values()))
+            self.assertGreater(summary.units_remaining[summary.winner], 0)
+
+    def test_process_pool_matches_in_process_results(self):
+        serial, report = run_headless(games=4, workers=0, seed=10, max_ticks=40)
+        pooled, _ = run_headless(games=4, workers=2, seed=10, max_ticks=40)
+
+        self.assertEqual(serial, pooled)
+        self.assertEqual(4, report["games"])
+        self.assertIn("ticks_per_sec", report)
+
+    def test_null_repository_only_counts(self):
+        repo = NullRepository()
+        repo.persist_action(ActionRequest("s", "p", 1, "move"), accepted=True, reason="accepted")
+        repo.persist_action(ActionRequest("s", "p", 2, "move"), accepted=False, reason="no valid path")
+
+        snapshot = repo.analytics_snapshot("s")
+
+        self.assertEqual((2, 1, 1), (snapshot["total_actions"], snapshot["accepted_actions"], snapshot["rejected_actions"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,322 @@
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from server.domain import ActionRequest
+from server.persistence import AwanDbRepository
+from server.pool import ConnectionPool, PoolTimeout, PoolUnavailable, QueryClass
+
+from helpers import FakeClock
+
+
+class Backend:
+    """sqlite3 stand-in for AwanDB whose connections can be taken down and brought back."""
+
+    def __init__(self, path):
+        self.path = path
+        self.down = False
+        self.connects = 0
+        self.reports_blocked = None
+        self.report_started = threading.Event()
+        self.reject_tick = None
+        self.rollup_threads = set()
+
+    def connect(self):
+        if self.down:
+            raise ConnectionError("backend down")
+        self.connects += 1
+        return FlakyConnection(self, sqlite3.connect(self.path, check_same_thread=False))
+
+
+class FlakyConnection:
+    def __init__(self, backend, conn):
+        self.backend = backend
+        self.conn = conn
+
+    def cursor(self):
+        return FlakyCursor(self.backend, self.conn.cursor())
+
+    def close(self):
+        self.conn.close()
+
+
+class FlakyCursor:
+    def __init__(self, backend, cursor):
+        self.backend = backend
+        self.cursor = cursor
+
+    def execute(self, sql, params=()):
+        if self.backend.down:
+            raise ConnectionError("connection dropped")
+        if sql.startswith("INSERT INTO action_rollup"):
+            self.backend.rollup_threads.add(threading.current_thread().name)
+        if sql.lstrip().startswith("INSERT INTO action_log") and params[2] == self.backend.reject_tick:
+            raise sqlite3.IntegrityError("value rejected")
+        if "GROUP BY" in sql and self.backend.reports_blocked is not None:
+            self.backend.report_started.set()
+            self.backend.reports_blocked.wait(5)
+        self.cursor.execute(sql, params)
+        self.cursor.connection.commit()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+
+class ConnectionPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = Backend(str(Path(self.tmp.name) / "awan.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pool_is_bounded_and_reports_timeouts(self):
+        pool = ConnectionPool(self.backend.connect, size=1, checkout_timeout=0.05)
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with pool.connection():
+                held.set()
+                release.wait(1)
+
+        worker = threading.Thread(target=hold)
+        worker.start()
+        held.wait(1)
+        with self.assertRaises(PoolTimeout):
+            with pool.connection():
+                pass
+        release.set()
+        worker.join()
+
+        metrics = pool.metrics()
+        self.assertEqual(1, metrics["open"])
+        self.assertEqual(1, metrics["timeouts"])
+        self.assertEqual(0, metrics["in_use"])
+
+    def test_same_thread_reuses_checked_out_connection(self):
+        pool = ConnectionPool(self.backend.connect, size=2)
+
+        with pool.connection() as outer:
+            with pool.connection() as inner:
+                self.assertIs(outer, inner)
+
+        self.assertEqual(1, self.backend.connects)
+
+    def test_reconnect_backs_off_exponentially(self):
+        clock = FakeClock()
+        pool = ConnectionPool(self.backend.connect, size=1, backoff_initial=1.0, backoff_max=4.0, clock=clock)
+        self.backend.down = True
+
+        for expected in (1.0, 2.0, 4.0, 4.0):
+            with self.assertRaises(PoolUnavailable):
+                with pool.connection():
+                    pass
+            self.assertEqual(expected, pool.metrics()["backoff_seconds"])
+            with self.assertRaises(PoolUnavailable):
+                with pool.connection():
+                    pass
+            clock.now += expected
+
+        self.backend.down = False
+        with pool.connection() as cursor:
+            cursor.execute("SELECT 1")
+        self.assertEqual(0.0, pool.metrics()["backoff_seconds"])
+        self.assertEqual(4, pool.metrics()["connect_failures"])
+
+    def test_idle_connection_failing_health_check_is_replaced(self):
+        clock = FakeClock()
+        pool = ConnectionPool(self.backend.connect, size=1, health_check_interval=10.0, clock=clock)
+        with pool.connection():
+            pass
+        first = pool._idle[0].conn
+        first.conn.close()
+        clock.now += 11
+
+        with pool.connection() as cursor:
+            cursor.execute("SELECT 1")
+
+        self.assertEqual(1, pool.metrics()["health_check_failures"])
+        self.assertEqual(2, self.backend.connects)
+
+
+class AwanDbRepositoryPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = Backend(str(Path(self.tmp.name) / "awan.db"))
+        self.repo = AwanDbRepository("grpc://unused", "admin", "admin", connect=self.backend.connect, backoff_initial=0.0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _persist(self, tick):
+        self.repo.persist_action(ActionRequest("demo", "p-1", tick, "move", unit_id="u-1", target_x=5, target_y=4), True, "accepted")
+
+    def test_writes_are_buffered_through_outage_and_replayed(self):
+        self._persist(1)
+        before = self.repo.analytics_snapshot("demo")
+
+        self.backend.down = True
+        self._persist(2)
+        self._persist(3)
+        self.assertEqual(2, self.repo.operational_metrics()["pending_writes"])
+        self.assertEqual(before, self.repo.analytics_snapshot("demo"))
+
+        self.backend.down = False
+        self._persist(4)
+        self.repo.replay_pending()
+
+        self.assertEqual(0, self.repo.operational_metrics()["pending_writes"])
+        self.assertEqual(4, self.repo.analytics_snapshot("demo")["total_actions"])
+
+    def test_rejected_rows_are_dropped_without_blocking_later_writes(self):
+        self.backend.reject_tick = 2
+        for tick in (1, 2, 3):
+            self._persist(tick)
+        self.assertEqual(0, self.repo.operational_metrics()["pool"]["discarded"])
+
+        self.backend.down = True
+        self._persist(2)
+        self._persist(4)
+        self.backend.down = False
+        self.repo.replay_pending()
+
+        metrics = self.repo.operational_metrics()
+        self.assertEqual((0, 2, 0), (metrics["pending_writes"], metrics["rejected_writes"], metrics["dropped_writes"]))
+        self.assertEqual(3, self.repo.analytics_snapshot("demo")["total_actions"])
+
+    def test_concurrent_writers_share_the_pool(self):
+        threads = [threading.Thread(target=self._persist, args=(tick,)) for tick in range(1, 21)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(20, self.repo.analytics_snapshot("demo")["total_actions"])
+        pool = self.repo.operational_metrics()["pool"]
+        self.assertLessEqual(pool["open"], pool["size"])
+        self.assertIn("wait_ms_avg", pool)
+
+
+class QueryClassTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = Backend(str(Path(self.tmp.name) / "awan.db"))
+        self.repo = AwanDbRepository(
+            "grpc://unused",
+            "admin",
+            "admin",
+            connect=self.backend.connect,
+            query_classes={"analytics": QueryClass(size=1, checkout_timeout=0.05)},
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _persist(self, tick, player_id="p-1"):
+        self.repo.persist_action(ActionRequest("demo", player_id, tick, "stop", unit_id="u-1"), True, "accepted")
+
+    def test_slow_reports_do_not_block_writes_or_nearline_reads(self):
+        self._persist(1)
+        self._persist(1, "p-2")
+        first = self.repo.breakdown("demo", "player")
+        self.backend.reports_blocked = threading.Event()
+        report = threading.Thread(target=self.repo.breakdown, args=("demo", "player"))
+        report.start()
+        self.backend.report_started.wait(5)
+        try:
+            for tick in range(2, 12):
+                self._persist(tick)
+            snapshot = self.repo.analytics_snapshot("demo")
+            stalled = self.repo.breakdown("demo", "player")
+        finally:
+            self.backend.reports_blocked.set()
+            report.join()
+
+        self.assertEqual(12, snapshot["total_actions"])
+        self.assertEqual(first, stalled)
+        pools = self.repo.operational_metrics()["pools"]
+        self.assertEqual({"write", "nearline", "analytics"}, set(pools))
+        self.assertEqual(1, pools["analytics"]["timeouts"])
+        self.assertLess(pools["write"]["wait_ms_max"], 100)
+        self.assertEqual(0, self.repo.operational_metrics()["pending_writes"])
+
+    def test_breakdown_groups_by_action_type(self):
+        self._persist(1)
+        self.repo.persist_action(ActionRequest("demo", "p-1", 2, "move", unit_id="u-9"), False, "no such unit")
+
+        rows = self.repo.breakdown("demo", "action_type")
+
+        self.assertEqual(["move", "stop"], [row["action_type"] for row in rows])
+        self.assertEqual((1, 0, 1), (rows[0]["total_actions"], rows[0]["accepted_actions"], rows[0]["rejected_actions"]))
+
+
+class MaterializedRollupTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = Backend(str(Path(self.tmp.name) / "awan.db"))
+        self.repo = AwanDbRepository(
+            "grpc://unused",
+            "admin",
+            "admin",
+            connect=self.backend.connect,
+            backoff_initial=0.0,
+            rollup_ticks=5,
+            rollup_flush_rows=4,
+            replay_interval=0.01,
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _flushed_actions(self):
+        for _ in range(200):
+            with self.repo._pool.connection() as cursor:
+                cursor.execute("SELECT SUM(actions) FROM action_rollup")
+                flushed = cursor.fetchall()[0][0] or 0
+            if flushed >= 8:
+                break
+            time.sleep(0.01)
+        return flushed
+
+    def test_rollups_are_flushed_to_the_aggregate_table_and_merged_with_pending_deltas(self):
+        for tick in range(1, 11):
+            self.repo.persist_action(ActionRequest("demo", "p-1", tick, "stop", unit_id="u-1"), tick != 7, "accepted" if tick != 7 else "no such unit")
+            if tick == 8:
+                flushed = self._flushed_actions()
+
+        summary = self.repo.analytics("demo")
+
+        self.assertEqual(8, flushed)
+        self.assertEqual([(0, 4), (5, 5), (10, 1)], [(point["tick"], point["actions"]) for point in summary["series"]])
+        self.assertEqual({"no such unit": 1}, summary["rejection_reasons"])
+        self.assertEqual([(5, 5)], [(p["tick"], p["actions"]) for p in self.repo.analytics("demo", 5, 9)["series"]])
+
+    def test_flush_runs_off_the_request_thread_during_an_outage(self):
+        self.backend.down = True
+        for tick in range(1, 9):
+            self.repo.persist_action(ActionRequest("demo", "p-1", tick, "stop", unit_id="u-1"), True, "accepted")
+
+        self.backend.down = False
+        self.assertEqual(8, self._flushed_actions())
+        self.assertEqual({"awandb-rollups"}, self.backend.rollup_threads)
+        self.assertEqual(8, sum(point["actions"] for point in self.repo.analytics("demo")["series"]))
+
+    def test_failed_flush_keeps_deltas(self):
+        for tick in range(1, 4):
+            self.repo.persist_action(ActionRequest("demo", "p-1", tick, "stop", unit_id="u-1"), True, "accepted")
+        self.repo.analytics("demo")
+        self.backend.down = True
+        self.repo.persist_action(ActionRequest("demo", "p-1", 4, "stop", unit_id="u-1"), True, "accepted")
+
+        self.assertEqual(4, sum(point["actions"] for point in self.repo.analytics("demo")["series"]))
+        self.backend.down = False
+        self.repo.flush_rollups()
+        self.assertEqual(4, sum(point["actions"] for point in self.repo.analytics("demo")["series"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
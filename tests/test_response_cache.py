@@ -0,0 +1,109 @@
+import gzip
+import json
+import unittest
+
+from server.domain import ActionRequest
+from server.persistence import InMemoryRepository
+from server.response_cache import CachedResponse, ResponseCache
+from server.service import GameService
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_rebuilds_only_when_version_changes(self):
+        cache = ResponseCache()
+        builds = []
+
+        def build():
+            builds.append(1)
+            return b'{"n":%d}' % len(builds)
+
+        first = cache.get("state", "demo", None, 1, build)
+        self.assertIs(first, cache.get("state", "demo", None, 1, build))
+        second = cache.get("state", "demo", None, 2, build)
+
+        self.assertEqual(2, len(builds))
+        self.assertNotEqual(first.etag, second.etag)
+        self.assertEqual({"n": 2}, json.loads(second.body))
+        self.assertEqual({"entries": 1, "hits": 1, "misses": 2, "invalidations": 0, "hit_rate": 0.3333}, cache.metrics())
+
+    def test_etag_matching_and_gzip(self):
+        response = CachedResponse.from_payload(200, {"units": ["u"] * 500})
+
+        self.assertTrue(response.matches(response.etag))
+        self.assertTrue(response.matches(f'"other", W/{response.etag}'))
+        self.assertTrue(response.matches("*"))
+        self.assertFalse(response.matches('"other"'))
+        self.assertFalse(response.matches(None))
+        self.assertEqual(response.body, gzip.decompress(response.gzipped()))
+        self.assertLess(len(response.gzipped()), len(response.body))
+
+    def test_invalidate_drops_every_entry_of_a_session(self):
+        cache = ResponseCache(max_entries=2)
+        cache.get("state", "a", None, 1, bytes)
+        cache.get("state", "a", "p-1", 1, bytes)
+        cache.get("state", "b", None, 1, bytes)
+
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.invalidate("a"))
+        self.assertEqual(1, len(cache))
+
+
+class CachedServiceResponseTests(unittest.TestCase):
+    def test_state_cache_follows_session_version_and_analytics(self):
+        service = GameService(repository=InMemoryRepository())
+        first = service.state_response("demo")
+
+        self.assertIs(first, service.state_response("demo"))
+        self.assertEqual(service.get_state("demo"), json.loads(first.body))
+
+        service.submit_action(ActionRequest("demo", "p-1", 1, "move", unit_id="u-1", target_x=99, target_y=99))
+        rejected = service.state_response("demo")
+        self.assertIsNot(first, rejected)
+        self.assertEqual(1, json.loads(rejected.body)["analytics"]["rejected_actions"])
+
+        service.submit_action(ActionRequest("demo", "p-1", 2, "move", unit_id="u-1", target_x=5, target_y=4))
+        moved = service.state_response("demo")
+        self.assertEqual(service.get_state("demo"), json.loads(moved.body))
+        self.assertEqual(2, json.loads(moved.body)["state"]["tick"])
+
+    def test_per_player_views_and_metrics_are_cached_separately(self):
+        service = GameService(repository=InMemoryRepository())
+
+        fogged = service.state_response("demo", player_id="p-1")
+        self.assertIsNot(fogged, service.state_response("demo"))
+        self.assertIs(fogged, service.state_response("demo", player_id="p-1"))
+        self.assertIn("error", json.loads(service.state_response("demo", player_id="nobody").body))
+
+        metrics = service.metrics_response("demo")
+        self.assertIs(metrics, service.metrics_response("demo"))
+        self.assertEqual(service.get_metrics("demo"), json.loads(metrics.body))
+        service.tick_bots("demo", tick=3)
+        self.assertEqual(service.get_metrics("demo"), json.loads(service.metrics_response("demo").body))
+
+    def test_metrics_follow_repository_health(self):
+        repository = InMemoryRepository()
+        health = {"pending_writes": 0}
+        repository.operational_metrics = lambda: dict(health)
+        service = GameService(repository=repository)
+        before = service.metrics_response("demo")
+
+        health["pending_writes"] = 3
+
+        after = service.metrics_response("demo")
+        self.assertNotEqual(before.etag, after.etag)
+        self.assertEqual(3, json.loads(after.body)["repository"]["pending_writes"])
+
+    def test_closing_a_session_drops_its_cached_responses(self):
+        service = GameService(repository=InMemoryRepository())
+        service.create_session("plains", ["p-1"], session_id="room")
+        before = service.state_response("room")
+
+        service.close_session("room")
+        service.create_session("islands", ["p-1"], session_id="room")
+
+        self.assertEqual("islands", json.loads(service.state_response("room").body)["state"]["map"])
+        self.assertNotEqual(before.etag, service.state_response("room").etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+from server.domain import ActionRequest
+from server.persistence import InMemoryRepository
+from server.rollups import COARSE_BUCKETS, Rollups, bucket_range, merge, summarize
+from server.service import GameService
+
+
+class RollupTests(unittest.TestCase):
+    def test_merges_drained_rows_with_new_deltas(self):
+        rollups = Rollups(bucket_ticks=5)
+        rollups.add("demo", "p-1", 3, "move", True, "accepted", 40)
+        rollups.add("demo", "p-1", 4, "move", False, "target out of bounds", 40)
+        rollups.add("demo", "p-2", 7, "fire", False, "target out of bounds", 30)
+        flushed = Rollups(bucket_ticks=5)
+        flushed.add_rows(rollups.drain())
+        rollups.add("demo", "p-1", 4, "move", True, "accepted", 40)
+
+        everything = bucket_range(5, None, None)
+        summary = summarize("demo", 5, merge(flushed.query("demo", *everything), rollups.query("demo", *everything)))
+
+        self.assertEqual([(0, 3, 2, 120), (5, 1, 0, 30)], [(p["tick"], p["actions"], p["accepted_actions"], p["network_bytes"]) for p in summary["series"]])
+        self.assertEqual(0.6, summary["series"][0]["actions_per_tick"])
+        self.assertEqual({"target out of bounds": 2}, summary["rejection_reasons"])
+        self.assertEqual({"p-1": {"move": 3}, "p-2": {"fire": 1}}, summary["action_mix"])
+        self.assertEqual(0, rollups.drain()[0][1])
+
+    def test_range_queries_combine_coarse_blocks_and_fine_edges(self):
+        rollups = Rollups(bucket_ticks=1)
+        for tick in range(5 * COARSE_BUCKETS):
+            rollups.add("demo", f"p-{tick % 3}", tick, "move" if tick % 2 else "stop", tick % 5 != 0, "accepted" if tick % 5 else "late", 10)
+
+        for first, last in ((0, 10**9), (3, 70), (16, 31), (17, 30), (40, 40), (79, 200)):
+            series, reasons, mix = rollups.query("demo", first, last)
+            ticks = range(first, min(last, 5 * COARSE_BUCKETS - 1) + 1)
+            self.assertEqual(sorted(ticks), sorted(series))
+            self.assertEqual(sum(1 for tick in ticks if tick % 5 == 0), reasons.get("late", 0))
+            self.assertEqual(len(ticks), sum(sum(counts.values()) for counts in mix.values()))
+
+    def test_sparse_far_apart_buckets_are_not_scanned_one_by_one(self):
+        rollups = Rollups(bucket_ticks=1)
+        rollups.add("demo", "p-1", 3, "stop", True, "accepted", 10)
+        rollups.add("demo", "p-1", 10**15, "stop", False, "late", 10)
+
+        series, reasons, mix = rollups.query("demo", *bucket_range(1, None, None))
+
+        self.assertEqual([3, 10**15], sorted(series))
+        self.assertEqual({"late": 1}, reasons)
+        self.assertEqual({"p-1": {"stop": 2}}, mix)
+
+    def test_in_memory_rollups_match_the_action_log(self):
+        repository = InMemoryRepository(rollup_ticks=4)
+        for tick in range(1, 21):
+            accepted = tick % 3 != 0
+            repository.persist_action(ActionRequest("demo", f"p-{tick % 2}", tick, "stop", unit_id="u-1"), accepted, "accepted" if accepted else "no such unit")
+
+        summary = repository.analytics("demo", from_tick=5, to_tick=11)
+        scanned = [row for row in repository._records if 4 <= row[2] < 12]
+
+        self.assertEqual([4, 8], [point["tick"] for point in summary["series"]])
+        self.assertEqual(len(scanned), sum(point["actions"] for point in summary["series"]))
+        self.assertEqual(sum(row[12] for row in scanned), sum(point["network_bytes"] for point in summary["series"]))
+        self.assertEqual({"no such unit": sum(1 for row in scanned if not row[10])}, summary["rejection_reasons"])
+        self.assertEqual(repository.analytics_snapshot("demo")["total_actions"], sum(p["actions"] for p in repository.analytics("demo")["series"]))
+
+    def test_service_validates_ranges(self):
+        service = GameService(repository=InMemoryRepository())
+        service.submit_action(ActionRequest("demo", "p-1", 12, "stop", unit_id="u-1"))
+
+        result = service.get_analytics("demo", from_tick=10)
+
+        self.assertEqual([10], [point["tick"] for point in result["series"]])
+        self.assertEqual({"p-1": {"stop": 1}}, result["action_mix"])
+        self.assertIn("error", service.get_analytics("demo", from_tick=5, to_tick=1))
+        self.assertEqual({"error": "session not found"}, service.get_analytics("missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
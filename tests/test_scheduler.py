@@ -0,0 +1,122 @@
+import unittest
+
+from server.domain import ActionRequest
+from server.persistence import InMemoryRepository
+from server.scheduler import TickScheduler
+from server.service import GameService
+
+from helpers import FakeClock, army_session
+
+
+def _scheduler(clock, ran, alive=lambda session_id: True, **options):
+    scheduler = TickScheduler(**{"tick_rate": 10.0, "workers": 1, "idle_after": 5.0, "max_catch_up": 5, "clock": clock, **options})
+
+    def run_tick(session_id):
+        ran.append(session_id)
+        return alive(session_id)
+
+    scheduler.bind(run_tick)
+    return scheduler
+
+
+class TickSchedulerTests(unittest.TestCase):
+    def test_runs_most_overdue_session_first_and_caps_catch_up(self):
+        clock, ran = FakeClock(), []
+        scheduler = _scheduler(clock, ran)
+        scheduler.wake("behind")
+        clock.now = 0.5
+        scheduler.wake("recent")
+        clock.now = 1.0
+
+        self.assertEqual(12, scheduler.run_pending())
+
+        self.assertEqual(["behind", "recent"], ran[:2])
+        behind, recent = scheduler.metrics("behind")["session"], scheduler.metrics("recent")["session"]
+        self.assertEqual((6, 5), (behind["ticks"], behind["skipped_ticks"]))
+        self.assertEqual((6, 0, 500.0), (recent["ticks"], recent["skipped_ticks"], recent["lag_ms_max"]))
+        self.assertEqual(0, scheduler.run_pending())
+        clock.now = 1.1
+        self.assertEqual(2, scheduler.run_pending())
+
+    def test_idle_and_closed_sessions_are_unscheduled(self):
+        clock, ran = FakeClock(), []
+        scheduler = _scheduler(clock, ran, alive=lambda session_id: session_id != "closed")
+        scheduler.wake("idle")
+        scheduler.wake("closed")
+        scheduler.run_pending()
+        clock.now = 6.0
+
+        scheduler.run_pending()
+
+        self.assertEqual(["closed", "idle"], sorted(ran))
+        metrics = scheduler.metrics()
+        self.assertEqual((0, 1), (metrics["active_sessions"], metrics["parked"]))
+        scheduler.wake("idle")
+        self.assertEqual(1, scheduler.run_pending())
+
+    def test_failing_tick_is_counted_and_keeps_its_schedule(self):
+        clock = FakeClock()
+        scheduler = TickScheduler(clock=clock)
+        scheduler.bind(lambda session_id: 1 / 0)
+        scheduler.wake("demo")
+
+        scheduler.run_pending()
+
+        metrics = scheduler.metrics("demo")
+        self.assertEqual((1, 1), (metrics["errors"], metrics["active_sessions"]))
+        self.assertIn("ZeroDivisionError", metrics["last_error"])
+
+
+class ServiceSchedulerTests(unittest.TestCase):
+    def _run(self, processes: bool):
+        clock = FakeClock()
+        scheduler = TickScheduler(workers=2, processes=processes, clock=clock)
+        service = GameService(repository=InMemoryRepository(), sessions={"bots": army_session(enemy_row=9)}, scheduler=scheduler)
+        service.subscribe_view("bots", "cam", x=0, y=0, radius=30)
+        for _ in range(3):
+            scheduler.run_pending()
+            clock.now += scheduler.interval
+        scheduler.stop()
+        return service
+
+    def test_active_sessions_tick_their_bots(self):
+        service = self._run(processes=False)
+
+        session = service.sessions["bots"]
+        self.assertEqual(3, session.tick)
+        self.assertEqual(3, service.bot_stats["bots"]["tick"])
+        scheduler = service.get_metrics("bots")["scheduler"]
+        self.assertEqual((3, 1), (scheduler["session"]["ticks"], scheduler["active_sessions"]))
+
+    def test_process_workers_plan_the_same_orders(self):
+        threaded, pooled = self._run(processes=False), self._run(processes=True)
+
+        positions = lambda service: {unit_id: (u.x, u.y, u.hp) for unit_id, u in service.sessions["bots"].units.items()}
+        self.assertEqual(positions(threaded), positions(pooled))
+        self.assertEqual(3, pooled.sessions["bots"].tick)
+        self.assertEqual("process", pooled.get_metrics("bots")["scheduler"]["mode"])
+
+    def test_sessions_without_bots_still_advance_each_tick(self):
+        for processes in (False, True):
+            with self.subTest(processes=processes):
+                clock = FakeClock()
+                scheduler = TickScheduler(workers=1, processes=processes, clock=clock)
+                service = GameService(repository=InMemoryRepository(), sessions={}, scheduler=scheduler)
+                service.create_session("desert", players=["p-1"], session_id="humans")
+                service.submit_action(ActionRequest("humans", "p-1", 1, "spawn_unit", unit_type="land_infantry", target_x=3, target_y=3))
+                service.submit_action(ActionRequest("humans", "p-1", 2, "move", unit_id="u-1000", target_x=3, target_y=15))
+                session = service.sessions["humans"]
+                food = session.players["p-1"].resources.food
+
+                for _ in range(3):
+                    scheduler.run_pending()
+                    clock.now += scheduler.interval
+                scheduler.stop()
+
+                self.assertEqual(5, session.tick)
+                self.assertEqual((3, 15), (session.units["u-1000"].x, session.units["u-1000"].y))
+                self.assertLess(session.players["p-1"].resources.food, food)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import json
+import unittest
+from dataclasses import asdict
+
+from server.domain import ActionRequest
+from server.serialization import action_wire_size, dumps, encode_state, loads
+from server.service import _demo_session
+
+
+class EncodeStateTests(unittest.TestCase):
+    def test_matches_state_payload_for_full_and_fogged_views(self):
+        session = _demo_session()
+        session.players["p-1"].groups["strike"] = ["u-1"]
+
+        self.assertEqual(session.state_payload(), loads(encode_state(session)))
+        self.assertEqual(session.state_payload("p-1"), loads(encode_state(session, "p-1")))
+        self.assertEqual(dumps(session.state_payload()), encode_state(session))
+
+    def test_fragments_follow_unit_changes(self):
+        session = _demo_session()
+        encode_state(session)
+        unit = session.units["u-1"]
+        unit.x, unit.hp = unit.x + 1, unit.hp - 3
+        del session.units["u-2"]
+
+        self.assertEqual(session.state_payload(), loads(encode_state(session)))
+        self.assertNotIn("u-2", session._wire_fragments)
+
+    def test_escapes_ids(self):
+        session = _demo_session()
+        session.units['u-"ü"'] = session.units.pop("u-1")
+        session.units['u-"ü"'].unit_id = 'u-"ü"'
+
+        self.assertEqual(session.state_payload(), loads(encode_state(session)))
+
+
+class ActionWireSizeTests(unittest.TestCase):
+    def test_matches_stdlib_encoded_length(self):
+        actions = [
+            ActionRequest("demo", "p-1", 1, "move", unit_id="u-1", target_x=5, target_y=-4),
+            ActionRequest("demo", "p-1", 12, "assign_group", group_id="g", unit_ids=["u-1", "u-2"]),
+            ActionRequest('dé"mo', "p\\1", 0, "spawn_unit", unit_type="tank\n", unit_ids=["ü"]),
+        ]
+        for action in actions:
+            self.assertEqual(len(json.dumps(asdict(action))), action_wire_size(action))
+
+
+if __name__ == "__main__":
+    unittest.main()
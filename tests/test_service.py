@@ -1,7 +1,9 @@
+import tempfile
 import unittest
 
 from server.domain import ActionRequest
 from server.persistence import InMemoryRepository
+from server.serialization import loads
 from server.service import GameService
 
 
@@ -45,6 +47,30 @@ class GameServiceTests(unittest.TestCase):
         self.assertEqual(3, metrics["players"])
         self.assertEqual(1, metrics["bots"])
 
+    def test_breakdowns_group_actions_by_player_and_action_type(self):
+        service = GameService(repository=InMemoryRepository())
+        service.submit_action(ActionRequest("demo", "p-1", 1, "move", unit_id="u-1", target_x=5, target_y=4))
+        service.submit_action(ActionRequest("demo", "p-1", 2, "stop", unit_id="u-2"))
+        service.submit_action(ActionRequest("demo", "p-2", 1, "stop", unit_id="u-2"))
+
+        by_player = service.get_breakdown("demo", "player")["rows"]
+        by_type = service.get_breakdown("demo", "action_type")["rows"]
+
+        self.assertEqual([("p-1", 2, 1), ("p-2", 1, 1)], [(r["player_id"], r["total_actions"], r["accepted_actions"]) for r in by_player])
+        self.assertEqual([("move", 1), ("stop", 2)], [(r["action_type"], r["total_actions"]) for r in by_type])
+        self.assertIn("error", service.get_breakdown("demo", "unit"))
+        self.assertEqual({"error": "session not found"}, service.get_breakdown("missing", "player"))
+
+    def test_map_response_is_cached_and_rejects_unknown_or_huge_maps(self):
+        service = GameService(repository=InMemoryRepository())
+
+        response = service.map_response("plains", 128, 64)
+
+        self.assertIs(response, service.map_response("plains", 128, 64))
+        self.assertEqual((128, 64), (loads(response.body)["width"], loads(response.body)["height"]))
+        self.assertEqual(404, service.map_response("atlantis").status)
+        self.assertEqual(400, service.map_response("plains", 100_000, 100_000).status)
+
     def test_list_sessions_returns_expected_catalog(self):
         repo = InMemoryRepository()
         service = GameService(repository=repo)
@@ -59,7 +85,8 @@ class GameServiceTests(unittest.TestCase):
         repo = InMemoryRepository()
         service = GameService(repository=repo)
 
-        result = service.create_snapshot("demo", target_path="snapshots/service_snapshot.json")
+        with tempfile.TemporaryDirectory() as directory:
+            result = service.create_snapshot("demo", target_path=f"{directory}/service_snapshot.json")
 
         self.assertIn("snapshot_path", result)
         self.assertEqual("demo", result["session_id"])
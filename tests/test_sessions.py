@@ -0,0 +1,205 @@
+import tempfile
+import time
+import unittest
+
+from server.domain import ActionRequest
+from server.persistence import InMemoryRepository
+from server.service import GameService, _demo_session, _desert_war_session, default_session_factories
+from server.domain import GameSession, PlayerState
+from server.maps import get_map
+from server.sessions import DirectorySessionStore, SessionIndex, SessionManager
+from server.snapshot import session_from_dict, session_to_dict
+
+from helpers import FakeClock
+
+
+def _played_demo():
+    session = _demo_session()
+    session.apply_action(ActionRequest("demo", "p-1", 1, "move", unit_id="u-1", target_x=16, target_y=15))
+    session.apply_action(ActionRequest("demo", "p-2", 1, "mine", unit_id="u-2", resource_type="metal"))
+    return session
+
+
+class SessionSerializationTests(unittest.TestCase):
+    def test_round_trip_keeps_state_orders_and_mined_resources(self):
+        session = _played_demo()
+        restored = session_from_dict(session_to_dict(session))
+
+        self.assertEqual(session.state_payload(), restored.state_payload())
+        self.assertEqual(session.units["u-1"].path, restored.units["u-1"].path)
+        self.assertEqual(session.game_map.resource_amounts, restored.game_map.resource_amounts)
+        self.assertIs(session.game_map.template, restored.game_map.template)
+        self.assertEqual(session.version, restored.version)
+
+        session.advance_movement(4)
+        restored.advance_movement(4)
+        self.assertEqual(session.state_payload(), restored.state_payload())
+
+
+class SessionManagerTests(unittest.TestCase):
+    def test_factories_are_built_on_first_access(self):
+        manager = SessionManager(factories=default_session_factories())
+
+        self.assertEqual(3, len(manager))
+        self.assertEqual(0, manager.metrics()["resident"])
+        self.assertEqual("demo", manager.get("demo").session_id)
+        self.assertEqual({"resident": 1, "pending_factories": 2}, {k: manager.metrics()[k] for k in ("resident", "pending_factories")})
+        self.assertIsNone(manager.get("missing"))
+
+    def test_idle_sessions_hibernate_and_restore_transparently(self):
+        clock = FakeClock()
+        manager = SessionManager({"demo": _played_demo(), "desert-war": _desert_war_session()}, idle_ttl=60, clock=clock)
+        expected = manager.get("demo").state_payload()
+
+        clock.now = 61
+        manager.get("desert-war")
+        self.assertFalse(manager.is_resident("demo"))
+        self.assertIn("demo", manager)
+        self.assertEqual(1, manager.metrics()["evicted_idle"])
+
+        self.assertEqual(expected, manager.get("demo").state_payload())
+        self.assertEqual(1, manager.metrics()["restored"])
+
+    def test_least_recently_used_sessions_are_evicted_under_pressure(self):
+        manager = SessionManager(factories=default_session_factories(), max_resident=2)
+        for session_id in ("demo", "desert-war", "blue-front", "desert-war"):
+            manager.get(session_id)
+
+        self.assertEqual(["blue-front", "desert-war"], sorted(sid for sid in manager.session_ids() if manager.is_resident(sid)))
+        self.assertEqual(1, manager.metrics()["evicted_pressure"])
+
+    def test_resident_unit_total_follows_touches_and_hibernation(self):
+        manager = SessionManager({"demo": _demo_session(), "desert-war": _desert_war_session()}, max_resident_units=100)
+        demo = manager.get("demo")
+        base = manager.metrics()["resident_units"]
+        self.assertEqual(base, sum(len(manager.get(sid).units) for sid in ("demo", "desert-war")))
+
+        demo.apply_action(ActionRequest("demo", "p-1", 1, "spawn_unit", unit_type="land_infantry", target_x=3, target_y=3))
+        manager.touch(demo)
+        self.assertEqual(base + 1, manager.metrics()["resident_units"])
+
+        manager.hibernate("demo")
+        self.assertEqual(base + 1 - len(demo.units), manager.metrics()["resident_units"])
+
+    def test_sweeper_hibernates_idle_sessions_without_requests(self):
+        clock = FakeClock()
+        manager = SessionManager({"demo": _demo_session()}, idle_ttl=10, clock=clock)
+        clock.now = 11
+
+        manager.start_sweeper(0.01)
+        for _ in range(200):
+            if not manager.is_resident("demo"):
+                break
+            time.sleep(0.01)
+
+        self.assertFalse(manager.is_resident("demo"))
+        self.assertEqual(1, manager.metrics()["evicted_idle"])
+
+    def test_sessions_in_use_are_never_evicted(self):
+        clock = FakeClock()
+        manager = SessionManager({"demo": _demo_session(), "desert-war": _desert_war_session()}, idle_ttl=10, clock=clock)
+        with manager.checkout("demo") as session:
+            clock.now = 100
+            manager.get("desert-war")
+            self.assertTrue(manager.is_resident("demo"))
+            self.assertIs(session, manager.get("demo"))
+
+    def test_directory_store_hibernates_to_snapshot_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manager = SessionManager({"demo": _played_demo()}, store=DirectorySessionStore(directory))
+            expected = manager.get("demo").state_payload()
+
+            self.assertTrue(manager.hibernate("demo"))
+            self.assertEqual(expected, manager.get("demo").state_payload())
+
+
+class SessionLifecycleServiceTests(unittest.TestCase):
+    def test_create_play_and_close_session(self):
+        service = GameService(repository=InMemoryRepository(), max_resident_sessions=1)
+
+        created = service.create_session("desert", players=["p-1"], bots=["bot-1"], session_id="fresh")
+        self.assertEqual({"session_id": "fresh", "map": "desert", "tick": 0, "players": 2, "bots": 1, "units": 0}, created["session"])
+        self.assertIn("error", service.create_session("desert", players=["p-1"], session_id="fresh"))
+        self.assertIn("error", service.create_session("moon", players=["p-1"]))
+
+        spawn = ActionRequest("fresh", "p-1", 1, "spawn_unit", unit_type="land_infantry", target_x=3, target_y=3)
+        self.assertTrue(service.submit_action(spawn)["accepted"])
+        service.get_state("demo")
+        self.assertFalse(service.sessions.is_resident("fresh"))
+        self.assertEqual(1, len(service.get_state("fresh")["state"]["units"]))
+
+        self.assertTrue(service.close_session("fresh")["closed"])
+        self.assertNotIn("fresh", [entry["session_id"] for entry in service.list_sessions()["sessions"]])
+        self.assertFalse(service.close_session("fresh")["closed"])
+
+    def test_generated_session_ids_do_not_collide(self):
+        service = GameService(repository=InMemoryRepository())
+        first = service.create_session("islands", players=["a"])["session"]["session_id"]
+        second = service.create_session("islands", players=["a"])["session"]["session_id"]
+        self.assertNotEqual(first, second)
+
+    def test_invalid_session_ids_are_rejected_before_registration(self):
+        service = GameService(repository=InMemoryRepository())
+        listed = service.list_sessions()["sessions"]
+
+        for session_id in (7, "", "../../tmp/evil", "x" * 65):
+            self.assertIn("error", service.create_session("islands", players=["a"], session_id=session_id))
+        self.assertEqual(listed, service.list_sessions()["sessions"])
+        with tempfile.TemporaryDirectory() as directory, self.assertRaises(ValueError):
+            DirectorySessionStore(directory).save("../evil", {})
+
+
+def _lobby(index: int) -> GameSession:
+    players = {f"p-{i}": PlayerState(f"p-{i}") for i in range(2 + index % 3)}
+    return GameSession(f"lobby-{index:02d}", 0, get_map("desert" if index % 2 else "islands"), players, {})
+
+
+class SessionIndexTests(unittest.TestCase):
+    def test_cursor_pages_cover_every_session_once_in_order(self):
+        manager = SessionManager({f"lobby-{i:02d}": _lobby(i) for i in range(25)})
+        seen, cursor = [], None
+        for _ in range(3):
+            page, cursor = manager.page(limit=10, cursor=cursor)
+            seen.extend(entry["session_id"] for entry in page)
+        self.assertIsNone(cursor)
+        self.assertEqual([f"lobby-{i:02d}" for i in range(25)], seen)
+
+    def test_filters_by_map_players_and_status(self):
+        manager = SessionManager({f"lobby-{i:02d}": _lobby(i) for i in range(12)})
+        manager.hibernate("lobby-03")
+
+        desert, _ = manager.page(map_name="desert", min_players=4)
+        self.assertEqual(["lobby-05", "lobby-11"], [entry["session_id"] for entry in desert])
+        hibernated, _ = manager.page(status="hibernated")
+        self.assertEqual(["lobby-03"], [entry["session_id"] for entry in hibernated])
+        self.assertEqual([], manager.page(map_name="moon")[0])
+
+    def test_entries_follow_state_changes_and_activity(self):
+        clock = FakeClock()
+        index = SessionIndex(clock=clock)
+        quiet, busy = _lobby(0), _demo_session()
+        index.update(quiet)
+        index.update(busy)
+
+        clock.now = 500
+        busy.apply_action(ActionRequest("demo", "p-1", 3, "move", unit_id="u-1", target_x=5, target_y=4))
+        index.update(busy)
+
+        active, _ = index.page(active_since=400)
+        self.assertEqual([("demo", 3)], [(entry["session_id"], entry["tick"]) for entry in active])
+        index.remove("demo")
+        self.assertEqual(["lobby-00"], [entry["session_id"] for entry in index.page()[0]])
+
+    def test_service_listing_reflects_actions_without_rescanning(self):
+        service = GameService(repository=InMemoryRepository())
+        service.submit_action(ActionRequest("demo", "p-1", 4, "move", unit_id="u-1", target_x=5, target_y=4))
+
+        listing = service.list_sessions(limit=2)
+        self.assertEqual(["blue-front", "demo"], [entry["session_id"] for entry in listing["sessions"]])
+        self.assertEqual(4, listing["sessions"][1]["tick"])
+        self.assertEqual("demo", listing["next_cursor"])
+        self.assertEqual(["desert-war"], [entry["session_id"] for entry in service.list_sessions(cursor="demo")["sessions"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import json
+import tempfile
 import unittest
 from pathlib import Path
 
@@ -9,9 +10,9 @@ from server.service import GameService
 class SnapshotTests(unittest.TestCase):
     def test_create_snapshot_writes_file(self):
         service = GameService(repository=InMemoryRepository())
-        out = Path('snapshots/test_snapshot.json')
-        if out.exists():
-            out.unlink()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        out = Path(tmp.name) / 'test_snapshot.json'
 
         result = service.create_snapshot('demo', target_path=str(out))
 
@@ -0,0 +1,34 @@
+import unittest
+from math import dist
+
+from server.models import UNIT_MODELS
+from server.pathfinding import raytrace_line
+from server.stencils import MAX_ATTACK_RANGE, RAY_TABLE, disc_offsets
+
+
+class StencilTableTests(unittest.TestCase):
+    def test_ray_table_matches_translated_bresenham(self):
+        origin = (7, 11)
+        for (dx, dy), (offsets, drop_steps) in RAY_TABLE.items():
+            expected = raytrace_line(origin, (origin[0] + dx, origin[1] + dy))
+            self.assertEqual(expected, [(origin[0] + ox, origin[1] + oy) for ox, oy in offsets])
+            self.assertEqual(int(dist((0, 0), (dx, dy)) // 3), drop_steps)
+
+    def test_ray_table_covers_every_unit_attack_range(self):
+        self.assertEqual(max(m.attack_range for m in UNIT_MODELS.values()), MAX_ATTACK_RANGE)
+        for model in UNIT_MODELS.values():
+            r = model.attack_range
+            for dy in range(-r, r + 1):
+                for dx in range(-r, r + 1):
+                    if dist((0, 0), (dx, dy)) <= r:
+                        self.assertIn((dx, dy), RAY_TABLE)
+
+    def test_disc_offsets_match_float_distance_check(self):
+        for radius in range(0, 4):
+            expected = {(dx, dy) for dx in range(-4, 5) for dy in range(-4, 5) if dist((0, 0), (dx, dy)) <= radius}
+            self.assertEqual(expected, set(disc_offsets(radius)))
+        self.assertIs(disc_offsets(2), disc_offsets(2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import json
+import unittest
+
+from server.domain import ActionRequest, GameSession, PlayerState, Unit
+from server.maps import get_map
+from server.persistence import InMemoryRepository
+from server.service import GameService
+from server.visibility import VisibilityIndex
+
+
+class VisibilityTests(unittest.TestCase):
+    def setUp(self):
+        self.session = GameSession(
+            session_id="fog",
+            tick=0,
+            game_map=get_map("desert"),
+            players={"p-1": PlayerState("p-1"), "p-2": PlayerState("p-2")},
+            units={
+                "u-1": Unit("u-1", "p-1", "land_infantry", "land", 2, 2, 55),
+                "u-2": Unit("u-2", "p-2", "land_tank", "land", 17, 17, 180),
+                "u-3": Unit("u-3", "p-2", "land_infantry", "land", 5, 2, 55),
+            },
+        )
+
+    def test_state_for_player_hides_units_outside_sight(self):
+        state = self.session.state_payload("p-1")
+
+        self.assertEqual({"u-1", "u-3"}, set(state["units"]))
+        self.assertEqual({"land_infantry": 2}, state["unit_counts"])
+        self.assertEqual(3, len(self.session.state_payload()["units"]))
+
+    def test_state_for_player_hides_other_players_resources_and_groups(self):
+        self.session.players["p-2"].groups["strike"] = ["u-2"]
+
+        players = self.session.state_payload("p-1")["players"]
+
+        self.assertEqual({"is_bot": False}, players["p-2"])
+        self.assertEqual({"is_bot", "resources", "groups"}, set(players["p-1"]))
+        self.assertEqual(["u-2"], self.session.state_payload()["players"]["p-2"]["groups"]["strike"])
+
+    def test_refresh_only_restamps_changed_units(self):
+        index = VisibilityIndex(self.session.game_map.width, self.session.game_map.height)
+        self.assertEqual(3, index.refresh(self.session))
+        self.assertEqual(0, index.refresh(self.session))
+
+        self.session.units["u-2"].x = 3
+        self.session.units["u-2"].y = 3
+        del self.session.units["u-3"]
+
+        self.assertEqual(2, index.refresh(self.session))
+        self.assertTrue(index.is_visible("p-2", 2, 2))
+        self.assertFalse(index.is_visible("p-2", 17, 17))
+
+    def test_incremental_grid_matches_full_rebuild(self):
+        index = VisibilityIndex(self.session.game_map.width, self.session.game_map.height)
+        index.refresh(self.session)
+        self.session.units["u-1"].x = 10
+        self.session.units["u-4"] = Unit("u-4", "p-1", "land_sniper", "land", 15, 15, 70)
+        index.refresh(self.session)
+
+        rebuilt = VisibilityIndex(self.session.game_map.width, self.session.game_map.height)
+        rebuilt.rebuild(self.session)
+        for player_id in ("p-1", "p-2"):
+            self.assertEqual(rebuilt.visible_tiles(player_id), index.visible_tiles(player_id))
+
+    def test_service_state_filters_by_player(self):
+        service = GameService(repository=InMemoryRepository())
+
+        state = service.get_state("demo", player_id="p-1")["state"]
+        result = service.submit_action(ActionRequest("demo", "p-1", 1, "move", unit_id="u-1", target_x=5, target_y=4))
+
+        self.assertNotIn("u-2", state["units"])
+        self.assertIn("u-1", state["units"])
+        self.assertNotIn("u-2", result["state"]["units"])
+        self.assertEqual({"error": "player not found"}, service.get_state("demo", player_id="nobody"))
+
+    def test_spectator_views_can_be_turned_off(self):
+        service = GameService(repository=InMemoryRepository(), spectators=False)
+
+        self.assertEqual({"error": "player_id is required"}, service.get_state("demo"))
+        self.assertIn("error", json.loads(service.state_response("demo").body))
+        self.assertIn("error", service.subscribe_view("demo", "cam", x=0, y=0, radius=3))
+        self.assertIn("u-1", service.get_state("demo", player_id="p-1")["state"]["units"])
+
+
+if __name__ == "__main__":
+    unittest.main()